@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark da derivação de PSK (PBKDF2-SHA1, 4096 iterações)
+
+Sem argumentos mede apenas o custo da derivação versus a PSK em cache.
+Com --interface/--ssid/--password mede a latência real de associação do
+wpa_supplicant usando a senha ASCII (antes) e a PSK hexadecimal (depois).
+Deve ser executado como root no Raspberry Pi para o modo com hardware.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from network_store import NetworkStore, derive_psk
+
+
+def bench_derivation(iterations: int) -> dict:
+    """Mede derivação PBKDF2 e a leitura da PSK em cache"""
+    ssid, password = 'Benchmark-SSID', 'benchmark-passphrase'
+
+    derive_times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        derive_psk(ssid, password)
+        derive_times.append((time.perf_counter() - start) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = NetworkStore(os.path.join(tmp_dir, 'saved_networks.json'))
+        store.add_network(ssid, password)
+        store.get_psk(ssid, password)  # garantir cache preenchido
+
+        cached_times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            store.get_psk(ssid, password)
+            cached_times.append((time.perf_counter() - start) * 1000)
+
+        # A gravação da derivação em segundo plano não pode correr com a remoção do diretório
+        store.wait_pending()
+
+    return {
+        'derive_ms_median': statistics.median(derive_times),
+        'derive_ms_max': max(derive_times),
+        'cached_ms_median': statistics.median(cached_times),
+        'iterations': iterations
+    }
+
+
+def _wpa_config(ssid: str, psk_line: str) -> str:
+    return f"""ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev
+network={{
+    ssid="{ssid}"
+    {psk_line}
+    key_mgmt=WPA-PSK
+}}
+"""
+
+
+def _time_association(interface: str, config: str, timeout: float) -> float:
+    """Inicia o wpa_supplicant e mede o tempo até wpa_state=COMPLETED"""
+    subprocess.run(['pkill', '-f', f'wpa_supplicant.*{interface}'], capture_output=True)
+    time.sleep(1)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.conf', delete=False) as f:
+        f.write(config)
+        config_file = f.name
+
+    try:
+        start = time.perf_counter()
+        subprocess.run(['wpa_supplicant', '-B', '-i', interface, '-c', config_file, '-D', 'nl80211'],
+                       capture_output=True, timeout=15)
+        while time.perf_counter() - start < timeout:
+            status = subprocess.run(['wpa_cli', '-i', interface, 'status'],
+                                    capture_output=True, text=True, timeout=5)
+            if 'wpa_state=COMPLETED' in status.stdout:
+                return time.perf_counter() - start
+            time.sleep(0.05)
+        return float('nan')
+    finally:
+        os.remove(config_file)
+
+
+def bench_association(interface: str, ssid: str, password: str, rounds: int, timeout: float) -> dict:
+    """Compara latência de associação com senha ASCII e com PSK hexadecimal"""
+    psk = derive_psk(ssid, password)
+    variants = {
+        'passphrase': _wpa_config(ssid, f'psk="{password}"'),
+        'precomputed_psk': _wpa_config(ssid, f'psk={psk}')
+    }
+
+    results = {}
+    for name, config in variants.items():
+        samples = [_time_association(interface, config, timeout) for _ in range(rounds)]
+        valid = [s for s in samples if s == s]
+        results[name] = {
+            'samples_s': samples,
+            'median_s': statistics.median(valid) if valid else None
+        }
+
+    subprocess.run(['pkill', '-f', f'wpa_supplicant.*{interface}'], capture_output=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--interface')
+    parser.add_argument('--ssid')
+    parser.add_argument('--password')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', help='Arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    results = {'derivation': bench_derivation(args.iterations)}
+
+    if args.interface and args.ssid and args.password:
+        results['association'] = bench_association(args.interface, args.ssid, args.password,
+                                                   args.rounds, args.timeout)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
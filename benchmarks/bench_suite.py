@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks: parsers de scan, status do sistema e endpoints HTTP
+
+Mede, sem hardware (backend de rádio simulado):
+
+  parsers    vazão dos parsers de scan (iwlist, nmcli, iw, airport) com
+             10/100/1000 BSS sintéticos e saídas gravadas (--fixture)
+  table      atualização da tabela de BSS e ranking top-K da primeira página
+  status     latência de WebInterface._get_system_status
+  http       p50/p99 de /status, /scan e /connect com N clientes simultâneos
+  startup    tempo do início do processo até a primeira requisição servida e
+             marcos do boot (/api/boot) até online ou portal
+  memory     RSS estável do servidor após rodadas de carga e crescimento
+             entre rodadas (--memory-profile low, --max-rss-kb para falhar
+             acima de um teto)
+
+Os resultados saem em JSON (com revisão do git e versão do Python) para
+comparar versões:
+
+    python benchmarks/bench_suite.py --output antes.json
+    python benchmarks/bench_suite.py --output depois.json --compare antes.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import scan_fixtures
+
+SECTIONS = ('parsers', 'table', 'status', 'http', 'startup', 'memory')
+BENCH_SSID = 'Benchmark'
+BENCH_PASSWORD = 'senha-benchmark'
+
+# Latências do rádio simulado reduzidas: mede-se o caminho do servidor, não o ar
+FAST_RADIO_LATENCIES = {'scan': 0.01, 'association': 0.005, 'handshake': 0.005,
+                        'dhcp': 0.005, 'connectivity': 0.005, 'ap_start': 0.01, 'rtt': 0.001}
+
+# Processo servidor: o WiFiManagerSystem completo com o backend simulado
+SERVER_BOOTSTRAP = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from main import WiFiManagerSystem
+WiFiManagerSystem().start()
+"""
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil por posição (nearest-rank)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _summary_ms(samples: List[float]) -> Dict:
+    ms = [s * 1000 for s in samples]
+    return {'n': len(ms), 'p50_ms': round(percentile(ms, 0.5), 3),
+            'p99_ms': round(percentile(ms, 0.99), 3), 'max_ms': round(max(ms), 3)}
+
+
+def _timed(function: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _resident_kb(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _radio_environment(realistic: bool) -> Dict:
+    environment = {
+        'seed': 1,
+        'failures': {'connect': 0.0},
+        'access_points': [
+            {'ssid': BENCH_SSID, 'bssid': '02:00:00:00:00:01', 'frequency': 5180, 'rssi': -55,
+             'password': BENCH_PASSWORD},
+            {'ssid': BENCH_SSID, 'bssid': '02:00:00:00:00:02', 'frequency': 2437, 'rssi': -67,
+             'password': BENCH_PASSWORD}
+        ] + [{'ssid': f'Vizinho_{i}', 'bssid': f'02:00:00:00:01:{i:02x}',
+              'frequency': 2412 + 5 * (i % 11), 'rssi': -60 - i} for i in range(20)]
+    }
+    if not realistic:
+        environment['latencies'] = FAST_RADIO_LATENCIES
+    return environment
+
+
+# ----------------------------------------------------------------------
+# Parsers
+# ----------------------------------------------------------------------
+
+def _parsers() -> Dict[str, Callable]:
+    import scan_parser
+    from system_radio import SystemBackend
+
+    return {
+        'iwlist': scan_parser.parse_iwlist,
+        'nmcli': scan_parser.parse_nmcli,
+        'iw': scan_parser.parse_iw,
+        'airport': SystemBackend('wlan0')._parse_macos_airport_results,
+    }
+
+
+def _measure_parse(parse: Callable, output: str, min_time: float, bss: int = None) -> Dict:
+    parsed = len(parse(output))
+    bss = bss or parsed or 1
+    # Repetir até acumular min_time para estabilizar entradas pequenas
+    runs, elapsed = 0, 0.0
+    while elapsed < min_time:
+        start = time.perf_counter()
+        parse(output)
+        elapsed += time.perf_counter() - start
+        runs += 1
+    per_parse = elapsed / runs
+    return {
+        'input_bytes': len(output),
+        'records': parsed,
+        'parse_us': round(per_parse * 1e6, 1),
+        'bss_per_s': round(bss / per_parse),
+        'mb_per_s': round(len(output) / per_parse / 1e6, 2)
+    }
+
+
+def _detect_format(output: str) -> str:
+    if 'Cell ' in output and 'Address:' in output:
+        return 'iwlist'
+    if output.startswith('BSS ') or '\nBSS ' in output:
+        return 'iw'
+    return 'nmcli'
+
+
+def _recorded_fixtures(paths: List[str]) -> Dict[str, str]:
+    """Saídas reais: arquivos de texto ou a maior saída de cada scan em um trace gravado"""
+    from command_trace import extract
+
+    fixtures = {}
+    for path in paths:
+        name = os.path.basename(path).split('.')[0]
+        if path.endswith(('.jsonl', '.jsonl.gz')):
+            for command in ('iwlist', 'iw', 'nmcli'):
+                outputs = [o for o in extract(path, command) if _detect_format(o) == command]
+                if outputs:
+                    fixtures[f'{name}_{command}'] = max(outputs, key=len)
+        else:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+def bench_parsers(sizes: List[int], min_time: float, fixtures: List[str] = ()) -> Dict:
+    parsers = _parsers()
+    results = {}
+    for fmt, parse in parsers.items():
+        for size in sizes:
+            output = scan_fixtures.FORMATS[fmt](scan_fixtures.generate_bss(size))
+            results[f'{fmt}_{size}'] = _measure_parse(parse, output, min_time, size)
+
+    for name, output in _recorded_fixtures(fixtures).items():
+        fmt = _detect_format(output)
+        result = _measure_parse(parsers[fmt], output, min_time)
+        result['format'] = fmt
+        results[f'recorded_{name}'] = result
+    return results
+
+
+def bench_table(sizes: List[int], min_time: float) -> Dict:
+    """Atualização da tabela de BSS com um scan e extração da primeira página"""
+    import scan_parser
+    from bss_table import BssTable
+
+    results = {}
+    for size in sizes:
+        output = scan_fixtures.iwlist_output(scan_fixtures.generate_bss(size))
+        networks = [r.to_dict() for r in scan_parser.parse_iwlist(output) if r.ssid]
+        table = BssTable()
+        runs, elapsed = 0, 0.0
+        while elapsed < min_time:
+            start = time.perf_counter()
+            table.update(networks)
+            table.page(30)
+            elapsed += time.perf_counter() - start
+            runs += 1
+        results[f'iwlist_{size}'] = {'bss': len(networks), 'ssids': len(table.groups()),
+                                     'update_page_us': round(elapsed / runs * 1e6, 1)}
+    return results
+
+
+# ----------------------------------------------------------------------
+# Status do sistema (em processo)
+# ----------------------------------------------------------------------
+
+def bench_status(repeat: int) -> Dict:
+    from main import WiFiManagerSystem
+
+    system = WiFiManagerSystem()
+    system.wifi_monitor.connect(BENCH_SSID, BENCH_PASSWORD)
+    web = system.web_interface
+    cpu_samples = _timed(web._get_cpu_usage, min(repeat, 3))
+    results = {
+        'get_system_status': _summary_ms(_timed(web._get_system_status, repeat)),
+        'get_cpu_usage': _summary_ms(cpu_samples),
+    }
+    results['cpu_usage_share'] = round(
+        results['get_cpu_usage']['p50_ms'] / results['get_system_status']['p50_ms'], 3)
+    return results
+
+
+# ----------------------------------------------------------------------
+# Servidor HTTP (processo separado)
+# ----------------------------------------------------------------------
+
+class ServerProcess:
+    """WiFiManagerSystem completo em um subprocesso, servindo em uma porta livre"""
+
+    def __init__(self, config_dir: str, env_file: str, env: Dict = None):
+        self.port = _free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.env = dict(os.environ, RADIO_BACKEND='fake', FAKE_RADIO_ENV=env_file,
+                        CONFIG_DIR=config_dir, WEB_PORT=str(self.port), PYTHONDONTWRITEBYTECODE='1',
+                        **(env or {}))
+        self.process = None
+
+    def start(self, timeout: float = 30.0) -> float:
+        """Inicia o processo; retorna o tempo até a primeira resposta 200"""
+        started = time.perf_counter()
+        self.process = subprocess.Popen([sys.executable, '-c', SERVER_BOOTSTRAP, SRC_DIR],
+                                        env=self.env, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'servidor terminou com código {self.process.returncode}')
+            try:
+                with urllib.request.urlopen(self.base_url + '/metrics', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.005)
+        raise RuntimeError('servidor não respondeu a tempo')
+
+    def request(self, path: str, body: Dict = None, timeout: float = 60.0) -> float:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    def boot_milestones(self, timeout: float = 30.0) -> Dict:
+        """Marcos de /api/boot quando o boot chega a online ou portal"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            with urllib.request.urlopen(self.base_url + '/api/boot', timeout=5) as response:
+                boot = json.load(response)['boot']
+            if boot['outcome'] or time.perf_counter() > deadline:
+                return boot
+            time.sleep(0.05)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+ENDPOINTS = {
+    'status': ('/status', None),
+    'scan': ('/scan', None),
+    'connect': ('/connect', {'ssid': BENCH_SSID, 'password': BENCH_PASSWORD}),
+}
+
+
+def bench_http(server: ServerProcess, clients: int, requests_per_client: int) -> Dict:
+    results = {'clients': clients, 'requests_per_client': requests_per_client}
+    for name, (path, body) in ENDPOINTS.items():
+        server.request(path, body)  # aquecimento
+        errors = []
+
+        def client(_):
+            samples = []
+            for _ in range(requests_per_client):
+                try:
+                    samples.append(server.request(path, body))
+                except Exception as e:
+                    errors.append(str(e))
+            return samples
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            samples = [s for batch in pool.map(client, range(clients)) for s in batch]
+        wall = time.perf_counter() - wall_start
+        result = _summary_ms(samples) if samples else {'n': 0}
+        result.update(errors=len(errors), requests_per_s=round(len(samples) / wall, 2))
+        results[name] = result
+    return results
+
+
+# Rodada de carga da seção memory: páginas do scan, status, deltas e logs
+MEMORY_LOAD = ('/status', '/scan', '/scan?limit=200', '/scan?since=', '/api/logs', '/metrics',
+               '/api/link', '/api/history/transitions')
+
+
+def bench_memory(server: ServerProcess, rounds: int = 3, requests_per_path: int = 20) -> Dict:
+    """RSS após cada rodada de carga; o crescimento entre rodadas indica vazamento"""
+    rss = []
+    for _ in range(rounds):
+        for path in MEMORY_LOAD:
+            for _ in range(requests_per_path):
+                try:
+                    server.request(path)
+                except (urllib.error.URLError, ConnectionError, socket.timeout):
+                    pass
+        time.sleep(1)
+        rss.append(_resident_kb(server.process.pid))
+    with urllib.request.urlopen(server.base_url + '/api/memory', timeout=10) as response:
+        memory = json.load(response)['memory']
+    return {
+        'profile': memory['profile'],
+        'threads': memory['threads'],
+        'steady_rss_kb': rss[-1],
+        'peak_rss_kb': memory['process']['peak_rss_kb'],
+        'growth_rss_kb': rss[-1] - rss[0]
+    }
+
+
+# ----------------------------------------------------------------------
+# Comparação entre versões
+# ----------------------------------------------------------------------
+
+# Métricas em que valores maiores são melhores; nas demais, menores são melhores
+HIGHER_IS_BETTER = ('bss_per_s', 'mb_per_s', 'requests_per_s')
+COMPARED = HIGHER_IS_BETTER + ('_us', 'p50_ms', 'p99_ms', 'seconds', 'rss_kb')
+
+
+def _flatten(data: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict, previous: Dict, threshold: float) -> Dict:
+    """Variação relativa das métricas comparáveis; regressões acima do limiar"""
+    now, before = _flatten(current.get('results', {})), _flatten(previous.get('results', {}))
+    changes, regressions = {}, []
+    for name, value in now.items():
+        metric = name.rsplit('.', 1)[-1]
+        old = before.get(name)
+        if not metric.endswith(COMPARED) or not old:
+            continue
+        change = (value - old) / old
+        changes[name] = round(change, 4)
+        worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+        if worse > threshold:
+            regressions.append(name)
+    return {'baseline_revision': previous.get('revision'), 'threshold': threshold,
+            'changes': changes, 'regressions': regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sections', default=','.join(SECTIONS),
+                        help=f"Seções a executar ({','.join(SECTIONS)})")
+    parser.add_argument('--sizes', default='10,100,1000', help='Quantidades de BSS dos parsers')
+    parser.add_argument('--parse-min-time', type=float, default=0.2,
+                        help='Tempo mínimo (s) de medição por parser/tamanho')
+    parser.add_argument('--fixture', action='append', default=[],
+                        help='Saída de scan gravada (texto ou trace .jsonl.gz); pode repetir')
+    parser.add_argument('--status-repeat', type=int, default=5)
+    parser.add_argument('--clients', type=int, default=8, help='Clientes HTTP simultâneos')
+    parser.add_argument('--requests', type=int, default=10, help='Requisições por cliente')
+    parser.add_argument('--realistic-radio', action='store_true',
+                        help='Latências padrão do rádio simulado (scan de 1 s etc.)')
+    parser.add_argument('--memory-profile', choices=('default', 'low'),
+                        help='Perfil de memória do servidor (MEMORY_PROFILE)')
+    parser.add_argument('--max-rss-kb', type=int,
+                        help='Teto do RSS estável (seção memory); acima dele sai com código 1')
+    parser.add_argument('--compare', metavar='JSON', help='Resultados anteriores para comparação')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Piora relativa considerada regressão')
+    parser.add_argument('--output', help='Arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    sections = [s.strip() for s in args.sections.split(',') if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"seções desconhecidas: {', '.join(sorted(unknown))}")
+    logging.basicConfig(level=logging.CRITICAL)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env_file = os.path.join(tmp_dir, 'radio_env.json')
+        with open(env_file, 'w') as f:
+            json.dump(_radio_environment(args.realistic_radio), f)
+
+        if 'parsers' in sections:
+            results['parsers'] = bench_parsers([int(s) for s in args.sizes.split(',')],
+                                               args.parse_min_time, args.fixture)
+
+        if 'table' in sections:
+            results['table'] = bench_table([int(s) for s in args.sizes.split(',')], args.parse_min_time)
+
+        if 'status' in sections:
+            os.environ.update({'RADIO_BACKEND': 'fake', 'FAKE_RADIO_ENV': env_file,
+                               'CONFIG_DIR': os.path.join(tmp_dir, 'status')})
+            results['status'] = bench_status(args.status_repeat)
+
+        if {'http', 'startup', 'memory'} & set(sections):
+            server_env = {'MEMORY_PROFILE': args.memory_profile} if args.memory_profile else None
+            server = ServerProcess(os.path.join(tmp_dir, 'server'), env_file, server_env)
+            try:
+                first_response = server.start()
+                if 'startup' in sections:
+                    results['startup'] = {'first_request_seconds': round(first_response, 3),
+                                          'rss_kb': _resident_kb(server.process.pid)}
+                    boot = server.boot_milestones()
+                    results['startup']['boot_outcome'] = boot['outcome']
+                    for name, seconds in boot['milestones'].items():
+                        results['startup'][f'boot_{name}_seconds'] = seconds
+                if 'http' in sections:
+                    results['http'] = bench_http(server, args.clients, args.requests)
+                if 'memory' in sections:
+                    results['memory'] = bench_memory(server)
+            finally:
+                server.stop()
+
+    report = {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': vars(args),
+        'results': results
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    failed = bool(report.get('comparison', {}).get('regressions'))
+    steady_rss = results.get('memory', {}).get('steady_rss_kb')
+    if args.max_rss_kb and steady_rss and steady_rss > args.max_rss_kb:
+        print(f"RSS estável de {steady_rss} kB acima do teto de {args.max_rss_kb} kB", file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
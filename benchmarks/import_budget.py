@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Orçamento de tempo de importação dos pontos de entrada (python -X importtime)
+
+Cada ponto de entrada é importado em um interpretador novo, algumas vezes
+(vale o menor tempo), e o tempo cumulativo da importação é comparado com o
+orçamento. Também verifica que o caminho do monitor não carrega a pilha web.
+Sai com código 1 se algum orçamento for estourado, para uso em CI:
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget main=80 --top 15 --output imports.json
+
+Os orçamentos padrão valem para uma máquina de CI x86; no Raspberry Pi use
+--scale (ex.: --scale 6) em vez de editar os valores.
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'src'))
+
+# Tempo cumulativo máximo de importação (ms) por ponto de entrada
+BUDGETS_MS = {
+    'main': 120,
+    'wifi_monitor': 100,
+    'web_interface': 400,
+}
+
+# Módulos que não podem ser carregados ao importar o ponto de entrada
+FORBIDDEN = {
+    'main': ('flask', 'jinja2', 'werkzeug', 'web_interface', 'psutil', 'requests', 'netifaces'),
+    'wifi_monitor': ('flask', 'jinja2', 'werkzeug', 'web_interface'),
+}
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Linhas do -X importtime como (módulo, profundidade, próprio_us, cumulativo_us)"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabeçalho
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return imports
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """Importa o módulo em um interpretador novo e devolve as linhas do importtime"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # mede com bytecode em cache, como em produção
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=SRC_DIR, env=env, capture_output=True, text=True, timeout=60)
+    if proc.returncode != 0:
+        raise RuntimeError(f"falha ao importar {module}: {proc.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(proc.stderr)
+
+
+def bench_module(module: str, repeat: int, top: int) -> Dict:
+    """Menor tempo cumulativo entre as repetições e as importações mais pesadas"""
+    measure(module)  # aquece o cache de bytecode
+    best = None
+    for _ in range(repeat):
+        imports = measure(module)
+        total = next(cumulative for name, depth, _, cumulative in imports
+                     if depth == 0 and name == module)
+        if best is None or total < best[0]:
+            best = (total, imports)
+    total, imports = best
+    loaded = {name for name, _, _, _ in imports}
+    # Importações diretas do ponto de entrada, pelo custo cumulativo
+    heaviest = sorted((imp for imp in imports if imp[1] == 1), key=lambda imp: imp[3], reverse=True)
+    return {
+        'import_ms': round(total / 1000, 1),
+        'modules': len(imports),
+        'forbidden': sorted(name for name in FORBIDDEN.get(module, ()) if name in loaded),
+        'top': [{'module': name, 'cumulative_ms': round(cumulative / 1000, 1),
+                 'self_ms': round(self_us / 1000, 1)}
+                for name, _, self_us, cumulative in heaviest[:top]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--modules', default=','.join(BUDGETS_MS),
+                        help='Pontos de entrada a medir, separados por vírgula')
+    parser.add_argument('--budget', action='append', default=[], metavar='MÓDULO=MS',
+                        help='Sobrescreve o orçamento de um módulo; pode repetir')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplicador dos orçamentos (máquinas mais lentas)')
+    parser.add_argument('--repeat', type=int, default=5, help='Importações por módulo')
+    parser.add_argument('--top', type=int, default=10, help='Importações mais pesadas listadas')
+    parser.add_argument('--output', help='Arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS_MS)
+    for item in args.budget:
+        module, _, value = item.partition('=')
+        try:
+            budgets[module.strip()] = float(value)
+        except ValueError:
+            parser.error(f"orçamento inválido: {item}")
+
+    results = {}
+    failures = []
+    for module in [m.strip() for m in args.modules.split(',') if m.strip()]:
+        result = bench_module(module, max(args.repeat, 1), args.top)
+        budget = budgets.get(module)
+        if budget is not None:
+            result['budget_ms'] = round(budget * args.scale, 1)
+            if result['import_ms'] > result['budget_ms']:
+                failures.append(f"{module}: {result['import_ms']} ms > {result['budget_ms']} ms")
+        if result['forbidden']:
+            failures.append(f"{module}: carrega {', '.join(result['forbidden'])}")
+        results[module] = result
+
+    report = {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+        'failures': failures
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for failure in failures:
+        print(f"ORÇAMENTO ESTOURADO: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
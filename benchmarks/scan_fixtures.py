@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Saídas sintéticas de scan (iwlist, nmcli, iw, airport) para benchmarks
+
+Os geradores são determinísticos pela semente e imitam o formato real de
+cada ferramenta, incluindo SSIDs ocultos, redes abertas e APs com vários
+BSS. Para fixtures reais, extraia a saída de um trace gravado:
+
+    python src/command_trace.py campo.jsonl.gz --extract 'iwlist wlan0 scan'
+"""
+
+import random
+from typing import List, NamedTuple
+
+CHANNELS_24 = (1, 6, 11)
+CHANNELS_5 = (36, 40, 44, 48, 149, 153, 157, 161)
+
+
+class SyntheticBss(NamedTuple):
+    ssid: str
+    bssid: str
+    channel: int
+    frequency: int
+    dbm: int
+    security: str   # '', 'WPA2' ou 'WPA1 WPA2'
+
+
+def channel_frequency(channel: int) -> int:
+    if channel <= 14:
+        return 2407 + channel * 5
+    return 5000 + channel * 5
+
+
+def generate_bss(count: int, seed: int = 1) -> List[SyntheticBss]:
+    """Lista de BSS com ~10% ocultos, ~15% abertos e SSIDs com até 3 BSS"""
+    rng = random.Random(seed)
+    bss_list = []
+    for index in range(count):
+        network = index // rng.choice((1, 1, 2, 3))
+        if rng.random() < 0.1:
+            ssid = ''
+        else:
+            ssid = f"Rede_{network:04d}" if rng.random() < 0.8 else f"Café Wi-Fi {network}"
+        channel = rng.choice(CHANNELS_24 + CHANNELS_5)
+        roll = rng.random()
+        security = '' if roll < 0.15 else ('WPA2' if roll < 0.85 else 'WPA1 WPA2')
+        bss_list.append(SyntheticBss(
+            ssid=ssid,
+            bssid='02:%02x:%02x:%02x:%02x:%02x' % tuple(rng.randrange(256) for _ in range(5)),
+            channel=channel,
+            frequency=channel_frequency(channel),
+            dbm=rng.randint(-92, -30),
+            security=security))
+    return bss_list
+
+
+# Elementos de informação que o iwlist imprime em hexadecimal ("IE: Unknown")
+# e o dump detalhado do iw: em ambientes densos são a maior parte da saída
+_UNKNOWN_IE_LENGTHS = (9, 10, 3, 26, 22, 24, 10, 9, 7, 24, 18, 5, 12)
+_IW_IE_DUMP = [
+    "\tHT capabilities:",
+    "\t\tCapabilities: 0x1ad",
+    "\t\t\tRX LDPC",
+    "\t\t\tHT20",
+    "\t\t\tSM Power Save disabled",
+    "\t\t\tRX HT20 SGI",
+    "\t\t\tTX STBC",
+    "\t\t\tRX STBC 1-stream",
+    "\t\t\tMax AMSDU length: 3839 bytes",
+    "\t\t\tNo DSSS/CCK HT40",
+    "\t\tMaximum RX AMPDU length 65535 bytes (exponent: 0x003)",
+    "\t\tMinimum RX AMPDU time spacing: 4 usec (0x05)",
+    "\t\tHT RX MCS rate indexes supported: 0-15",
+    "\t\tHT TX MCS rate indexes are undefined",
+    "\tHT operation:",
+    "\t\t * secondary channel offset: no secondary",
+    "\t\t * STA channel width: 20 MHz",
+    "\t\t * RIFS: 0",
+    "\t\t * HT protection: no",
+    "\t\t * non-GF present: 0",
+    "\t\t * OBSS non-GF present: 0",
+    "\t\t * dual beacon: 0",
+    "\tExtended capabilities:",
+    "\t\t * Extended Channel Switching",
+    "\t\t * BSS Transition",
+    "\t\t * Operating Mode Notification",
+    "\tWMM:\t * Parameter version 1",
+    "\t\t * BE: CW 15-1023, AIFSN 3",
+    "\t\t * BK: CW 15-1023, AIFSN 7",
+    "\t\t * VI: CW 7-15, AIFSN 2, TXOP 3008 usec",
+    "\t\t * VO: CW 3-7, AIFSN 2, TXOP 1504 usec",
+    "\tWPS:\t * Version: 1.0",
+    "\t\t * Wi-Fi Protected Setup State: 2 (Configured)",
+    "\t\t * Response Type: 3 (AP)",
+    "\t\t * Manufacturer: Broadcom",
+    "\t\t * Model: Broadcom",
+    "\t\t * Device name: BroadcomAP",
+]
+
+
+def _unknown_ies(rng: random.Random) -> List[str]:
+    return [f"                    IE: Unknown: {rng.randrange(256):02X}{length:02X}"
+            + ''.join(f"{rng.randrange(256):02X}" for _ in range(length))
+            for length in _UNKNOWN_IE_LENGTHS]
+
+
+def iwlist_output(bss_list: List[SyntheticBss], interface: str = 'wlan0') -> str:
+    rng = random.Random(len(bss_list))
+    lines = [f"{interface}     Scan completed :"]
+    for index, bss in enumerate(bss_list, 1):
+        quality = max(0, min(70, bss.dbm + 110))
+        lines.extend([
+            f"          Cell {index:02d} - Address: {bss.bssid.upper()}",
+            f"                    Channel:{bss.channel}",
+            f"                    Frequency:{bss.frequency / 1000:.3f} GHz (Channel {bss.channel})",
+            f"                    Quality={quality}/70  Signal level={bss.dbm} dBm  ",
+            f"                    Encryption key:{'on' if bss.security else 'off'}",
+            f'                    ESSID:"{bss.ssid}"',
+            "                    Bit Rates:1 Mb/s; 2 Mb/s; 5.5 Mb/s; 11 Mb/s; 6 Mb/s",
+            "                              9 Mb/s; 12 Mb/s; 18 Mb/s",
+            "                    Mode:Master",
+            "                    Extra:tsf=0000000000000000",
+            "                    Extra: Last beacon: 40ms ago",
+        ])
+        if bss.security:
+            lines.extend([
+                "                    IE: IEEE 802.11i/WPA2 Version 1",
+                "                        Group Cipher : CCMP",
+                "                        Pairwise Ciphers (1) : CCMP",
+                "                        Authentication Suites (1) : PSK",
+            ])
+        lines.extend(_unknown_ies(rng))
+    return '\n'.join(lines) + '\n'
+
+
+def nmcli_output(bss_list: List[SyntheticBss]) -> str:
+    """Formato de 'nmcli -t -f SSID,SIGNAL,SECURITY dev wifi list'"""
+    lines = []
+    for bss in bss_list:
+        signal = max(0, min(100, 2 * (bss.dbm + 100)))
+        lines.append(f"{bss.ssid.replace(':', chr(92) + ':')}:{signal}:{bss.security}")
+    return '\n'.join(lines) + '\n'
+
+
+def iw_output(bss_list: List[SyntheticBss], interface: str = 'wlan0') -> str:
+    lines = []
+    for bss in bss_list:
+        lines.extend([
+            f"BSS {bss.bssid}(on {interface})",
+            "\tlast seen: 1234.567s [boottime]",
+            "\tTSF: 0 usec (0d, 00:00:00)",
+            f"\tfreq: {bss.frequency}",
+            "\tbeacon interval: 100 TUs",
+            f"\tcapability: ESS {'Privacy ' if bss.security else ''}ShortSlotTime (0x0411)",
+            f"\tsignal: {bss.dbm}.00 dBm",
+            "\tlast seen: 40 ms ago",
+            f"\tSSID: {bss.ssid}",
+            "\tSupported rates: 1.0* 2.0* 5.5* 11.0* 6.0 9.0 12.0 18.0 ",
+            f"\tDS Parameter set: channel {bss.channel}",
+        ])
+        if bss.security:
+            lines.extend([
+                "\tRSN:\t * Version: 1",
+                "\t\t * Group cipher: CCMP",
+                "\t\t * Pairwise ciphers: CCMP",
+                "\t\t * Authentication suites: PSK",
+            ])
+        lines.extend(_IW_IE_DUMP)
+    return '\n'.join(lines) + '\n'
+
+
+def airport_output(bss_list: List[SyntheticBss]) -> str:
+    lines = ['                            SSID BSSID             RSSI CHANNEL HT CC SECURITY (auth/unicast/group)']
+    for bss in bss_list:
+        security = 'WPA2(PSK/AES/AES)' if bss.security else 'NONE'
+        ssid = bss.ssid.replace(' ', '_') or '--'
+        lines.append(f"{ssid:>32} {bss.bssid} {bss.channel:<4} BR {bss.dbm} {security}")
+    return '\n'.join(lines) + '\n'
+
+
+FORMATS = {
+    'iwlist': iwlist_output,
+    'nmcli': nmcli_output,
+    'iw': iw_output,
+    'airport': airport_output,
+}
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Teste de longa duração (soak) da máquina de estados de failover
+
+Executa o WiFiManagerSystem real (monitor, preditor, roaming, hotspot e
+conexão) sobre o backend de rádio simulado com relógio acelerado: com o
+padrão de 1000x, um dia simulado leva cerca de 90 segundos. O ambiente
+sofre quedas aleatórias de enlace, degradações graduais de sinal e
+desaparecimentos do AP. Ao final reporta tempo sem uplink, transições de
+modo por hora, CPU por hora simulada e crescimento de memória.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import clocks
+
+HOME_SSID = 'Casa'
+HOME_PASSWORD = 'senha-da-casa'
+HOME_BSSIDS = ('02:00:00:00:00:01', '02:00:00:00:00:02')
+
+
+def _environment(args) -> dict:
+    """Ambiente simulado: dois APs da rede salva e uma rede vizinha"""
+    return {
+        'seed': args.seed,
+        'link_drop_rate': args.link_drop_rate,
+        'failures': {'connect': args.connect_failure_rate},
+        'access_points': [
+            {'ssid': HOME_SSID, 'bssid': HOME_BSSIDS[0], 'frequency': 5180, 'rssi': -55,
+             'password': HOME_PASSWORD},
+            {'ssid': HOME_SSID, 'bssid': HOME_BSSIDS[1], 'frequency': 2437, 'rssi': -67,
+             'password': HOME_PASSWORD},
+            {'ssid': 'Vizinho', 'bssid': '02:00:00:00:01:01', 'frequency': 2462, 'rssi': -72}
+        ]
+    }
+
+
+def _resident_kb() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _cpu_seconds() -> float:
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def _slope(points) -> float:
+    """Inclinação por mínimos quadrados de pares (x, y)"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+class SoakRun:
+    """Agenda os eventos do ambiente e amostra o sistema em tempo simulado"""
+
+    def __init__(self, system, args):
+        self.system = system
+        self.args = args
+        self.environment = system.wifi_monitor.backend.environment
+        self.scheduler = clocks.Scheduler()
+        self.removed = {}
+
+        self.uplink_down = 0.0
+        self.portal_time = 0.0
+        self.transitions = 0
+        self.outages = []
+        self._outage_start = None
+        self._last_mode = system.mode
+        self.memory = []   # (hora simulada, RSS em KB)
+        self.threads_max = 0
+        self.fds = []
+
+    # Eventos do ambiente --------------------------------------------------
+
+    def _ap_outage(self):
+        """Os dois APs da rede salva desaparecem (queda de energia do roteador)"""
+        for bssid in HOME_BSSIDS:
+            ap = self.environment.access_points.get(bssid)
+            if ap is not None:
+                self.removed[bssid] = ap
+                self.environment.remove(bssid)
+        self.scheduler.call_later(self.args.ap_outage_duration, self._ap_restore)
+
+    def _ap_restore(self):
+        for ap in self.removed.values():
+            self.environment.add(ap)
+        self.removed.clear()
+
+    def _degrade(self):
+        """Degrada o sinal do AP principal em rampa e depois restaura"""
+        ap = self.environment.access_points.get(HOME_BSSIDS[0])
+        if ap is None:
+            return
+        original = ap.rssi
+        steps = 30
+        for step in range(1, steps + 1):
+            self.scheduler.call_later(step * 2, lambda s=step: self.environment.set_rssi(
+                HOME_BSSIDS[0], original - (original + 92) * s / steps))
+        self.scheduler.call_later(steps * 2 + self.args.degrade_duration,
+                                  lambda: self.environment.set_rssi(HOME_BSSIDS[0], original))
+
+    # Amostragem -----------------------------------------------------------
+
+    def _sample(self):
+        interval = self.args.sample_interval
+        backend = self.system.wifi_monitor.backend
+        mode = self.system.mode
+        uplink = mode == 'wifi' and backend.has_connectivity()
+
+        if not uplink:
+            self.uplink_down += interval
+            if self._outage_start is None:
+                self._outage_start = clocks.monotonic()
+        elif self._outage_start is not None:
+            self.outages.append(clocks.monotonic() - self._outage_start)
+            self._outage_start = None
+        if mode == 'hotspot':
+            self.portal_time += interval
+        if mode != self._last_mode:
+            self.transitions += 1
+            self._last_mode = mode
+        self.threads_max = max(self.threads_max, threading.active_count())
+
+    def _sample_resources(self):
+        hours = (clocks.monotonic() - self.started) / 3600
+        self.memory.append((hours, _resident_kb()))
+        self.fds.append(_open_fds())
+
+    # Execução -------------------------------------------------------------
+
+    def run(self) -> dict:
+        args = self.args
+        system = self.system
+        self.started = clocks.monotonic()
+        deadline = self.started + args.hours * 3600
+
+        self.scheduler.call_every(args.sample_interval, self._sample)
+        self.scheduler.call_every(60, self._sample_resources)
+        self.scheduler.call_every(args.ap_outage_every, self._ap_outage)
+        self.scheduler.call_at(self.started + args.degrade_every / 2, self._degrade, args.degrade_every)
+
+        system.running = True
+        system.wifi_monitor.telemetry.start()
+        loop = threading.Thread(target=system.main_loop, name='soak-main-loop', daemon=True)
+        real_start = time.monotonic()
+        cpu_start = _cpu_seconds()
+        loop.start()
+        try:
+            self.scheduler.run_until(deadline)
+        finally:
+            system.running = False
+            system.failover_predictor.wakeup.set()
+            system.wifi_monitor.telemetry.stop()
+            loop.join(timeout=5)
+        real_elapsed = time.monotonic() - real_start
+        cpu_used = _cpu_seconds() - cpu_start
+        sim_hours = (clocks.monotonic() - self.started) / 3600
+
+        if self._outage_start is not None:
+            self.outages.append(clocks.monotonic() - self._outage_start)
+        outages = sorted(self.outages)
+        steady = [point for point in self.memory if point[0] >= min(1.0, sim_hours / 4)]
+        predictor = system.failover_predictor.get_stats()
+        return {
+            'simulated_hours': round(sim_hours, 2),
+            'real_seconds': round(real_elapsed, 1),
+            'effective_speed': round(sim_hours * 3600 / real_elapsed, 1) if real_elapsed else None,
+            'uplink_down_seconds': round(self.uplink_down, 1),
+            'uplink_availability': round(1 - self.uplink_down / (sim_hours * 3600), 5) if sim_hours else None,
+            'portal_seconds': round(self.portal_time, 1),
+            'outages': len(outages),
+            'outage_p50_s': round(outages[len(outages) // 2], 1) if outages else None,
+            'outage_max_s': round(outages[-1], 1) if outages else None,
+            'transitions': self.transitions,
+            'transitions_per_hour': round(self.transitions / sim_hours, 3) if sim_hours else None,
+            'predictions': predictor.get('predictions'),
+            'cancelled_predictions': predictor.get('cancelled'),
+            'roams': system.wifi_monitor.roaming_engine.roam_count,
+            'connect_attempts': system.wifi_monitor.connect_timings.attempts,
+            'connect_failures': system.wifi_monitor.connect_timings.failures,
+            'cpu_seconds': round(cpu_used, 2),
+            'cpu_ms_per_sim_hour': round(cpu_used * 1000 / sim_hours, 1) if sim_hours else None,
+            'rss_start_kb': self.memory[0][1] if self.memory else None,
+            'rss_end_kb': self.memory[-1][1] if self.memory else None,
+            'rss_growth_kb_per_sim_hour': round(_slope(steady), 2),
+            'threads_max': self.threads_max,
+            'open_fds_start': self.fds[0] if self.fds else None,
+            'open_fds_end': self.fds[-1] if self.fds else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--hours', type=float, default=24.0, help='Horas simuladas')
+    parser.add_argument('--speed', type=float, default=1000.0, help='Aceleração do relógio')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--link-drop-rate', type=float, default=1 / 7200,
+                        help='Probabilidade de queda do enlace por segundo')
+    parser.add_argument('--connect-failure-rate', type=float, default=0.05)
+    parser.add_argument('--ap-outage-every', type=float, default=6 * 3600)
+    parser.add_argument('--ap-outage-duration', type=float, default=600)
+    parser.add_argument('--degrade-every', type=float, default=3 * 3600)
+    parser.add_argument('--degrade-duration', type=float, default=300)
+    parser.add_argument('--sample-interval', type=float, default=5.0)
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--output', help='Arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env_file = os.path.join(tmp_dir, 'radio_env.json')
+        with open(env_file, 'w') as f:
+            json.dump(_environment(args), f)
+        os.environ.update({'RADIO_BACKEND': 'fake', 'FAKE_RADIO_ENV': env_file,
+                           'CONFIG_DIR': tmp_dir})
+
+        clocks.set_clock(clocks.ScaledClock(args.speed))
+        from main import WiFiManagerSystem
+
+        system = WiFiManagerSystem()
+        system.config_manager.network_store.add_network(HOME_SSID, HOME_PASSWORD)
+        results = SoakRun(system, args).run()
+
+    results['parameters'] = vars(args)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Marcos do caminho crítico do boot (início do processo até online ou portal)
+
+Cada marco guarda só a primeira ocorrência, em segundos desde o início do
+processo (lido de /proc, incluindo o tempo de carga do interpretador), para
+acompanhar a latência de boot entre versões.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from metrics import BOOT_MILESTONE
+
+logger = logging.getLogger(__name__)
+
+# Marcos na ordem esperada; 'portal_up' substitui os de conexão quando o Wi-Fi falha
+MILESTONES = ('first_http_200', 'associated', 'ip', 'online', 'portal_up')
+
+# Fases (do backend que conectou) cujo fim marca cada etapa da conexão, em ordem de preferência
+CONNECT_MILESTONES = (
+    ('associated', ('handshake', 'association', 'nmcli')),
+    ('ip', ('dhcp', 'nmcli')),
+    ('online', ('connectivity',)),
+)
+
+
+def process_start_monotonic() -> float:
+    """Instante (time.monotonic) em que o processo foi criado"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Campos após o nome do executável; starttime é o 22º campo do stat
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        return time.monotonic() - max(age, 0.0)
+    except (OSError, ValueError, IndexError):
+        return time.monotonic()
+
+
+class BootMilestones:
+    """Primeira ocorrência de cada marco do boot"""
+
+    def __init__(self):
+        self.started = process_start_monotonic()
+        self.started_at = time.time() - (time.monotonic() - self.started)
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str, at: float = None) -> bool:
+        """Registra o marco (instante time.monotonic, padrão agora); False se já registrado"""
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            if name in self._marks:
+                return False
+            elapsed = self._marks[name] = max(at - self.started, 0.0)
+        BOOT_MILESTONE.set(round(elapsed, 3), milestone=name)
+        logger.info(f"Boot: {name} em {elapsed:.2f}s")
+        return True
+
+    def mark_connected(self, attempt=None, started: float = None):
+        """Marcos de conexão a partir das fases da tentativa bem-sucedida iniciada em 'started'"""
+        now = time.monotonic()
+        ends = {}
+        if attempt is not None and started is not None:
+            offset = 0.0
+            for backend, phase, seconds in attempt.phases:
+                offset += seconds
+                if backend == attempt.backend:
+                    ends[phase] = min(started + offset, now)
+        for name, phases in CONNECT_MILESTONES:
+            self.mark(name, next((ends[phase] for phase in phases if phase in ends), now))
+
+    def elapsed(self, name: str) -> Optional[float]:
+        return self._marks.get(name)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            marks = dict(self._marks)
+        outcome = 'online' if 'online' in marks else 'portal' if 'portal_up' in marks else None
+        return {
+            'process_start': self.started_at,
+            'uptime': round(time.monotonic() - self.started, 3),
+            'outcome': outcome,
+            'milestones': {name: round(marks[name], 3) for name in MILESTONES if name in marks}
+        }
+
+
+BOOT = BootMilestones()
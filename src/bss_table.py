@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Tabela de BSS vistos nos scans, agrupada por SSID
+
+Cada BSS (AP físico) é indexado pelo BSSID real; a visão por SSID guarda o
+melhor AP e o sinal de todos os APs da rede. A lista exibida na interface é
+deduplicada por SSID e ordenada por uma pontuação configurável, extraindo
+só os K primeiros com heap (sem ordenar a tabela inteira a cada página).
+
+A tabela é versionada: cada scan que altera a visão por SSID (rede nova,
+rede sumida ou sinal que andou mais que o limiar) incrementa a versão, e
+um cliente que guarda o cursor recebe só as diferenças desde então.
+"""
+
+import os
+import sys
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import clocks
+
+logger = logging.getLogger(__name__)
+
+
+class BssEntry:
+    """Último estado observado de um BSS"""
+
+    __slots__ = ('key', 'bssid', 'ssid', 'frequency', 'channel', 'signal_strength',
+                 'signal_dbm', 'security', 'encrypted', 'first_seen', 'last_seen')
+
+    def __init__(self, key: str, network: Dict, now: float):
+        self.key = key
+        self.first_seen = now
+        self.update(network, now)
+
+    def update(self, network: Dict, now: float):
+        self.bssid = network.get('bssid')
+        # SSIDs e tipos de segurança se repetem em cada scan: uma cópia só de cada string
+        ssid = network.get('ssid')
+        self.ssid = sys.intern(ssid) if ssid else ssid
+        self.frequency = network.get('frequency')
+        self.channel = network.get('channel')
+        self.signal_strength = network.get('signal_strength') or 0
+        self.signal_dbm = network.get('signal_dbm')
+        self.encrypted = bool(network.get('encrypted', True))
+        self.security = sys.intern(network.get('security') or ('WPA2' if self.encrypted else 'open'))
+        self.last_seen = now
+
+    def to_dict(self) -> Dict:
+        return {
+            'bssid': self.bssid,
+            'signal_strength': self.signal_strength,
+            'signal_dbm': self.signal_dbm,
+            'frequency': self.frequency,
+            'channel': self.channel
+        }
+
+
+class SsidGroup:
+    """APs de uma mesma rede; 'best' é o de sinal mais forte"""
+
+    __slots__ = ('ssid', 'best', 'aps')
+
+    def __init__(self, ssid: str):
+        self.ssid = ssid
+        self.best: Optional[BssEntry] = None
+        self.aps: List[BssEntry] = []
+
+    def add(self, entry: BssEntry):
+        self.aps.append(entry)
+        if self.best is None or entry.signal_strength > self.best.signal_strength:
+            self.best = entry
+
+    def to_dict(self) -> Dict:
+        best = self.best
+        return {
+            'ssid': self.ssid,
+            'bssid': best.bssid,
+            'signal_strength': best.signal_strength,
+            'signal_dbm': best.signal_dbm,
+            'frequency': best.frequency,
+            'channel': best.channel,
+            'encrypted': best.encrypted,
+            'security': best.security,
+            'ap_count': len(self.aps),
+            'aps': [ap.to_dict() for ap in sorted(self.aps, key=lambda ap: ap.signal_strength,
+                                                  reverse=True)]
+        }
+
+
+def score_signal(group: SsidGroup) -> float:
+    """Sinal do melhor AP"""
+    return group.best.signal_strength
+
+
+def score_band(group: SsidGroup) -> float:
+    """Sinal do melhor AP, com bônus para redes que oferecem 5 GHz"""
+    bonus = 10 if any((ap.frequency or 0) >= 5000 for ap in group.aps) else 0
+    return group.best.signal_strength + bonus
+
+
+SCORES = {'signal': score_signal, 'band': score_band}
+
+
+class BssTable:
+    """BSS indexados por BSSID, com expiração e ranking top-K por SSID"""
+
+    # BSS não visto por esse tempo sai da tabela (scans perdem APs fracos às vezes)
+    MAX_AGE = 60
+    # Variação de sinal (pontos percentuais) que conta como alteração nos deltas
+    SIGNAL_THRESHOLD = 5
+    # Redes removidas lembradas para deltas; cursores mais antigos recebem a lista completa
+    MAX_TOMBSTONES = 256
+
+    def __init__(self, score: Callable[[SsidGroup], float] = score_signal, max_age: float = MAX_AGE,
+                 signal_threshold: float = SIGNAL_THRESHOLD):
+        self.score = score
+        self.max_age = max_age
+        self.signal_threshold = signal_threshold
+        self._entries: Dict[str, BssEntry] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.updated_at = None
+
+        # Versionamento da visão por SSID
+        self.epoch = os.urandom(4).hex()  # cursores de outro processo são inválidos
+        self.version = 0
+        self._published: Dict[str, Dict] = {}    # SSID -> último estado publicado
+        self._created: Dict[str, int] = {}       # SSID -> versão em que apareceu
+        self._modified: Dict[str, int] = {}      # SSID -> versão da última alteração
+        self._removed: 'OrderedDict[str, int]' = OrderedDict()
+        self._horizon = 0  # menor cursor ainda respondível com delta
+
+    @staticmethod
+    def _key(network: Dict) -> Optional[str]:
+        # Fontes sem BSSID (arquivo compartilhado, airport) ficam uma entrada por SSID
+        bssid = network.get('bssid')
+        if bssid:
+            return bssid.lower()
+        ssid = network.get('ssid')
+        return f'ssid:{ssid}' if ssid else None
+
+    def update(self, networks: Iterable[Dict], now: float = None):
+        """Incorpora um scan e descarta BSS não vistos há mais de max_age"""
+        now = clocks.monotonic() if now is None else now
+        with self._lock:
+            for network in networks:
+                key = self._key(network)
+                if key is None:
+                    continue
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._entries[key] = BssEntry(key, network, now)
+                else:
+                    entry.update(network, now)
+            expired = [key for key, entry in self._entries.items()
+                       if now - entry.last_seen > self.max_age]
+            for key in expired:
+                del self._entries[key]
+            self.updated_at = now
+            self._publish()
+
+    def export(self, now: float = None) -> List[Dict]:
+        """BSS da tabela com a idade do último avistamento (para o snapshot de estado)"""
+        now = clocks.monotonic() if now is None else now
+        with self._lock:
+            return [{'bssid': entry.bssid, 'ssid': entry.ssid, 'frequency': entry.frequency,
+                     'channel': entry.channel, 'signal_strength': entry.signal_strength,
+                     'signal_dbm': entry.signal_dbm, 'security': entry.security,
+                     'encrypted': entry.encrypted, 'age': round(now - entry.last_seen, 1)}
+                    for entry in self._entries.values()]
+
+    def restore(self, entries: List[Dict], now: float = None) -> int:
+        """Recarrega BSS exportados (os ainda dentro de max_age); retorna quantos"""
+        now = clocks.monotonic() if now is None else now
+        restored = 0
+        with self._lock:
+            for network in entries:
+                key = self._key(network)
+                age = network.get('age', 0)
+                if key is None or key in self._entries or age > self.max_age:
+                    continue
+                self._entries[key] = BssEntry(key, network, now - age)
+                restored += 1
+            if restored:
+                self.updated_at = now - min(network.get('age', 0) for network in entries)
+                self._publish()
+        return restored
+
+    def _significant(self, published: Dict, current: Dict) -> bool:
+        return (abs(current['signal_strength'] - published['signal_strength']) >= self.signal_threshold
+                or current['ap_count'] != published['ap_count']
+                or current['encrypted'] != published['encrypted'])
+
+    def _publish(self):
+        """Compara a visão por SSID com a publicada e registra as diferenças (com o lock)"""
+        current = {group.ssid: group.to_dict() for group in self._group_entries()}
+        version = self.version + 1
+        changed = False
+
+        for ssid, data in current.items():
+            published = self._published.get(ssid)
+            if published is None:
+                self._created[ssid] = version
+                self._removed.pop(ssid, None)
+            elif not self._significant(published, data):
+                continue
+            self._published[ssid] = data
+            self._modified[ssid] = version
+            changed = True
+
+        for ssid in [ssid for ssid in self._published if ssid not in current]:
+            del self._published[ssid], self._created[ssid], self._modified[ssid]
+            self._removed[ssid] = version
+            changed = True
+        while len(self._removed) > self.MAX_TOMBSTONES:
+            _, forgotten = self._removed.popitem(last=False)
+            self._horizon = max(self._horizon, forgotten)
+
+        if changed:
+            self.version = version
+            self._changed.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _group_entries(self) -> List[SsidGroup]:
+        groups: Dict[str, SsidGroup] = {}
+        for entry in self._entries.values():
+            if not entry.ssid:
+                continue
+            group = groups.get(entry.ssid)
+            if group is None:
+                group = groups[entry.ssid] = SsidGroup(entry.ssid)
+            group.add(entry)
+        return list(groups.values())
+
+    def groups(self) -> List[SsidGroup]:
+        """Redes visíveis agrupadas por SSID (BSS ocultos ficam de fora)"""
+        with self._lock:
+            return self._group_entries()
+
+    def top(self, k: int, offset: int = 0) -> Tuple[List[SsidGroup], int]:
+        """As redes nas posições [offset, offset + k) do ranking e o total de redes"""
+        groups = self.groups()
+        ranked = heapq.nlargest(offset + k, groups, key=self.score)
+        return ranked[offset:], len(groups)
+
+    def page(self, limit: int, offset: int = 0) -> Dict:
+        """Página do ranking deduplicado, no formato da API"""
+        ranked, total = self.top(limit, offset)
+        return {
+            'networks': [group.to_dict() for group in ranked],
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'cursor': self.cursor
+        }
+
+    # ------------------------------------------------------------------
+    # Deltas
+    # ------------------------------------------------------------------
+
+    @property
+    def cursor(self) -> str:
+        return f'{self.epoch}.{self.version}'
+
+    def _parse_cursor(self, cursor: str) -> Optional[int]:
+        """Versão do cursor, ou None se for de outro processo ou inválido"""
+        epoch, _, version = (cursor or '').partition('.')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        return version if version <= self.version else None
+
+    def delta(self, cursor: str) -> Dict:
+        """Redes adicionadas, alteradas e removidas desde o cursor
+
+        Cursor desconhecido ou mais antigo que as remoções lembradas devolve
+        'reset' com todas as redes em 'added'.
+        """
+        with self._lock:
+            since = self._parse_cursor(cursor)
+            reset = since is None or since < self._horizon
+            if reset:
+                since = 0
+            added, changed = [], []
+            for ssid, version in self._modified.items():
+                if version <= since:
+                    continue
+                if self._created[ssid] > since:
+                    added.append(self._published[ssid])
+                else:
+                    changed.append(self._published[ssid])
+            removed = [] if reset else [ssid for ssid, version in self._removed.items()
+                                        if version > since]
+            return {'cursor': self.cursor, 'reset': reset, 'added': added,
+                    'changed': changed, 'removed': removed}
+
+    def wait_for_change(self, cursor: str, timeout: float) -> bool:
+        """Bloqueia até a versão passar do cursor (ou timeout); True se houve mudança"""
+        with self._lock:
+            since = self._parse_cursor(cursor)
+            if since is None or since < self.version:
+                return True
+            return self._changed.wait_for(lambda: self.version > since, timeout)
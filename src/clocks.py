@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Relógio injetável do processo
+
+Os módulos de decisão (loop principal, telemetria, preditor, roaming,
+backend simulado) leem o tempo e dormem por aqui. Em produção é o relógio
+do sistema; nos testes de longa duração um relógio acelerado comprime dias
+de operação em minutos.
+"""
+
+import time
+import heapq
+import threading
+from typing import Callable, List, Tuple
+
+
+class Clock:
+    """Relógio do sistema"""
+
+    speed = 1.0
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """Aguarda o evento por até 'timeout' segundos de relógio"""
+        return event.wait(timeout)
+
+
+class ScaledClock(Clock):
+    """Relógio acelerado: cada segundo real equivale a 'speed' segundos simulados"""
+
+    def __init__(self, speed: float = 1000.0, start: float = None):
+        self.speed = float(speed)
+        self._real_start = time.monotonic()
+        self._wall_start = time.time() if start is None else start
+        self._mono_start = self._real_start
+
+    def elapsed(self) -> float:
+        """Segundos simulados desde a criação"""
+        return (time.monotonic() - self._real_start) * self.speed
+
+    def time(self) -> float:
+        return self._wall_start + self.elapsed()
+
+    def monotonic(self) -> float:
+        return self._mono_start + self.elapsed()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        return event.wait(None if timeout is None else timeout / self.speed)
+
+
+_clock = Clock()
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Troca o relógio do processo (retorna o anterior)"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def now() -> float:
+    """Tempo de parede (equivalente a time.time())"""
+    return _clock.time()
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def wait(event: threading.Event, timeout: float) -> bool:
+    return _clock.wait(event, timeout)
+
+
+class Scheduler:
+    """Eventos agendados em tempo de relógio (monotonic), executados em ordem"""
+
+    def __init__(self):
+        self._queue: List[Tuple[float, int, Callable, float]] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def call_at(self, when: float, callback: Callable, interval: float = 0):
+        """Agenda a chamada para o instante 'when' (repete a cada 'interval', se > 0)"""
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._queue, (when, self._sequence, callback, interval))
+
+    def call_later(self, delay: float, callback: Callable, interval: float = 0):
+        self.call_at(monotonic() + delay, callback, interval)
+
+    def call_every(self, interval: float, callback: Callable):
+        self.call_later(interval, callback, interval)
+
+    def run_pending(self) -> int:
+        """Executa os eventos vencidos; retorna quantos foram executados"""
+        executed = 0
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > monotonic():
+                    return executed
+                when, _, callback, interval = heapq.heappop(self._queue)
+            callback()
+            executed += 1
+            if interval > 0:
+                self.call_at(when + interval, callback, interval)
+
+    def run_until(self, deadline: float, stop: threading.Event = None):
+        """Executa eventos até o instante 'deadline' (ou até 'stop')"""
+        while monotonic() < deadline and not (stop and stop.is_set()):
+            self.run_pending()
+            with self._lock:
+                next_at = self._queue[0][0] if self._queue else deadline
+            delay = min(next_at, deadline) - monotonic()
+            if delay > 0:
+                if stop is not None:
+                    wait(stop, delay)
+                else:
+                    sleep(delay)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Módulo executor de comandos externos
+
+Concentra as chamadas de curta duração (ip, iw, nmcli, wpa_cli, ping...) em um
+único ponto que conta e cronometra cada comando pelo nome, limita a
+concorrência e o tempo máximo por comando e reaproveita por um curto período
+o resultado de leituras idempotentes. Os processos de longa duração (hostapd,
+dnsmasq, ping contínuo, ip monitor) também passam por aqui, via spawn(), para
+entrar nas contagens e na gravação/reprodução de traces.
+"""
+
+import os
+import time
+import shutil
+import logging
+import select
+import resource
+import threading
+import subprocess
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from connect_timing import LatencyHistogram
+from metrics import SUBPROCESS_CACHE_HITS, SUBPROCESS_DURATION, SUBPROCESS_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+
+def _children_cpu_ms() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (usage.ru_utime + usage.ru_stime) * 1000
+
+
+class CommandStats:
+    """Contadores acumulados de um comando"""
+
+    __slots__ = ('count', 'errors', 'timeouts', 'cache_hits', 'cpu_ms', 'active', 'max_active', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cache_hits = 0
+        self.cpu_ms = 0.0
+        self.active = 0
+        self.max_active = 0
+        self.histogram = LatencyHistogram()
+
+
+class SpawnedProcess:
+    """Processo de longa duração iniciado pelo executor
+
+    A saída (quando pedida) é lida linha a linha, com prazo opcional; cada
+    linha entregue é gravada no trace quando há gravação.
+    """
+
+    def __init__(self, cmd: List[str], process: subprocess.Popen, recorder=None, spawn_id: int = None):
+        self.cmd = cmd
+        self.process = process
+        self.pid = process.pid
+        self._recorder = recorder
+        self._spawn_id = spawn_id
+        self._started = time.monotonic()
+        self._pending = ''
+        self._lines = deque()
+        self._eof = False
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.returncode
+
+    def readline(self, timeout: float = None) -> Optional[str]:
+        """Próxima linha da saída ('' no fim; None se o prazo esgotar)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._lines:
+            if self._eof:
+                return ''
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            fd = self.process.stdout.fileno()
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            try:
+                chunk = os.read(fd, 4096)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                # Fim da saída: o pipe é fechado por quem lê (stop() pode rodar em outra thread)
+                self._eof = True
+                self.process.stdout.close()
+                if self._pending:
+                    self._lines.append(self._pending)
+                    self._pending = ''
+                continue
+            self._pending += chunk.decode('utf-8', errors='replace')
+            *lines, self._pending = self._pending.split('\n')
+            self._lines.extend(lines)
+        line = self._lines.popleft()
+        if self._recorder is not None:
+            self._recorder.record_output(self._spawn_id, time.monotonic() - self._started, line)
+        return line + '\n'
+
+    def poll(self) -> Optional[int]:
+        return self.process.poll()
+
+    def wait(self, timeout: float = None) -> int:
+        return self.process.wait(timeout)
+
+    def terminate(self):
+        self.process.terminate()
+
+    def kill(self):
+        self.process.kill()
+
+    def stop(self, timeout: float = 2):
+        """Encerra o processo (SIGTERM, e SIGKILL se não sair no prazo)"""
+        try:
+            self.process.terminate()
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except OSError:
+            pass
+
+
+class CommandRunner:
+    """Executor instrumentado com limites de concorrência, timeouts e cache curto"""
+
+    DEFAULT_TIMEOUT = 10
+    DEFAULT_CONCURRENCY = 4
+
+    # Tempo máximo por comando (segundos), quando a chamada não informa
+    TIMEOUTS = {
+        'ip': 5, 'iw': 15, 'iwlist': 15, 'iwconfig': 5, 'nmcli': 30, 'wpa_cli': 10,
+        'wpa_supplicant': 15, 'ping': 10, 'pkill': 5, 'pgrep': 5, 'iptables': 5,
+        'dhclient': 15, 'dhcpcd': 15, 'udhcpc': 15
+    }
+    # Execuções simultâneas por comando (scans disputam o rádio; iptables não é reentrante)
+    CONCURRENCY = {'iwlist': 1, 'iw': 2, 'nmcli': 1, 'wpa_cli': 2, 'iptables': 1, 'ping': 4}
+    # Eventos mantidos para o relatório de orçamento
+    RECENT_EVENTS = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, CommandStats] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._cache: Dict[tuple, tuple] = {}
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._events = deque(maxlen=self.RECENT_EVENTS)  # (instante, nome, segundos, cpu_ms)
+        self.recorder = None  # TraceRecorder: grava a saída de cada comando
+        self.player = None    # TracePlayer: reproduz um trace em vez de executar
+        
+    def configure_trace(self, record: str = None, replay: str = None):
+        """Ativa a gravação e/ou a reprodução de traces (ver command_trace)"""
+        from command_trace import TracePlayer, TraceRecorder
+        if replay:
+            self.player = TracePlayer(replay)
+            logger.info(f"Reproduzindo comandos do trace {replay}")
+        if record:
+            self.recorder = TraceRecorder(record)
+            logger.info(f"Gravando comandos em {record}")
+            
+    def set_event_capacity(self, capacity: int):
+        """Redimensiona o histórico de eventos do relatório de orçamento (mantém os mais recentes)"""
+        with self._lock:
+            if capacity != self._events.maxlen:
+                self._events = deque(self._events, maxlen=capacity)
+            
+    @property
+    def replaying(self) -> bool:
+        return self.player is not None
+        
+    def available(self, name: str) -> bool:
+        """Comando disponível no sistema (ou presente no trace reproduzido)"""
+        if self.player is not None:
+            return self.player.available(name)
+        return shutil.which(name) is not None
+
+    def _stats_for(self, name: str) -> CommandStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CommandStats()
+            self._semaphores[name] = threading.BoundedSemaphore(
+                self.CONCURRENCY.get(name, self.DEFAULT_CONCURRENCY))
+        return stats
+
+    def run(self, cmd: Sequence[str], timeout: float = None, cache_ttl: float = 0,
+            input: str = None) -> subprocess.CompletedProcess:
+        """Executa o comando capturando a saída (texto); levanta TimeoutExpired como subprocess.run
+
+        Com cache_ttl > 0, o resultado é reaproveitado por esse tempo e chamadas
+        simultâneas do mesmo comando aguardam uma única execução.
+        """
+        cmd = list(cmd)
+        name = os.path.basename(cmd[0])
+        timeout = timeout if timeout is not None else self.TIMEOUTS.get(name, self.DEFAULT_TIMEOUT)
+        key = tuple(cmd) if cache_ttl > 0 else None
+
+        while key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    self._stats_for(name).cache_hits += 1
+                    SUBPROCESS_CACHE_HITS.inc(command=name)
+                    return cached[1]
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            waiter.wait(timeout)
+
+        try:
+            result = self._execute(name, cmd, timeout, input)
+            if key is not None:
+                with self._lock:
+                    self._cache[key] = (time.monotonic() + cache_ttl, result)
+            return result
+        finally:
+            if key is not None:
+                with self._lock:
+                    self._inflight.pop(key).set()
+
+    def _execute(self, name: str, cmd: List[str], timeout: float, input: Optional[str]):
+        with self._lock:
+            stats = self._stats_for(name)
+            semaphore = self._semaphores[name]
+
+        start = time.monotonic()
+        if not semaphore.acquire(timeout=timeout):
+            with self._lock:
+                stats.timeouts += 1
+            SUBPROCESS_TIMEOUTS.inc(command=name)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+
+        with self._lock:
+            stats.active += 1
+            stats.max_active = max(stats.max_active, stats.active)
+        cpu_before = _children_cpu_ms()
+        try:
+            remaining = max(timeout - (time.monotonic() - start), 0.1)
+            if self.player is not None:
+                result = self.player.replay(cmd, remaining)
+            else:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=remaining, input=input)
+            failed = result.returncode != 0
+            if self.recorder is not None:
+                self.recorder.record_command(cmd, time.monotonic() - start, result)
+            return result
+        except subprocess.TimeoutExpired:
+            with self._lock:
+                stats.timeouts += 1
+            SUBPROCESS_TIMEOUTS.inc(command=name)
+            failed = True
+            if self.recorder is not None:
+                self.recorder.record_command(cmd, time.monotonic() - start, error='timeout')
+            raise
+        except FileNotFoundError:
+            failed = True
+            if self.recorder is not None:
+                self.recorder.record_command(cmd, time.monotonic() - start, error='not_found')
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            semaphore.release()
+            elapsed = time.monotonic() - start
+            # Com execuções simultâneas o CPU dos filhos é atribuído de forma aproximada
+            cpu_ms = _children_cpu_ms() - cpu_before
+            with self._lock:
+                stats.active -= 1
+                stats.count += 1
+                stats.errors += failed
+                stats.cpu_ms += cpu_ms
+                stats.histogram.observe(elapsed)
+                self._events.append((time.monotonic(), name, elapsed, cpu_ms))
+            SUBPROCESS_DURATION.observe(elapsed, command=name)
+
+    def spawn(self, cmd: Sequence[str], output: bool = False):
+        """Inicia um processo de longa duração (serviço ou sonda contínua)
+
+        O início entra nas contagens do comando e no trace; com output, a
+        saída é lida por readline() e cada linha lida também é gravada. Na
+        reprodução nada é executado: o processo devolvido entrega as linhas
+        gravadas. Os limites de concorrência valem só para os comandos curtos.
+        Levanta FileNotFoundError como Popen.
+        """
+        cmd = list(cmd)
+        name = os.path.basename(cmd[0])
+        with self._lock:
+            stats = self._stats_for(name)
+        start = time.monotonic()
+        failed = True
+        try:
+            if self.player is not None:
+                process = self.player.spawn(cmd)
+            else:
+                try:
+                    popen = subprocess.Popen(cmd, stdout=subprocess.PIPE if output else subprocess.DEVNULL,
+                                             stderr=subprocess.DEVNULL)
+                except FileNotFoundError:
+                    if self.recorder is not None:
+                        self.recorder.record_spawn(cmd, error='not_found')
+                    raise
+                spawn_id = self.recorder.record_spawn(cmd) if self.recorder is not None else None
+                process = SpawnedProcess(cmd, popen, self.recorder, spawn_id)
+            failed = False
+            return process
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                stats.count += 1
+                stats.errors += failed
+                stats.histogram.observe(elapsed)
+                self._events.append((time.monotonic(), name, elapsed, 0.0))
+            SUBPROCESS_DURATION.observe(elapsed, command=name)
+
+    def invalidate(self):
+        """Descarta resultados em cache (após mudanças de estado da interface)"""
+        with self._lock:
+            self._cache.clear()
+
+    def budget_report(self, window: float = 60, ops_budget: float = None,
+                      cpu_budget_ms: float = None) -> Dict:
+        """Processos/s e CPU-ms/s na janela, comparados ao orçamento"""
+        if not 0 < window < float('inf'):
+            raise ValueError(f'janela inválida: {window}')
+        now = time.monotonic()
+        with self._lock:
+            events = [e for e in self._events if now - e[0] <= window]
+            commands = {}
+            for name, stats in self._stats.items():
+                mean = stats.histogram.sum / stats.count if stats.count else None
+                p90 = stats.histogram.quantile(0.9)
+                commands[name] = {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'timeouts': stats.timeouts,
+                    'cache_hits': stats.cache_hits,
+                    'mean_ms': round(mean * 1000, 1) if mean is not None else None,
+                    'p90_ms': round(p90 * 1000, 1) if p90 is not None else None,
+                    'cpu_ms': round(stats.cpu_ms, 1),
+                    'max_concurrency': stats.max_active,
+                    'concurrency_limit': self.CONCURRENCY.get(name, self.DEFAULT_CONCURRENCY)
+                }
+
+        ops_per_sec = len(events) / window
+        cpu_ms_per_sec = sum(e[3] for e in events) / window
+        report = {
+            'window': window,
+            'ops_per_sec': round(ops_per_sec, 3),
+            'cpu_ms_per_sec': round(cpu_ms_per_sec, 2),
+            'wall_ms_per_sec': round(sum(e[2] for e in events) * 1000 / window, 2),
+            'budget': {'ops_per_sec': ops_budget, 'cpu_ms_per_sec': cpu_budget_ms},
+            'within_budget': ((ops_budget is None or ops_per_sec <= ops_budget) and
+                              (cpu_budget_ms is None or cpu_ms_per_sec <= cpu_budget_ms)),
+            'commands': dict(sorted(commands.items(), key=lambda item: -item[1]['cpu_ms']))
+        }
+        if self.player is not None:
+            report['replay'] = self.player.get_stats()
+        if self.recorder is not None:
+            report['recording'] = {'path': self.recorder.path, 'records': self.recorder.records}
+        return report
+
+
+# Executor compartilhado pelo processo
+RUNNER = CommandRunner()
+if os.getenv('COMMAND_TRACE_RECORD') or os.getenv('COMMAND_TRACE_REPLAY'):
+    RUNNER.configure_trace(os.getenv('COMMAND_TRACE_RECORD'), os.getenv('COMMAND_TRACE_REPLAY'))
+
+
+def run(cmd: Sequence[str], timeout: float = None, cache_ttl: float = 0,
+        input: str = None) -> subprocess.CompletedProcess:
+    """Atalho para o executor compartilhado"""
+    return RUNNER.run(cmd, timeout=timeout, cache_ttl=cache_ttl, input=input)
+
+
+def spawn(cmd: Sequence[str], output: bool = False):
+    """Atalho para o executor compartilhado (processos de longa duração)"""
+    return RUNNER.spawn(cmd, output=output)
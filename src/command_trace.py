@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Gravação e reprodução da saída de comandos externos
+
+O modo de captura grava a saída bruta de cada comando executado pelo
+CommandRunner em um trace JSON Lines comprimido (gzip); o modo de
+reprodução devolve essas saídas de forma determinística, sem executar
+nada. Cada registro tem um campo 'kind': 'command' para as execuções
+curtas, 'spawn' e 'output' para os processos de longa duração (início e
+cada linha lida da saída, com o instante relativo ao início), de modo que
+outras fontes (netlink, socket de controle) possam ser gravadas no mesmo
+arquivo.
+
+    COMMAND_TRACE_RECORD=/tmp/campo.jsonl.gz   grava os comandos do processo
+    COMMAND_TRACE_REPLAY=/tmp/campo.jsonl.gz   reproduz o trace (RADIO_BACKEND=replay)
+"""
+
+import os
+import sys
+import gzip
+import json
+import logging
+import threading
+import subprocess
+from collections import Counter, defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import clocks
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+# Argumentos que precedem segredos (nunca gravados em claro)
+SECRET_ARGUMENTS = ('password', 'psk', 'wpa-psk', '802-11-wireless-security.psk')
+REDACTED = '***'
+
+
+def redact(cmd: Sequence[str]) -> List[str]:
+    """Comando com os segredos mascarados (também é a chave de reprodução)"""
+    cmd = list(cmd)
+    for index in range(len(cmd) - 1):
+        if cmd[index] in SECRET_ARGUMENTS:
+            cmd[index + 1] = REDACTED
+    return cmd
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    """Registros de um trace (gzip ou texto)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class TraceRecorder:
+    """Grava cada execução como uma linha JSON no trace comprimido"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        opener = gzip.open if path.endswith('.gz') else open
+        self._file = opener(path, 'at', encoding='utf-8')
+        self.records = 0
+        self._spawns = 0
+        self._write({'kind': 'header', 'version': TRACE_VERSION, 'time': clocks.now(),
+                     'platform': sys.platform})
+
+    def _write(self, record: Dict):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # Sincronizar o bloco comprimido: o trace permanece legível se o processo cair
+            self._file.flush()
+            self.records += 1
+
+    def record_command(self, cmd: Sequence[str], elapsed: float,
+                       result: subprocess.CompletedProcess = None, error: str = None):
+        record = {'kind': 'command', 'time': clocks.now(), 'cmd': redact(cmd),
+                  'elapsed': round(elapsed, 6)}
+        if result is not None:
+            record.update(returncode=result.returncode, stdout=result.stdout, stderr=result.stderr)
+        if error:
+            record['error'] = error
+        self._write(record)
+
+    def record_spawn(self, cmd: Sequence[str], error: str = None) -> int:
+        """Grava o início de um processo de longa duração; retorna o id das suas linhas"""
+        with self._lock:
+            self._spawns += 1
+            spawn_id = self._spawns
+        record = {'kind': 'spawn', 'time': clocks.now(), 'cmd': redact(cmd), 'spawn': spawn_id}
+        if error:
+            record['error'] = error
+        self._write(record)
+        return spawn_id
+
+    def record_output(self, spawn_id: int, offset: float, line: str):
+        self._write({'kind': 'output', 'spawn': spawn_id, 'offset': round(offset, 6), 'line': line})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayedProcess:
+    """Processo de longa duração reproduzido: entrega as linhas gravadas, sem executar nada"""
+
+    pid = None
+
+    def __init__(self, cmd: Sequence[str], lines: List[Tuple[float, str]], timing: bool = False,
+                 returncode: Optional[int] = None):
+        self.cmd = list(cmd)
+        self._lines = deque(lines)
+        self._timing = timing
+        self._started = clocks.monotonic()
+        self.returncode = returncode
+
+    def readline(self, timeout: float = None) -> Optional[str]:
+        """Próxima linha gravada ('' no fim; None se, com timing, o prazo esgotar antes)"""
+        if not self._lines:
+            if self.returncode is None:
+                self.returncode = 0
+            return ''
+        offset, line = self._lines[0]
+        if self._timing:
+            delay = offset - (clocks.monotonic() - self._started)
+            if timeout is not None and delay > timeout:
+                clocks.sleep(timeout)
+                return None
+            if delay > 0:
+                clocks.sleep(delay)
+        self._lines.popleft()
+        return line + '\n'
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> Optional[int]:
+        return self.returncode
+
+    def stop(self, timeout: float = 2):
+        self._lines.clear()
+        if self.returncode is None:
+            self.returncode = -15
+
+    terminate = kill = stop
+
+
+class TracePlayer:
+    """Reproduz as saídas gravadas, por comando, na ordem em que ocorreram
+
+    Cada comando tem sua própria fila; ao esgotá-la a reprodução recomeça do
+    início, então ciclos de monitoramento longos continuam determinísticos.
+    Processos de longa duração seguem a mesma regra, um início por vez.
+    """
+
+    def __init__(self, path: str, timing: bool = False):
+        self.path = path
+        # Reproduzir também a duração gravada (pelo relógio do processo)
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._records: Dict[Tuple[str, ...], List[Dict]] = defaultdict(list)
+        self._positions: Dict[Tuple[str, ...], int] = defaultdict(int)
+        # Processos de longa duração: comando -> [(início, [(instante, linha)])]
+        self._spawns: Dict[Tuple[str, ...], List[Tuple[Dict, List]]] = defaultdict(list)
+        self._spawn_positions: Dict[Tuple[str, ...], int] = defaultdict(int)
+        self.commands = set()
+        self.misses = Counter()
+        self.replayed = 0
+        outputs: Dict[int, List[Tuple[float, str]]] = {}
+        for record in read_trace(path):
+            kind = record.get('kind')
+            if kind == 'command':
+                self._records[tuple(record['cmd'])].append(record)
+                self.commands.add(os.path.basename(record['cmd'][0]))
+            elif kind == 'spawn':
+                lines = outputs[record['spawn']] = []
+                self._spawns[tuple(record['cmd'])].append((record, lines))
+                self.commands.add(os.path.basename(record['cmd'][0]))
+            elif kind == 'output' and record.get('spawn') in outputs:
+                outputs[record['spawn']].append((record.get('offset', 0), record['line']))
+        logger.info(f"Trace {path}: {sum(len(r) for r in self._records.values())} execuções "
+                    f"de {len(self._records)} comandos distintos")
+
+    def available(self, name: str) -> bool:
+        """O comando aparece no trace (substitui shutil.which na reprodução)"""
+        return name in self.commands
+
+    def replay(self, cmd: Sequence[str], timeout: float) -> subprocess.CompletedProcess:
+        key = tuple(redact(cmd))
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                self.misses[' '.join(key)] += 1
+                record = None
+            else:
+                position = self._positions[key]
+                record = records[position % len(records)]
+                self._positions[key] = position + 1
+                self.replayed += 1
+
+        if record is None:
+            logger.debug(f"Comando sem registro no trace: {' '.join(key)}")
+            return subprocess.CompletedProcess(list(cmd), 127, '', 'sem registro no trace\n')
+        if self.timing:
+            clocks.sleep(min(record.get('elapsed', 0), timeout))
+        if record.get('error') == 'timeout':
+            raise subprocess.TimeoutExpired(list(cmd), timeout)
+        if record.get('error') == 'not_found':
+            raise FileNotFoundError(2, 'No such file or directory', cmd[0])
+        return subprocess.CompletedProcess(list(cmd), record.get('returncode', 0),
+                                           record.get('stdout', ''), record.get('stderr', ''))
+
+    def spawn(self, cmd: Sequence[str]) -> ReplayedProcess:
+        """Próximo início gravado do processo (sem registro: encerrado com código 127)"""
+        key = tuple(redact(cmd))
+        with self._lock:
+            spawns = self._spawns.get(key)
+            if not spawns:
+                self.misses[' '.join(key)] += 1
+                spawned = None
+            else:
+                position = self._spawn_positions[key]
+                spawned = spawns[position % len(spawns)]
+                self._spawn_positions[key] = position + 1
+                self.replayed += 1
+
+        if spawned is None:
+            logger.debug(f"Processo sem registro no trace: {' '.join(key)}")
+            return ReplayedProcess(cmd, [], returncode=127)
+        record, lines = spawned
+        if record.get('error') == 'not_found':
+            raise FileNotFoundError(2, 'No such file or directory', cmd[0])
+        return ReplayedProcess(cmd, lines, self.timing)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'path': self.path, 'commands': len(self._records), 'replayed': self.replayed,
+                    'misses': dict(self.misses.most_common(20))}
+
+
+def summarize(path: str) -> Dict:
+    """Execuções e duração total por comando de um trace"""
+    counts, elapsed, sizes = Counter(), Counter(), Counter()
+    for record in read_trace(path):
+        if record.get('kind') != 'command':
+            continue
+        name = os.path.basename(record['cmd'][0])
+        counts[name] += 1
+        elapsed[name] += record.get('elapsed', 0)
+        sizes[name] += len(record.get('stdout') or '')
+    return {name: {'count': counts[name], 'elapsed_s': round(elapsed[name], 3),
+                   'stdout_bytes': sizes[name]} for name, _ in counts.most_common()}
+
+
+def extract(path: str, command: str) -> Iterator[str]:
+    """Saídas (stdout) de um comando, para fixtures de parsers"""
+    for record in read_trace(path):
+        if record.get('kind') == 'command' and ' '.join(record['cmd']).startswith(command):
+            if record.get('stdout'):
+                yield record['stdout']
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspeciona traces de comandos')
+    parser.add_argument('trace')
+    parser.add_argument('--extract', metavar='COMANDO',
+                        help="Imprime as saídas do comando (ex.: 'iwlist wlan0 scan')")
+    args = parser.parse_args()
+    if args.extract:
+        for output in extract(args.trace, args.extract):
+            print(output)
+    else:
+        print(json.dumps(summarize(args.trace), indent=2))
@@ -5,16 +5,20 @@ Módulo para gerenciamento de configurações
 
 import os
 import json
+import time
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from network_store import NetworkStore
 
 logger = logging.getLogger(__name__)
 
 class ConfigManager:
     def __init__(self):
-        self.config_dir = '/app/config'
+        self.config_dir = os.getenv('CONFIG_DIR', '/app/config')
         self.wifi_config_file = os.path.join(self.config_dir, 'wifi_config.json')
         self.system_config_file = os.path.join(self.config_dir, 'system_config.json')
+        self.saved_networks_file = os.path.join(self.config_dir, 'saved_networks.json')
         
         # Criar diretório se não existir
         os.makedirs(self.config_dir, exist_ok=True)
@@ -22,6 +26,10 @@ class ConfigManager:
         # Carregar configurações padrão
         self._load_default_configs()
         
+        # Redes salvas (múltiplas redes indexadas por SSID)
+        self.network_store = NetworkStore(self.saved_networks_file)
+        self._migrate_legacy_wifi_config()
+        
     def _load_default_configs(self):
         """Carrega configurações padrão"""
         default_system_config = {
@@ -32,13 +40,46 @@ class ConfigManager:
             'check_interval': 10,
             'max_failures': 3,
             'auto_reconnect': True,
-            'log_level': 'INFO'
+            'log_level': 'INFO',
+            'roaming_enabled': True,
+            'roaming_scan_interval': 60,
+            'roaming_hysteresis_db': 8,
+            'telemetry_interval': 1,
+            'telemetry_station_interval': 5,
+            'command_ops_budget': 5,
+            'command_cpu_budget_ms': 50,
+            'scan_ranking': 'signal',
+            'scan_page_size': 30,
+            'scan_refresh_interval': 10,
+            'history_flush_interval': 5,
+            'history_raw_days': 2,
+            'history_retention_days': 30,
+            'history_max_mb': 32,
+            'state_snapshot_interval': 30,
+            'state_snapshot_max_age': 300,
+            'boot_fast_path': True,
+            'web_enabled': True,
+            'memory_profile': 'default',
+            'log_max_mb': 5,
+            'log_rotate_hours': 24,
+            'log_backups': 5,
+            'log_repeat_window': 60,
+            'log_buffer_size': 1000
         }
         
         # Criar arquivo de configuração do sistema se não existir
         if not os.path.exists(self.system_config_file):
             self.save_system_config(default_system_config)
             
+    def _migrate_legacy_wifi_config(self):
+        """Importa a rede única de wifi_config.json para as redes salvas"""
+        if len(self.network_store) > 0:
+            return
+        wifi_config = self.get_wifi_config()
+        if wifi_config and wifi_config.get('ssid'):
+            self.network_store.add_network(wifi_config['ssid'], wifi_config.get('password'))
+            logger.info(f"Rede {wifi_config['ssid']} migrada para redes salvas")
+            
     def get_wifi_config(self) -> Optional[Dict]:
         """Retorna configuração Wi-Fi salva"""
         try:
@@ -52,18 +93,20 @@ class ConfigManager:
             logger.error(f"Erro ao carregar configuração Wi-Fi: {e}")
             return None
             
-    def save_wifi_config(self, ssid: str, password: str = None) -> bool:
+    def save_wifi_config(self, ssid: str, password: str = None, priority: int = None) -> bool:
         """Salva configuração Wi-Fi"""
         try:
             config = {
                 'ssid': ssid,
                 'password': password,
-                'saved_at': str(os.time())
+                'saved_at': str(time.time())
             }
             
             with open(self.wifi_config_file, 'w') as f:
                 json.dump(config, f, indent=2)
                 
+            self.network_store.add_network(ssid, password, priority)
+            
             logger.info(f"Configuração Wi-Fi salva para rede: {ssid}")
             return True
             
@@ -108,6 +151,9 @@ class ConfigManager:
     def delete_wifi_config(self) -> bool:
         """Remove configuração Wi-Fi salva"""
         try:
+            wifi_config = self.get_wifi_config()
+            if wifi_config and wifi_config.get('ssid'):
+                self.network_store.remove_network(wifi_config['ssid'])
             if os.path.exists(self.wifi_config_file):
                 os.remove(self.wifi_config_file)
                 logger.info("Configuração Wi-Fi removida")
@@ -116,10 +162,23 @@ class ConfigManager:
             logger.error(f"Erro ao remover configuração Wi-Fi: {e}")
             return False
             
+    def get_saved_networks(self) -> List[Dict]:
+        """Retorna redes salvas (sem senhas) ordenadas por prioridade"""
+        return [net.to_dict(include_password=False) for net in self.network_store.list_networks()]
+        
+    def delete_saved_network(self, ssid: str) -> bool:
+        """Remove uma rede salva"""
+        removed = self.network_store.remove_network(ssid)
+        wifi_config = self.get_wifi_config()
+        if wifi_config and wifi_config.get('ssid') == ssid and os.path.exists(self.wifi_config_file):
+            os.remove(self.wifi_config_file)
+        return removed
+            
     def get_all_configs(self) -> Dict:
         """Retorna todas as configurações"""
         return {
             'wifi': self.get_wifi_config(),
+            'saved_networks': self.get_saved_networks(),
             'system': self.get_system_config()
         }
         
@@ -154,7 +213,7 @@ class ConfigManager:
                 return False
                 
             # Fazer backup da configuração atual
-            current_backup = f"{self.config_dir}_backup_{int(os.time())}"
+            current_backup = f"{self.config_dir}_backup_{int(time.time())}"
             shutil.copytree(self.config_dir, current_backup)
             
             # Extrair backup
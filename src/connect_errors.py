@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Classificação das falhas de conexão Wi-Fi
+
+A causa vem, de preferência, da própria tentativa: os backends registram
+um motivo estruturado (código de saída do nmcli, eventos do wpa_supplicant,
+prazo estourado em uma fase). Só quando o motivo é inconclusivo os logs do
+sistema são consultados: apenas as linhas escritas depois do início da
+tentativa (cursor tomado em ConnectTimings.begin), com bytes examinados
+limitados e um único regex pré-compilado com todas as assinaturas, de modo
+que o custo por falha não depende do tamanho do log. Do syslog só contam as
+linhas dos serviços de rede (wpa_supplicant, NetworkManager, clientes DHCP)
+que citam a interface gerenciada: sshd, postfix e outras interfaces também
+registram falhas de autenticação e de DHCP.
+
+O log deste gerenciador não é consultado: ele repete os motivos já
+registrados e as mensagens de falha de tentativas anteriores.
+"""
+
+import re
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from log_reader import LogReader
+
+logger = logging.getLogger(__name__)
+
+# Tipos de erro apresentados na interface (mensagem e sugestões)
+ERROR_TYPES = {
+    'authentication': {
+        'error': 'Falha na autenticação - senha incorreta ou método de segurança incompatível',
+        'suggestions': [
+            'Verifique se a senha está correta',
+            'Certifique-se de que a rede usa WPA/WPA2',
+            'Tente novamente em alguns minutos'
+        ]
+    },
+    'network_not_found': {
+        'error': 'Rede não encontrada',
+        'suggestions': [
+            'Execute um novo scan de redes',
+            'Verifique se está dentro do alcance da rede',
+            'Confirme se o nome da rede está correto'
+        ]
+    },
+    'connection_failed': {
+        'error': 'Falha na conexão - ponto de acesso rejeitou a conexão',
+        'suggestions': [
+            'A rede pode estar sobrecarregada',
+            'Tente novamente em alguns momentos',
+            'Verifique se a rede permite novos dispositivos'
+        ]
+    },
+    'dhcp_failed': {
+        'error': 'Falha ao obter endereço IP',
+        'suggestions': [
+            'A rede pode estar com problemas de DHCP',
+            'Tente desconectar e conectar novamente',
+            'Verifique se a rede não exige configuração manual'
+        ]
+    },
+    'no_internet': {
+        'error': 'Conectado à rede, mas sem acesso à internet',
+        'suggestions': [
+            'Verifique se o roteador está conectado à internet',
+            'A rede pode exigir login em um portal (captive portal)',
+            'Tente novamente em alguns momentos'
+        ]
+    },
+    'generic': {
+        'error': 'Falha na conexão Wi-Fi - erro não especificado',
+        'suggestions': [
+            'Verifique se a senha está correta',
+            'Confirme se está dentro do alcance da rede',
+            'Tente executar um novo scan de redes',
+            'Verifique se a rede aceita novos dispositivos'
+        ]
+    }
+}
+
+# Motivos estruturados -> tipo de erro, do mais específico para o menos específico
+REASONS = {
+    'wrong_key': 'authentication',
+    'auth_rejected': 'authentication',
+    'handshake_timeout': 'authentication',
+    'ssid_not_found': 'network_not_found',
+    'assoc_rejected': 'connection_failed',
+    'dhcp_failed': 'dhcp_failed',
+    'no_connectivity': 'no_internet',
+    'assoc_timeout': 'connection_failed',
+    'activation_failed': 'connection_failed',
+    'timeout': 'connection_failed',
+    'backend_error': 'generic',
+    'unknown': 'generic'
+}
+
+# Motivos que não explicam a falha: os logs recentes podem trazer um mais específico
+INCONCLUSIVE = frozenset(('activation_failed', 'timeout', 'backend_error', 'unknown'))
+
+# Códigos de saída do nmcli (man nmcli, "EXIT STATUS")
+NMCLI_EXIT_REASONS = {
+    3: 'timeout',               # prazo (--wait) estourado
+    4: 'activation_failed',     # falha na ativação da conexão
+    8: 'backend_error',         # NetworkManager não está em execução
+    10: 'ssid_not_found'        # conexão, dispositivo ou ponto de acesso inexistente
+}
+
+# Assinaturas nos logs e nas mensagens de erro do wpa_supplicant e do
+# NetworkManager. Estritas de propósito: 'auth' ou 'dhcp' sozinhos casam com
+# linhas de sucesso e com nomes de processo; textos em português casariam com
+# as mensagens que este gerenciador gera a partir da própria classificação.
+SIGNATURES = {
+    'wrong_key': (
+        r'reason=WRONG_KEY',
+        r'4-Way Handshake failed',
+        r'pre-shared key may be incorrect',
+        r'Secrets were required'
+    ),
+    'auth_rejected': (
+        r'CTRL-EVENT-AUTH-REJECT',
+        r'reason=AUTH_FAILED'
+    ),
+    'handshake_timeout': (
+        r'CTRL-EVENT-DISCONNECTED\b[^\n]*\breason=15\b',
+        r'4-way handshake timeout'
+    ),
+    'ssid_not_found': (
+        r'CTRL-EVENT-NETWORK-NOT-FOUND',
+        r'No network with SSID',
+        r'network could not be found'
+    ),
+    'assoc_rejected': (
+        r'CTRL-EVENT-ASSOC-REJECT',
+        r'association rejected'
+    ),
+    'dhcp_failed': (
+        r'IP configuration could not be reserved',
+        r'DHCP(?:v4)? (?:transaction )?(?:failed|timed out|timeout)',
+        r'no (?:DHCP)?OFFERS? received'
+    ),
+    'assoc_timeout': (
+        r'Association request to the driver failed',
+        r'authentication with \S+ timed out'
+    )
+}
+
+_MATCHER = re.compile('|'.join(f"(?P<{reason}>{'|'.join(patterns)})"
+                               for reason, patterns in SIGNATURES.items()), re.IGNORECASE)
+_RANK = {reason: rank for rank, reason in enumerate(REASONS)}
+
+# Logs do sistema consultados quando o motivo registrado é inconclusivo
+# (o log do wpa_supplicant é o da instância iniciada para a interface)
+SUPPLICANT_LOG = '/tmp/wpa_supplicant.log'
+SYSLOG = '/var/log/syslog'
+LOG_FILES = (SUPPLICANT_LOG, SYSLOG)
+# Processos cujas linhas do syslog podem explicar a falha
+SYSLOG_SOURCES = ('wpa_supplicant', 'NetworkManager', 'dhclient', 'dhcpcd', 'udhcpc')
+_SYSLOG_SOURCE = re.compile(r'\s(?:%s)(?:\[\d+\])?:' % '|'.join(SYSLOG_SOURCES))
+# Linhas finais lidas de cada log e bytes examinados por leitura
+TAIL_LINES = 40
+TAIL_SCAN_BYTES = 64 * 1024
+# Texto examinado por linha (linhas gigantes não aumentam o custo)
+MAX_LINE_CHARS = 512
+
+
+def match_reason(text: str) -> Optional[str]:
+    """Motivo da primeira assinatura encontrada no texto (None se nenhuma)"""
+    match = _MATCHER.search(text, 0, MAX_LINE_CHARS)
+    return match.lastgroup if match else None
+
+
+def most_specific(reasons: Iterable[Optional[str]]) -> Optional[str]:
+    """O motivo mais específico entre os informados"""
+    found = [reason for reason in reasons if reason in _RANK]
+    return min(found, key=_RANK.__getitem__) if found else None
+
+
+def scan_lines(lines: Iterable[str]) -> Optional[str]:
+    """Motivo mais específico encontrado nas linhas"""
+    return most_specific(match_reason(line) for line in lines)
+
+
+def nmcli_reason(returncode: int, stderr: str) -> str:
+    """Motivo de uma falha do 'nmcli dev wifi connect' (mensagem, senão código de saída)"""
+    return match_reason(stderr or '') or NMCLI_EXIT_REASONS.get(returncode, 'unknown')
+
+
+def describe(reason: Optional[str], backend: str = None, detail: str = None) -> Dict:
+    """Resposta da interface (tipo, mensagem e sugestões) para um motivo"""
+    error_type = REASONS.get(reason or 'unknown', 'generic')
+    info = ERROR_TYPES[error_type]
+    return {
+        'type': error_type,
+        'reason': reason or 'unknown',
+        'backend': backend,
+        'detail': detail,
+        'error': info['error'],
+        'suggestions': list(info['suggestions'])
+    }
+
+
+def log_cursors() -> Dict[str, int]:
+    """Fim atual de cada log do sistema (0 se ainda não existe), tomado no início da tentativa"""
+    return {path: LogReader(path, TAIL_SCAN_BYTES).cursor() for path in LOG_FILES}
+
+
+def lines_since(reader: LogReader, cursor: int) -> List[str]:
+    """Linhas escritas depois do cursor, com no máximo duas leituras limitadas
+
+    A primeira lê a partir do cursor; se o que foi escrito passar do limite de
+    bytes, as últimas linhas vêm do tail, desde que todas posteriores ao cursor.
+    """
+    result = reader.after(cursor, LogReader.MAX_LINES)
+    lines = result['lines']
+    if result['more']:
+        tail = reader.tail(TAIL_LINES)
+        if tail['start'] >= cursor:
+            lines = lines + tail['lines']
+    return lines
+
+
+def syslog_lines(lines: Iterable[str], interface: str) -> List[str]:
+    """Linhas do syslog escritas pelos serviços de rede e que citam a interface"""
+    mentions = re.compile(r'(?<![\w.-])%s(?![\w.-])' % re.escape(interface))
+    return [line for line in lines if _SYSLOG_SOURCE.search(line, 0, MAX_LINE_CHARS)
+            and mentions.search(line, 0, MAX_LINE_CHARS)]
+
+
+def classify(failures: List[Tuple[str, str, Optional[str]]] = None, cursors: Dict[str, int] = None,
+             interface: str = None) -> Dict:
+    """Classifica uma tentativa pelos motivos (backend, motivo, detalhe) registrados
+
+    cursors (log -> offset no início da tentativa, de log_cursors) limita a
+    consulta aos logs, feita só quando nenhum motivo conclusivo foi registrado.
+    O syslog só é consultado com a interface gerenciada informada.
+    """
+    failures = failures or []
+    reason = most_specific(reason for _, reason, _ in failures)
+    if (reason is None or reason in INCONCLUSIVE) and cursors:
+        logged = None
+        for path, cursor in cursors.items():
+            if path == SYSLOG and not interface:
+                continue
+            try:
+                lines = lines_since(LogReader(path, TAIL_SCAN_BYTES), cursor)
+                if path == SYSLOG:
+                    lines = syslog_lines(lines, interface)
+                logged = most_specific((logged, scan_lines(lines)))
+            except Exception as e:
+                logger.debug(f"Log {path} indisponível para classificar a falha: {e}")
+        if logged is not None:
+            return describe(logged, 'log')
+    for backend, failure_reason, detail in failures:
+        if failure_reason == reason:
+            return describe(reason, backend, detail)
+    return describe(reason)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Módulo de medição por fases das tentativas de conexão Wi-Fi
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import clocks
+from connect_errors import log_cursors
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (segundos) dos buckets; o último bucket é +Inf
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+# Fases de uma tentativa, na ordem em que ocorrem
+PHASES = ('pre_scan', 'nmcli', 'supplicant_restart', 'association', 'handshake', 'dhcp', 'connectivity', 'total')
+
+
+class LatencyHistogram:
+    """Histograma de latência com buckets fixos (contagens, soma e total)"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Pares (limite, contagem acumulada), no formato 'le' do Prometheus"""
+        total, pairs = 0, []
+        for bound, value in zip(self.bounds + (float('inf'),), self.counts):
+            total += value
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa do quantil por interpolação dentro do bucket"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for bound, value in zip(self.bounds, self.counts):
+            if value and seen + value >= rank:
+                return lower + (bound - lower) * (rank - seen) / value
+            seen += value
+            lower = bound
+        return self.bounds[-1]
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 3) if value is not None else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 3) if self.count else None,
+            'p50': self._rounded(self.quantile(0.5)),
+            'p90': self._rounded(self.quantile(0.9)),
+            'buckets': {('+Inf' if b == float('inf') else str(b)): c for b, c in self.cumulative()}
+        }
+
+
+class ConnectAttempt:
+    """Fases cronometradas de uma chamada de connect()"""
+
+    def __init__(self, ssid: Optional[str] = None):
+        self.ssid = ssid
+        self.bssid = None
+        self.started_at = clocks.now()
+        self._start = clocks.monotonic()
+        self.phases: List[Tuple[str, str, float]] = []  # (backend, fase, segundos)
+        self.failures: List[Tuple[str, str, Optional[str]]] = []  # (backend, motivo, detalhe)
+        self.log_cursors: Dict[str, int] = {}  # fim de cada log do sistema no início da tentativa
+        self.backend = None
+        self.success = False
+        self.duration = None
+
+    def add(self, backend: str, phase: str, seconds: float):
+        self.phases.append((backend, phase, seconds))
+
+    def fail(self, backend: str, reason: str, detail: Optional[str] = None):
+        self.failures.append((backend, reason, detail[:200] if detail else None))
+
+    def finish(self, success: bool, backend: Optional[str] = None):
+        self.success = success
+        self.backend = backend
+        self.duration = clocks.monotonic() - self._start
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConnectAttempt':
+        attempt = cls(data.get('ssid'))
+        attempt.bssid = data.get('bssid')
+        attempt.started_at = data.get('started_at', attempt.started_at)
+        attempt.success = bool(data.get('success'))
+        attempt.backend = data.get('backend')
+        attempt.duration = data.get('duration')
+        attempt.phases = [(p['backend'], p['phase'], p['seconds']) for p in data.get('phases', [])]
+        attempt.failures = [(f['backend'], f['reason'], f.get('detail')) for f in data.get('failures', [])]
+        return attempt
+
+    def summary(self) -> str:
+        return ', '.join(f"{backend}/{phase}={seconds:.2f}s" for backend, phase, seconds in self.phases)
+
+    def to_dict(self) -> Dict:
+        return {
+            'ssid': self.ssid,
+            'bssid': self.bssid,
+            'started_at': self.started_at,
+            'success': self.success,
+            'backend': self.backend,
+            'duration': round(self.duration, 3) if self.duration is not None else None,
+            'phases': [{'backend': b, 'phase': p, 'seconds': round(s, 3)} for b, p, s in self.phases],
+            'failures': [{'backend': b, 'reason': r, 'detail': d} for b, r, d in self.failures]
+        }
+
+
+class ConnectTimings:
+    """Histogramas por fase, por backend e por rede das tentativas de conexão
+
+    A tentativa em andamento é de cada thread: um /connect da interface web e
+    uma reconexão do loop principal podem correr ao mesmo tempo, e as fases e
+    falhas registradas pelos backends vão para a tentativa da thread que chama.
+    """
+
+    # Redes com histogramas próprios (as menos recentes são descartadas)
+    MAX_NETWORKS = 32
+    MAX_RECENT = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()  # current/last: tentativa em andamento e a última da thread
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.networks: 'OrderedDict[str, Dict[Tuple[str, str], LatencyHistogram]]' = OrderedDict()
+        self.recent = deque(maxlen=self.MAX_RECENT)
+        self.attempts = 0
+        self.failures = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registra função chamada com cada tentativa encerrada (ConnectAttempt)"""
+        self._listeners.append(callback)
+
+    @property
+    def current(self) -> Optional[ConnectAttempt]:
+        """Tentativa em andamento na thread atual"""
+        return getattr(self._local, 'current', None)
+
+    @property
+    def last(self) -> Optional[ConnectAttempt]:
+        """Última tentativa iniciada na thread atual (em andamento ou encerrada)"""
+        return getattr(self._local, 'last', None)
+
+    def begin(self, ssid: Optional[str] = None) -> ConnectAttempt:
+        """Inicia a medição de uma nova tentativa na thread atual"""
+        attempt = ConnectAttempt(ssid)
+        attempt.log_cursors = log_cursors()
+        self._local.current = self._local.last = attempt
+        return attempt
+
+    @contextmanager
+    def phase(self, backend: str, phase: str):
+        """Cronometra uma fase da tentativa em andamento (sem tentativa, não registra)"""
+        attempt = self.current
+        start = clocks.monotonic()
+        try:
+            yield
+        finally:
+            if attempt is not None:
+                attempt.add(backend, phase, clocks.monotonic() - start)
+
+    def set_network(self, ssid: str):
+        """Define a rede da tentativa (quando escolhida após o pré-scan)"""
+        attempt = self.current
+        if attempt is not None:
+            attempt.ssid = ssid
+
+    def set_failure(self, backend: str, reason: str, detail: Optional[str] = None):
+        """Registra o motivo de falha de um backend na tentativa em andamento"""
+        attempt = self.current
+        if attempt is not None:
+            attempt.fail(backend, reason, detail)
+
+    def set_bssid(self, bssid: Optional[str]):
+        """Define o BSS da tentativa (o AP efetivamente associado)"""
+        attempt = self.current
+        if attempt is not None:
+            attempt.bssid = bssid
+
+    def finish(self, success: bool, backend: Optional[str] = None):
+        """Encerra a tentativa atual da thread e alimenta os histogramas"""
+        with self._lock:
+            attempt, self._local.current = self.current, None
+        if attempt is None:
+            return
+        if backend is None and success and attempt.phases:
+            # O backend que concluiu a conexão é o da última fase
+            backend = attempt.phases[-1][0]
+        attempt.finish(success, backend)
+        if attempt.phases:
+            logger.info(f"Fases da conexão a {attempt.ssid} ({'ok' if success else 'falha'}, "
+                        f"{attempt.duration:.2f}s): {attempt.summary()}")
+
+        with self._lock:
+            self.attempts += 1
+            if not success:
+                self.failures += 1
+            self.recent.append(attempt)
+
+            network = None
+            if attempt.ssid:
+                network = self.networks.pop(attempt.ssid, None) or {}
+                self.networks[attempt.ssid] = network
+                while len(self.networks) > self.MAX_NETWORKS:
+                    self.networks.popitem(last=False)
+
+            samples = list(attempt.phases)
+            samples.append((backend or 'none', 'total', attempt.duration))
+            for backend_name, phase, seconds in samples:
+                for table in (self.histograms, network):
+                    if table is None:
+                        continue
+                    key = (backend_name, phase)
+                    if key not in table:
+                        table[key] = LatencyHistogram()
+                    table[key].observe(seconds)
+
+        for callback in self._listeners:
+            try:
+                callback(attempt)
+            except Exception as e:
+                logger.error(f"Erro ao notificar tentativa de conexão: {e}")
+
+    def export(self) -> Dict:
+        """Contadores e últimas tentativas (para o snapshot de estado)"""
+        with self._lock:
+            return {'attempts': self.attempts, 'failures': self.failures,
+                    'recent': [attempt.to_dict() for attempt in self.recent]}
+
+    def restore(self, data: Dict) -> int:
+        """Recarrega contadores e últimas tentativas exportados; retorna quantas"""
+        with self._lock:
+            self.attempts += data.get('attempts', 0)
+            self.failures += data.get('failures', 0)
+            restored = [ConnectAttempt.from_dict(item) for item in data.get('recent', [])]
+            self.recent = deque(restored + list(self.recent), maxlen=self.MAX_RECENT)
+            return len(restored)
+
+    def items(self) -> List[Tuple[Tuple[str, str], LatencyHistogram]]:
+        """Histogramas globais ((backend, fase), histograma) para exportação"""
+        with self._lock:
+            return list(self.histograms.items())
+
+    def get_stats(self, ssid: str = None, backend: str = None) -> Dict:
+        """Histogramas (global ou de uma rede) e últimas tentativas"""
+        with self._lock:
+            table = self.networks.get(ssid, {}) if ssid else self.histograms
+            histograms = {}
+            for (backend_name, phase), histogram in sorted(table.items(),
+                                                           key=lambda item: (item[0][0], PHASES.index(item[0][1]))):
+                if backend and backend_name != backend:
+                    continue
+                histograms.setdefault(backend_name, {})[phase] = histogram.to_dict()
+            recent = [a.to_dict() for a in self.recent if not ssid or a.ssid == ssid]
+            return {
+                'attempts': self.attempts,
+                'failures': self.failures,
+                'networks': list(self.networks.keys()),
+                'histograms': histograms,
+                'recent': recent[-10:]
+            }
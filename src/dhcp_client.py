@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Módulo para obtenção de endereço IP via DHCP com reaproveitamento de lease
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+from command_runner import RUNNER, run as run_command
+
+logger = logging.getLogger(__name__)
+
+
+class DhcpClient:
+    """Cliente DHCP com lease por rede e detecção de endereço por eventos"""
+
+    # Clientes suportados, em ordem de preferência
+    SUPPORTED_CLIENTS = ('dhclient', 'dhcpcd', 'udhcpc')
+
+    def __init__(self, interface: str, lease_dir: str):
+        self.interface = interface
+        self.lease_dir = lease_dir
+        self.lease_index_file = os.path.join(lease_dir, 'leases.json')
+        self._client = None
+        self._lock = threading.Lock()
+
+        os.makedirs(lease_dir, exist_ok=True)
+        self._leases = self._load_leases()
+
+    def _load_leases(self) -> Dict:
+        """Carrega último endereço obtido em cada rede"""
+        try:
+            if os.path.exists(self.lease_index_file):
+                with open(self.lease_index_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.debug(f"Erro ao carregar índice de leases: {e}")
+        return {}
+
+    def _save_leases(self):
+        try:
+            tmp_file = self.lease_index_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self._leases, f, indent=2)
+            os.replace(tmp_file, self.lease_index_file)
+        except Exception as e:
+            logger.debug(f"Erro ao salvar índice de leases: {e}")
+
+    @staticmethod
+    def _network_key(ssid: str) -> str:
+        return hashlib.sha1(ssid.encode('utf-8')).hexdigest()[:16]
+
+    def _lease_file(self, ssid: str) -> str:
+        return os.path.join(self.lease_dir, f'dhclient-{self._network_key(ssid)}.lease')
+
+    def _pid_file(self) -> str:
+        return os.path.join(self.lease_dir, f'dhcp-{self.interface}.pid')
+
+    @property
+    def client(self) -> Optional[str]:
+        """Cliente DHCP disponível no sistema ou no trace reproduzido (detectado uma única vez)"""
+        if self._client is None:
+            self._client = next((c for c in self.SUPPORTED_CLIENTS if RUNNER.available(c)), '')
+            if self._client:
+                logger.info(f"Cliente DHCP selecionado: {self._client}")
+            else:
+                logger.warning("Nenhum cliente DHCP encontrado")
+        return self._client or None
+
+    def get_cached_lease(self, ssid: str) -> Optional[Dict]:
+        """Retorna o último lease conhecido da rede"""
+        return self._leases.get(self._network_key(ssid))
+
+    def _build_command(self, ssid: str, requested_ip: Optional[str]) -> List[str]:
+        """Monta comando do cliente DHCP (em background, oferecendo o último IP)"""
+        if self.client == 'dhclient':
+            # Com lease existente o dhclient começa em INIT-REBOOT (DHCPREQUEST direto)
+            return ['dhclient', '-nw', '-lf', self._lease_file(ssid),
+                    '-pf', self._pid_file(), self.interface]
+        if self.client == 'dhcpcd':
+            cmd = ['dhcpcd', '-4', '-b']
+            if requested_ip:
+                cmd += ['-r', requested_ip]
+            return cmd + [self.interface]
+        cmd = ['udhcpc', '-i', self.interface, '-b', '-p', self._pid_file()]
+        if requested_ip:
+            cmd += ['-r', requested_ip]
+        return cmd
+
+    def stop(self):
+        """Para o cliente DHCP da interface"""
+        for name in self.SUPPORTED_CLIENTS:
+            try:
+                run_command(['pkill', '-f', f'{name}.*{self.interface}'], timeout=5)
+            except Exception:
+                pass
+
+    def _wait_address_event(self, monitor, timeout: float) -> Optional[str]:
+        """Aguarda evento de novo endereço IPv4 na interface (ip monitor)
+
+        O monitor vem de RUNNER.spawn: ao reproduzir um trace, as linhas são as
+        gravadas, e o endereço sai do trace em vez de um evento real.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            line = monitor.readline(remaining)
+            if not line:
+                return None
+            parts = line.split()
+            # Formato: "3: wlan0    inet 192.168.1.20/24 brd ... scope global wlan0"
+            if line.startswith('Deleted') or self.interface not in parts or 'inet' not in parts:
+                continue
+            return parts[parts.index('inet') + 1].split('/')[0]
+
+    def acquire(self, ssid: str, timeout: float = 30) -> Dict:
+        """Obtém endereço IP para a rede, reaproveitando o lease anterior"""
+        with self._lock:
+            timings = {}
+            start = time.monotonic()
+            key = self._network_key(ssid)
+            cached = self._leases.get(key)
+            result = {
+                'success': False,
+                'ip': None,
+                'client': self.client,
+                'reused_lease': False,
+                'timings': timings
+            }
+
+            if not self.client:
+                return result
+
+            # Fase 1: parar cliente anterior e limpar endereço (o lease fica em disco)
+            self.stop()
+            run_command(['ip', '-4', 'addr', 'flush', 'dev', self.interface], timeout=5)
+            timings['stop_previous'] = time.monotonic() - start
+
+            monitor = None
+            try:
+                # Fase 2: iniciar monitor de endereços antes do cliente (evita corrida)
+                monitor = RUNNER.spawn(['ip', '-o', '-4', 'monitor', 'address'], output=True)
+                requested_ip = cached.get('ip') if cached else None
+                cmd = self._build_command(ssid, requested_ip)
+                phase_start = time.monotonic()
+                launch = run_command(cmd, timeout=15)
+                timings['client_start'] = time.monotonic() - phase_start
+                if launch.returncode != 0:
+                    logger.warning(f"Cliente DHCP falhou ({launch.returncode}): {launch.stderr.strip()}")
+                    return result
+
+                # Fase 3: aguardar o endereço (evento do kernel, sem polling do processo)
+                phase_start = time.monotonic()
+                ip = self._wait_address_event(monitor, timeout)
+                timings['address_wait'] = time.monotonic() - phase_start
+            except subprocess.TimeoutExpired:
+                logger.warning("Timeout ao iniciar cliente DHCP")
+                return result
+            finally:
+                if monitor is not None:
+                    monitor.stop()
+                timings['total'] = time.monotonic() - start
+
+            if not ip:
+                logger.warning(f"DHCP sem endereço após {timeout}s")
+                self.stop()
+                return result
+
+            result['success'] = True
+            result['ip'] = ip
+            result['reused_lease'] = bool(requested_ip) and ip == requested_ip
+            self._leases[key] = {'ip': ip, 'obtained_at': time.time()}
+            self._save_leases()
+
+            logger.info(f"DHCP: {ip} em {timings['total']:.2f}s via {self.client}"
+                        f"{' (lease reutilizado)' if result['reused_lease'] else ''}")
+            return result
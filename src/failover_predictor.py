@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Módulo de failover preditivo baseado em tendências da qualidade do enlace
+"""
+
+import math
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import clocks
+from link_telemetry import percentile
+from metrics import FAILOVERS, FAILOVER_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def _slope(samples: List[Tuple[float, float]]) -> Optional[float]:
+    """Inclinação (unidades/s) por mínimos quadrados, ignorando NaN"""
+    points = [(t, v) for t, v in samples if not math.isnan(v)]
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if var_t == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / var_t
+
+
+def _mean(samples: List[Tuple[float, float]]) -> Optional[float]:
+    values = [v for _, v in samples if not math.isnan(v)]
+    return sum(values) / len(values) if values else None
+
+
+class FailoverPredictor:
+    """Detecta colapso do enlace cedo e prepara o failover antes da queda completa"""
+
+    HEALTHY = 'healthy'
+    DEGRADING = 'degrading'
+    COLLAPSING = 'collapsing'
+
+    # Janela curta de tendência e janela longa de referência (segundos)
+    SHORT_WINDOW = 15
+    BASELINE_WINDOW = 300
+    # Limiares de colapso
+    RSSI_FLOOR = -80
+    RSSI_SLOPE = -1.0      # dB/s
+    LOSS_COLLAPSE = 0.5
+    LOSS_DEGRADED = 0.2
+    RTT_RATIO = 3.0
+    # Amostras sem estação associada para considerar o enlace perdido
+    MISSING_SAMPLES = 3
+    # Avaliações saudáveis seguidas para cancelar a preparação
+    RECOVERY_EVALUATIONS = 5
+
+    def __init__(self, wifi_monitor, hotspot_manager):
+        self.wifi_monitor = wifi_monitor
+        self.hotspot_manager = hotspot_manager
+        self.telemetry = wifi_monitor.telemetry
+
+        self.state = self.HEALTHY
+        self.state_since = clocks.monotonic()
+        self.reasons: List[str] = []
+        self.candidate = None
+        self.prepared = False
+        self.wakeup = threading.Event()
+
+        self._healthy_streak = 0
+        self._prepare_thread = None
+        self._lock = threading.Lock()
+
+        self.predictions = 0
+        self.cancelled = 0
+        self._outage_started = None
+        # Timestamp (relógio de parede) da primeira amostra da sequência atual sem
+        # associação ou com 100% de perda; None com o enlace de pé
+        self.link_lost_at: Optional[float] = None
+        self.outages = deque(maxlen=50)
+
+    def on_sample(self, now: float = None):
+        """Avalia as tendências após cada amostra de telemetria"""
+        if self.hotspot_manager.running:
+            # Em modo AP o station dump lista clientes, não o enlace de saída
+            self.link_lost_at = None
+            return
+        self._track_link_loss(clocks.now() if now is None else now)
+        state, reasons = self.evaluate(now)
+        self.reasons = reasons
+
+        if state == self.COLLAPSING and self.state != self.COLLAPSING:
+            self._set_state(state)
+            self.predictions += 1
+            logger.warning(f"Enlace em colapso ({', '.join(reasons)}): preparando failover")
+            self._start_prepare()
+            self.wakeup.set()
+        elif state == self.HEALTHY:
+            self._healthy_streak += 1
+            if self.state != self.HEALTHY and self._healthy_streak >= self.RECOVERY_EVALUATIONS:
+                if self.state == self.COLLAPSING:
+                    self.cancelled += 1
+                    logger.info("Enlace recuperado: cancelando preparação de failover")
+                self.cancel()
+        else:
+            self._healthy_streak = 0
+            if state == self.DEGRADING and self.state == self.HEALTHY:
+                self._set_state(state)
+
+    def _track_link_loss(self, now: float):
+        """Marca a primeira amostra sem associação ou com perda total (início real da queda)"""
+        latest = self.telemetry.latest()
+        lost = latest['signal_dbm'] is None or (latest['loss'] is not None and latest['loss'] >= 1.0)
+        if not lost:
+            self.link_lost_at = None
+        elif self.link_lost_at is None:
+            self.link_lost_at = now
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.state_since = clocks.monotonic()
+        if state != self.HEALTHY:
+            self._healthy_streak = 0
+
+    def evaluate(self, now: float = None) -> Tuple[str, List[str]]:
+        """Classifica o enlace a partir das janelas curta e de referência"""
+        now = clocks.now() if now is None else now
+        rssi = self.telemetry.series['signal_dbm'].query(self.SHORT_WINDOW, 'raw', now)
+        loss = self.telemetry.series['loss'].query(self.SHORT_WINDOW, 'raw', now)
+        rtt = self.telemetry.series['rtt_ms'].query(self.SHORT_WINDOW, 'raw', now)
+        rtt_baseline = self.telemetry.series['rtt_ms'].query(self.BASELINE_WINDOW, 'raw', now)
+
+        reasons = []
+        recent = rssi[-self.MISSING_SAMPLES:]
+        if len(recent) == self.MISSING_SAMPLES and all(math.isnan(v) for _, v in recent):
+            reasons.append('sem associação')
+
+        rssi_level = _mean(rssi[-3:])
+        rssi_slope = _slope(rssi)
+        if rssi_level is not None and rssi_slope is not None:
+            if rssi_level < self.RSSI_FLOOR and rssi_slope < self.RSSI_SLOPE:
+                reasons.append(f'sinal caindo {rssi_slope:.1f} dB/s em {rssi_level:.0f} dBm')
+
+        loss_mean = _mean(loss)
+        if loss_mean is not None and loss_mean >= self.LOSS_COLLAPSE:
+            reasons.append(f'perda {loss_mean:.0%}')
+
+        rtt_p90 = percentile([v for _, v in rtt], 90)
+        rtt_median = percentile([v for _, v in rtt_baseline], 50)
+        rtt_degraded = rtt_p90 is not None and rtt_median and rtt_p90 > self.RTT_RATIO * rtt_median
+        if rtt_degraded and loss_mean is not None and loss_mean >= self.LOSS_DEGRADED:
+            reasons.append(f'RTT p90 {rtt_p90:.0f} ms com perda {loss_mean:.0%}')
+
+        if reasons:
+            return self.COLLAPSING, reasons
+        if rtt_degraded or (loss_mean or 0) >= self.LOSS_DEGRADED or (rssi_level or 0) < self.RSSI_FLOOR:
+            return self.DEGRADING, []
+        return self.HEALTHY, []
+
+    def _start_prepare(self):
+        if self._prepare_thread is not None and self._prepare_thread.is_alive():
+            return
+        self._prepare_thread = threading.Thread(target=self._prepare, name='failover-prepare', daemon=True)
+        self._prepare_thread.start()
+
+    def _prepare(self):
+        """Pré-scan, candidatos aquecidos e configurações do hotspot prontas"""
+        try:
+            self.hotspot_manager.prepare()
+            candidate = self.wifi_monitor.find_best_known_network()
+            with self._lock:
+                if self.state != self.COLLAPSING:
+                    return
+                self.candidate = candidate
+                self.prepared = True
+            logger.info(f"Failover preparado (candidato: {candidate['ssid'] if candidate else 'nenhum'})")
+        except Exception as e:
+            logger.error(f"Erro ao preparar failover: {e}")
+
+    def cancel(self):
+        """Descarta a preparação (enlace recuperado ou failover concluído)"""
+        with self._lock:
+            self.candidate = None
+            self.prepared = False
+            if self.state != self.HEALTHY:
+                self._set_state(self.HEALTHY)
+        self.hotspot_manager.discard_prepared()
+
+    def take_candidate(self) -> Optional[Dict]:
+        """Retorna (e consome) o candidato aquecido, se houver"""
+        with self._lock:
+            candidate, self.candidate = self.candidate, None
+            return candidate
+
+    @property
+    def collapsing(self) -> bool:
+        return self.state == self.COLLAPSING
+
+    def outage_started(self, at: float = None):
+        """Marca o início de uma interrupção percebida pelo usuário
+
+        at é o timestamp (relógio de parede) da primeira amostra de telemetria
+        que mostrou a queda; sem ele, conta a partir da detecção pelo loop
+        principal (até um ciclo de verificação depois).
+        """
+        if self._outage_started is None:
+            started = clocks.monotonic()
+            if at is not None:
+                started -= max(0.0, clocks.now() - at)
+            self._outage_started = started
+
+    def outage_ended(self, resolution: str):
+        """Marca o fim da interrupção (Wi-Fi de volta ou portal ativo)"""
+        if self._outage_started is None:
+            return
+        duration = clocks.monotonic() - self._outage_started
+        self._outage_started = None
+        predicted = self.state == self.COLLAPSING
+        self.outages.append({
+            'timestamp': clocks.now(),
+            'duration': round(duration, 3),
+            'resolution': resolution,
+            'predicted': predicted
+        })
+        FAILOVERS.inc(resolution=resolution, predicted=str(predicted).lower())
+        FAILOVER_DURATION.observe(duration, resolution=resolution)
+        logger.info(f"Interrupção encerrada ({resolution}) após {duration:.1f}s")
+
+    def get_stats(self) -> Dict:
+        durations = [o['duration'] for o in self.outages]
+        return {
+            'state': self.state,
+            'state_for': round(clocks.monotonic() - self.state_since, 1),
+            'reasons': self.reasons,
+            'prepared': self.prepared,
+            'predictions': self.predictions,
+            'cancelled': self.cancelled,
+            'outage_in_progress': self._outage_started is not None,
+            'outage_p50': percentile(durations, 50),
+            'outage_p90': percentile(durations, 90),
+            'outages': list(self.outages)
+        }
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Backend de rádio simulado em processo
+
+Simula um ambiente de rádio (APs, sinal, latências e taxas de falha
+configuráveis) para executar a máquina de estados e a interface web sem
+hardware Wi-Fi: demonstração, testes de carga e CI.
+"""
+
+import os
+import json
+import random
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+import clocks
+from radio_backend import RadioBackend, Station
+from scan_parser import dbm_to_percent, frequency_to_channel, percent_to_dbm
+
+logger = logging.getLogger(__name__)
+
+# Arquivos com redes reais exportadas pelo host (ver scan_real_wifi.sh)
+SHARED_SCAN_FILES = ('/tmp/wifi_scan.json', '/shared/wifi_scan.json',
+                     '/app/shared/wifi_scan.json', '/var/tmp/wifi_scan.json')
+
+
+class FakeAccessPoint:
+    """AP simulado; rede protegida sem senha definida aceita qualquer senha"""
+
+    __slots__ = ('ssid', 'bssid', 'frequency', 'rssi', 'encrypted', 'password')
+
+    def __init__(self, ssid: str, bssid: str, frequency: int = 2437, rssi: float = -60,
+                 encrypted: bool = True, password: str = None):
+        self.ssid = ssid
+        self.bssid = bssid.lower()
+        self.frequency = frequency
+        self.rssi = rssi
+        self.encrypted = encrypted
+        self.password = password
+
+    def accepts(self, password: Optional[str]) -> bool:
+        if not self.encrypted:
+            return True
+        if not password:
+            return False
+        return self.password is None or password == self.password
+
+    def to_dict(self) -> Dict:
+        return {'ssid': self.ssid, 'bssid': self.bssid, 'frequency': self.frequency,
+                'rssi': self.rssi, 'encrypted': self.encrypted, 'password': self.password}
+
+
+class FakeRadioEnvironment:
+    """APs visíveis, latências por operação, taxas de falha e quedas de enlace"""
+
+    # Latência média (segundos) de cada operação; cada execução varia ±20%
+    LATENCIES = {'scan': 1.0, 'association': 0.5, 'handshake': 0.3, 'dhcp': 0.5,
+                 'connectivity': 0.2, 'ap_start': 0.5, 'rtt': 0.015}
+    # Probabilidade de falha de cada operação
+    FAILURES = {'scan': 0.0, 'connect': 0.1, 'ap_start': 0.0}
+    # Variação (dB) do sinal entre leituras
+    RSSI_JITTER = 4
+
+    DEMO_SSIDS = ("HOME_WiFi", "WiFi_Casa", "Minha_Rede", "Internet_Casa",
+                  "TP-Link_5G", "NET_2.4G", "Vivo-Fibra", "Claro_WiFi",
+                  "DESKTOP-PC", "iPhone_Hotspot", "Samsung_Mobile",
+                  "Cafe_WiFi", "Escritorio_5G", "Neighbor_WiFi")
+
+    def __init__(self, access_points: List[FakeAccessPoint] = None, latencies: Dict = None,
+                 failures: Dict = None, link_drop_rate: float = 0.0, internet: bool = True,
+                 ap_clients: int = 0, seed: int = None):
+        self.access_points: Dict[str, FakeAccessPoint] = {}
+        for ap in access_points or []:
+            self.add(ap)
+        self.latencies = dict(self.LATENCIES, **(latencies or {}))
+        self.failures = dict(self.FAILURES, **(failures or {}))
+        # Probabilidade por segundo de o enlace cair
+        self.link_drop_rate = link_drop_rate
+        self.internet = internet
+        self.ap_clients = ap_clients
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def demo(cls, seed: int = None, **options) -> 'FakeRadioEnvironment':
+        """Redes realistas para demonstração, sempre com as duas redes padrão"""
+        rng = random.Random(seed)
+        access_points = [
+            FakeAccessPoint('WiFi_Demo_Network', '00:11:22:33:44:55', 2437, percent_to_dbm(85)),
+            FakeAccessPoint('OpenWiFi_Guest', '00:11:22:33:44:66', 2462, percent_to_dbm(70), encrypted=False)
+        ]
+        for index, ssid in enumerate(rng.sample(cls.DEMO_SSIDS, rng.randint(4, 8))):
+            frequency = 5180 if '5G' in ssid else rng.choice((2412, 2437, 2462))
+            access_points.append(FakeAccessPoint(
+                ssid, f'02:00:00:00:{index // 256:02x}:{index % 256:02x}', frequency,
+                percent_to_dbm(rng.randint(20, 95)), encrypted=rng.random() < 0.75))
+        return cls(access_points, seed=seed, **options)
+
+    @classmethod
+    def from_scan(cls, networks: List[Dict], **options) -> 'FakeRadioEnvironment':
+        """Ambiente com as redes de um scan (formato de WiFiMonitor.scan_networks)"""
+        access_points = []
+        for index, net in enumerate(networks):
+            if not net.get('ssid'):
+                continue
+            bssid = net.get('bssid') or ''
+            if len(bssid) != 17:
+                bssid = f'02:00:00:01:{index // 256:02x}:{index % 256:02x}'
+            access_points.append(FakeAccessPoint(
+                net['ssid'], bssid, net.get('frequency') or 2437,
+                percent_to_dbm(net.get('signal_strength', 50)), bool(net.get('encrypted', True))))
+        return cls(access_points, **options)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FakeRadioEnvironment':
+        """Carrega um ambiente descrito em JSON (access_points, latencies, failures...)"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        access_points = [FakeAccessPoint(**ap) for ap in data.pop('access_points', [])]
+        if not access_points:
+            return cls.demo(**data)
+        return cls(access_points, **data)
+
+    @classmethod
+    def from_env(cls) -> 'FakeRadioEnvironment':
+        """FAKE_RADIO_ENV (arquivo JSON), redes exportadas pelo host ou redes de demonstração"""
+        path = os.getenv('FAKE_RADIO_ENV')
+        if path:
+            try:
+                environment = cls.from_file(path)
+                logger.info(f"Ambiente de rádio simulado carregado de {path} "
+                            f"({len(environment.access_points)} APs)")
+                return environment
+            except Exception as e:
+                logger.error(f"Erro ao carregar ambiente simulado {path}: {e}")
+
+        for file_path in SHARED_SCAN_FILES:
+            try:
+                if os.path.exists(file_path):
+                    with open(file_path, 'r') as f:
+                        data = json.load(f)
+                    if data and isinstance(data, list):
+                        logger.info(f"Redes Wi-Fi reais carregadas de {file_path}")
+                        return cls.from_scan(data)
+            except Exception:
+                continue
+        return cls.demo()
+
+    def add(self, access_point: FakeAccessPoint):
+        self.access_points[access_point.bssid] = access_point
+
+    def remove(self, bssid: str):
+        self.access_points.pop(bssid.lower(), None)
+
+    def set_rssi(self, bssid: str, rssi: float):
+        """Altera o sinal de um AP (simula movimento ou degradação)"""
+        access_point = self.access_points.get(bssid.lower())
+        if access_point is not None:
+            access_point.rssi = rssi
+
+    def find(self, ssid: str, bssid: str = None) -> Optional[FakeAccessPoint]:
+        """AP indicado pela dica de BSSID, ou o mais forte da rede"""
+        if bssid:
+            access_point = self.access_points.get(bssid.lower())
+            if access_point is not None and access_point.ssid == ssid:
+                return access_point
+        candidates = [ap for ap in self.access_points.values() if ap.ssid == ssid]
+        return max(candidates, key=lambda ap: ap.rssi) if candidates else None
+
+    def latency(self, operation: str) -> float:
+        return self.latencies.get(operation, 0.0) * self.rng.uniform(0.8, 1.2)
+
+    def fails(self, operation: str) -> bool:
+        return self.rng.random() < self.failures.get(operation, 0.0)
+
+    def observed_rssi(self, access_point: FakeAccessPoint) -> float:
+        return access_point.rssi + self.rng.uniform(-self.RSSI_JITTER, self.RSSI_JITTER) / 2
+
+
+class FakeBackend(RadioBackend):
+    """Backend simulado: scan, conexão, enlace e AP sem processos externos"""
+
+    name = 'fake'
+    simulated = True
+    GATEWAY = '192.168.1.1'
+    AP_ADDRESS = '192.168.4.1'
+
+    def __init__(self, environment: FakeRadioEnvironment = None, interface: str = 'wlan0',
+                 timings=None, clock=clocks.monotonic, sleep=clocks.sleep):
+        self.environment = environment or FakeRadioEnvironment.demo()
+        self.interface = interface
+        self.timings = timings
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.RLock()
+        self.associated: Optional[FakeAccessPoint] = None
+        self.address = None
+        self.ap_settings = None
+        self.stations: List[Station] = []
+        self._tx_retries = 0
+        self._tx_failed = 0
+        self._last_link_check = None
+
+    def _phase(self, phase: str):
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.phase(self.name, phase)
+
+    def _fail(self, reason: str, detail: str = None) -> bool:
+        """Registra o motivo da falha na tentativa em andamento"""
+        if self.timings is not None:
+            self.timings.set_failure(self.name, reason, detail)
+        return False
+
+    def _wait(self, operation: str):
+        delay = self.environment.latency(operation)
+        if delay > 0:
+            self.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Scan
+    # ------------------------------------------------------------------
+
+    def scan(self) -> List[Dict]:
+        self._wait('scan')
+        if self.environment.fails('scan'):
+            logger.debug("[FAKE] Falha simulada no scan")
+            return []
+        networks = []
+        for ap in list(self.environment.access_points.values()):
+            rssi = self.environment.observed_rssi(ap)
+            networks.append({
+                'ssid': ap.ssid,
+                'bssid': ap.bssid,
+                'signal_strength': dbm_to_percent(rssi),
+                'signal_dbm': round(rssi),
+                'frequency': ap.frequency,
+                'channel': frequency_to_channel(ap.frequency),
+                'encrypted': ap.encrypted,
+                'security': 'WPA2' if ap.encrypted else 'open'
+            })
+        networks.sort(key=lambda net: net['signal_strength'], reverse=True)
+        return networks
+
+    def bss_scan(self, active: bool = True) -> List[Dict]:
+        if active:
+            self._wait('scan')
+        return [{'bssid': ap.bssid, 'ssid': ap.ssid, 'frequency': ap.frequency,
+                 'signal_dbm': round(self.environment.observed_rssi(ap), 1)}
+                for ap in list(self.environment.access_points.values())]
+
+    # ------------------------------------------------------------------
+    # Conexão
+    # ------------------------------------------------------------------
+
+    def connect(self, ssid: str, password: str = None, hints: Dict = None,
+                timeout: float = None) -> bool:
+        environment = self.environment
+        start = self.clock()
+        logger.info(f"[FAKE] Conectando à rede {ssid}")
+        self._drop_link()
+
+        with self._phase('association'):
+            self._wait('association')
+            access_point = environment.find(ssid, (hints or {}).get('bssid'))
+            if access_point is None:
+                logger.error(f"[FAKE] Rede {ssid} fora de alcance")
+                return self._fail('ssid_not_found')
+            if environment.fails('connect'):
+                logger.error(f"[FAKE] Associação rejeitada por {access_point.bssid}")
+                return self._fail('assoc_rejected', f"CTRL-EVENT-ASSOC-REJECT bssid={access_point.bssid}")
+
+        with self._phase('handshake'):
+            if access_point.encrypted:
+                self._wait('handshake')
+            if not access_point.accepts(password):
+                logger.error("[FAKE] Falha no handshake WPA - senha incorreta")
+                return self._fail('wrong_key', 'reason=WRONG_KEY')
+
+        if timeout and self.clock() - start > timeout:
+            logger.error(f"[FAKE] Timeout na conexão a {ssid}")
+            return self._fail('assoc_timeout')
+
+        with self._phase('dhcp'):
+            self._wait('dhcp')
+            with self._lock:
+                self.associated = access_point
+                self.address = f"192.168.1.{environment.rng.randint(100, 199)}"
+                self._last_link_check = self.clock()
+
+        with self._phase('connectivity'):
+            self._wait('connectivity')
+            connected = self.has_connectivity()
+        if connected:
+            logger.info(f"[FAKE] Conectado a {ssid} via {access_point.bssid} ({self.address})")
+            return True
+        return self._fail('no_connectivity')
+
+    def disconnect(self):
+        self._drop_link()
+
+    def roam(self, ssid: str, bssid: str, timeout: float) -> bool:
+        self._wait('association')
+        access_point = self.environment.access_points.get(bssid.lower())
+        with self._lock:
+            if self.associated is None or access_point is None or access_point.ssid != ssid:
+                return False
+            self.associated = access_point
+        return True
+
+    def _drop_link(self):
+        with self._lock:
+            self.associated = None
+            self.address = None
+            self._last_link_check = None
+
+    def _check_link(self):
+        """Aplica as quedas aleatórias de enlace e a perda de alcance do AP"""
+        with self._lock:
+            access_point = self.associated
+            if access_point is None:
+                return
+            now = self.clock()
+            elapsed = now - (self._last_link_check or now)
+            self._last_link_check = now
+            rate = self.environment.link_drop_rate
+            lost = access_point.bssid not in self.environment.access_points
+            if not lost and rate > 0 and elapsed > 0:
+                lost = self.environment.rng.random() < 1 - (1 - min(rate, 1.0)) ** elapsed
+            if lost:
+                logger.info(f"[FAKE] Enlace com {access_point.bssid} perdido")
+                self.associated = None
+                self.address = None
+
+    # ------------------------------------------------------------------
+    # Estado do enlace
+    # ------------------------------------------------------------------
+
+    def interface_state(self) -> Dict:
+        self._check_link()
+        return {'exists': True, 'up': self.associated is not None or self.ap_settings is not None,
+                'has_ip': self.address is not None or self.ap_settings is not None}
+
+    @staticmethod
+    def _bitrate(rssi: float) -> float:
+        """Taxa aproximada (Mbit/s) para o sinal"""
+        for floor, bitrate in ((-50, 144.4), (-60, 86.7), (-70, 57.8), (-80, 19.5)):
+            if rssi >= floor:
+                return bitrate
+        return 6.5
+
+    def link_state(self) -> Dict:
+        self._check_link()
+        access_point = self.associated
+        if access_point is None:
+            return {}
+        rssi = round(self.environment.observed_rssi(access_point))
+        return {'bssid': access_point.bssid, 'ssid': access_point.ssid,
+                'frequency': access_point.frequency, 'signal_dbm': rssi,
+                'tx_bitrate': self._bitrate(rssi)}
+
+    def station_stats(self) -> Dict:
+        self._check_link()
+        access_point = self.associated
+        if access_point is None:
+            return {}
+        rssi = self.environment.observed_rssi(access_point)
+        # Retransmissões crescem conforme o sinal enfraquece
+        weakness = max(0.0, -60 - rssi)
+        with self._lock:
+            self._tx_retries += int(weakness * self.environment.rng.uniform(0, 2))
+            self._tx_failed += int(weakness * self.environment.rng.uniform(0, 0.2))
+            return {'signal_dbm': round(rssi, 1), 'tx_bitrate': self._bitrate(rssi),
+                    'rx_bitrate': self._bitrate(rssi), 'tx_retries': self._tx_retries,
+                    'tx_failed': self._tx_failed}
+
+    def link_signal(self) -> Optional[float]:
+        self._check_link()
+        access_point = self.associated
+        if access_point is None:
+            return None
+        return round(self.environment.observed_rssi(access_point), 1)
+
+    def has_connectivity(self) -> bool:
+        self._check_link()
+        return self.address is not None and self.environment.internet
+
+    def wait_connectivity(self, timeout: float) -> bool:
+        return self.has_connectivity()
+
+    def gateway(self) -> Optional[str]:
+        return self.GATEWAY if self.address else None
+
+    def probe_rtt(self, host: str = None, count: int = 3) -> Optional[float]:
+        if not self.has_connectivity():
+            return None
+        rssi = self.associated.rssi if self.associated else -60
+        # RTT cresce com a perda de sinal (retransmissões na camada de enlace)
+        penalty = 1 + max(0.0, -65 - rssi) / 10
+        return round(self.environment.latency('rtt') * 1000 * penalty, 2)
+
+    # ------------------------------------------------------------------
+    # Ponto de acesso
+    # ------------------------------------------------------------------
+
+    def start_ap(self, settings: Dict) -> bool:
+        self._drop_link()
+        self._wait('ap_start')
+        if self.environment.fails('ap_start'):
+            logger.error("[FAKE] Falha simulada ao iniciar o AP")
+            return False
+        with self._lock:
+            self.ap_settings = dict(settings)
+            self.stations = [Station(f'192.168.4.{10 + i}', f'02:00:00:aa:00:{i:02x}', f'client-{i}')
+                             for i in range(self.environment.ap_clients)]
+        logger.info(f"[FAKE] AP {settings.get('ssid')} ativo em {self.AP_ADDRESS}")
+        return True
+
+    def stop_ap(self):
+        with self._lock:
+            self.ap_settings = None
+            self.stations = []
+
+    def ap_running(self) -> bool:
+        return self.ap_settings is not None
+
+    def list_stations(self) -> List[Station]:
+        with self._lock:
+            return list(self.stations)
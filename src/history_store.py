@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Histórico persistente de scans, transições de modo e tentativas de conexão
+
+SQLite embutido em modo WAL: o monitor só enfileira registros em memória e
+uma thread grava em lotes (uma transação por lote), sem bloquear o loop
+principal nem a interface web. Leituras usam conexões próprias e não
+esperam a escrita.
+
+Avistamentos de BSS são o volume dominante: cada BSS é gravado no máximo
+uma vez por SIGHTING_INTERVAL (ou quando o sinal muda bastante). Depois de
+'history_raw_days' os avistamentos são agregados por hora; tudo some depois
+de 'history_retention_days', e o arquivo é mantido abaixo de
+'history_max_mb' descartando os dados mais antigos.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import clocks
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bss_sightings (
+    ts REAL NOT NULL,
+    bssid TEXT NOT NULL,
+    ssid TEXT,
+    frequency INTEGER,
+    channel INTEGER,
+    signal_dbm REAL,
+    signal_strength INTEGER
+);
+CREATE INDEX IF NOT EXISTS bss_sightings_ts ON bss_sightings (ts);
+CREATE INDEX IF NOT EXISTS bss_sightings_bssid ON bss_sightings (bssid, ts);
+
+CREATE TABLE IF NOT EXISTS bss_hourly (
+    hour INTEGER NOT NULL,
+    bssid TEXT NOT NULL,
+    ssid TEXT,
+    frequency INTEGER,
+    channel INTEGER,
+    samples INTEGER NOT NULL,
+    signal_dbm_avg REAL,
+    signal_dbm_min REAL,
+    signal_dbm_max REAL,
+    PRIMARY KEY (bssid, hour)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bss_hourly_hour ON bss_hourly (hour);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    ts REAL NOT NULL,
+    from_mode TEXT,
+    to_mode TEXT NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_ts ON transitions (ts);
+
+CREATE TABLE IF NOT EXISTS connect_attempts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    ssid TEXT,
+    bssid TEXT,
+    backend TEXT,
+    success INTEGER NOT NULL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS connect_attempts_ts ON connect_attempts (ts);
+CREATE INDEX IF NOT EXISTS connect_attempts_bssid ON connect_attempts (bssid, ts);
+
+CREATE TABLE IF NOT EXISTS connect_phases (
+    attempt_id INTEGER NOT NULL,
+    backend TEXT,
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS connect_phases_attempt ON connect_phases (attempt_id);
+"""
+
+# Agrega avistamentos antigos por (BSSID, hora), somando a agregados já existentes
+_DOWNSAMPLE = """
+INSERT INTO bss_hourly (hour, bssid, ssid, frequency, channel, samples,
+                        signal_dbm_avg, signal_dbm_min, signal_dbm_max)
+SELECT CAST(ts / 3600 AS INTEGER) * 3600 AS hour, bssid, MAX(ssid), MAX(frequency), MAX(channel),
+       COUNT(*), AVG(signal_dbm), MIN(signal_dbm), MAX(signal_dbm)
+FROM bss_sightings WHERE ts < ? GROUP BY bssid, hour
+ON CONFLICT (bssid, hour) DO UPDATE SET
+    signal_dbm_avg = (signal_dbm_avg * samples + excluded.signal_dbm_avg * excluded.samples)
+                     / (samples + excluded.samples),
+    signal_dbm_min = MIN(signal_dbm_min, excluded.signal_dbm_min),
+    signal_dbm_max = MAX(signal_dbm_max, excluded.signal_dbm_max),
+    samples = samples + excluded.samples
+"""
+
+DAY = 86400
+
+
+class HistoryStore:
+    """Histórico em SQLite com escrita em lote, retenção e consultas agregadas"""
+
+    # Intervalo mínimo entre dois avistamentos gravados do mesmo BSS
+    SIGHTING_INTERVAL = 60
+    # Variação de sinal (dB) que grava um avistamento antes do intervalo
+    SIGHTING_DELTA_DBM = 6
+    # Registros pendentes que antecipam a gravação; acima de max_pending os mais antigos são descartados
+    MAX_BATCH = 500
+    MAX_PENDING = 5000
+    # Retenção e compactação rodam nesse intervalo
+    MAINTENANCE_INTERVAL = 3600
+    # Maior número de linhas devolvido por consulta
+    MAX_ROWS = 1000
+
+    def __init__(self, path: str, flush_interval: float = 5, raw_days: float = 2,
+                 retention_days: float = 30, max_mb: float = 32, max_pending: int = MAX_PENDING):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.raw_days = raw_days
+        self.retention_days = retention_days
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self._pending: List[Tuple[str, tuple]] = []
+        self._pending_lock = threading.Lock()
+        self._dropped = 0
+        self._last_sighting: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self._write_lock = threading.Lock()
+        self._db = None
+
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = self._open()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Histórico indisponível ({path}): {e}")
+
+    @property
+    def available(self) -> bool:
+        return self._db is not None
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        # auto_vacuum só vale se definido antes da criação das tabelas
+        db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        db.execute('PRAGMA journal_mode = WAL')
+        # WAL + NORMAL: sem fsync a cada commit (no cartão SD isso domina o custo)
+        db.execute('PRAGMA synchronous = NORMAL')
+        db.execute('PRAGMA journal_size_limit = 4194304')
+        db.executescript(SCHEMA)
+        return db
+
+    # ------------------------------------------------------------------
+    # Registro (chamado pelo monitor; só enfileira)
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, kind: str, rows: List[tuple]):
+        if self._db is None or not rows:
+            return
+        with self._pending_lock:
+            self._pending.extend((kind, row) for row in rows)
+            excess = len(self._pending) - self.max_pending
+            if excess > 0:
+                del self._pending[:excess]
+                self._dropped += excess
+            full = len(self._pending) >= self.MAX_BATCH
+        if full:
+            self._wake.set()
+
+    def record_scan(self, networks: Iterable[Dict], now: float = None):
+        """Enfileira os BSS de um scan (limitado a um avistamento por BSS por intervalo)"""
+        now = clocks.now() if now is None else now
+        rows = []
+        with self._pending_lock:
+            for network in networks:
+                bssid = network.get('bssid')
+                if not bssid:
+                    continue
+                bssid = bssid.lower()
+                dbm = network.get('signal_dbm')
+                last = self._last_sighting.get(bssid)
+                if last is not None and now - last[0] < self.SIGHTING_INTERVAL:
+                    if dbm is None or last[1] is None or abs(dbm - last[1]) < self.SIGHTING_DELTA_DBM:
+                        continue
+                self._last_sighting[bssid] = (now, dbm)
+                rows.append((now, bssid, network.get('ssid'), network.get('frequency'),
+                             network.get('channel'), dbm, network.get('signal_strength')))
+        self._enqueue('sighting', rows)
+
+    def record_transition(self, from_mode: Optional[str], to_mode: str, reason: str = None,
+                          now: float = None):
+        """Enfileira uma troca de modo (wifi/hotspot)"""
+        now = clocks.now() if now is None else now
+        self._enqueue('transition', [(now, from_mode, to_mode, reason)])
+
+    def record_attempt(self, attempt):
+        """Enfileira uma tentativa de conexão encerrada (ConnectAttempt) com suas fases"""
+        bssid = attempt.bssid.lower() if attempt.bssid else None
+        self._enqueue('attempt', [(attempt.started_at, attempt.ssid, bssid, attempt.backend,
+                                   int(attempt.success), attempt.duration, tuple(attempt.phases))])
+
+    # ------------------------------------------------------------------
+    # Escrita em lote e manutenção
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Inicia a thread de gravação"""
+        if self._running or self._db is None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"Histórico em {self.path} (gravação a cada {self.flush_interval}s)")
+
+    def stop(self):
+        """Para a thread e grava o que estiver pendente"""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        next_maintenance = clocks.monotonic()
+        while self._running:
+            clocks.wait(self._wake, self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if clocks.monotonic() >= next_maintenance:
+                    self.maintain()
+                    next_maintenance = clocks.monotonic() + self.MAINTENANCE_INTERVAL
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar histórico: {e}")
+
+    def flush(self) -> int:
+        """Grava os registros pendentes em uma única transação; retorna quantos"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending or self._db is None:
+            return 0
+
+        sightings, transitions, attempts = [], [], []
+        for kind, row in pending:
+            if kind == 'sighting':
+                sightings.append(row)
+            elif kind == 'transition':
+                transitions.append(row)
+            else:
+                attempts.append(row)
+
+        with self._write_lock:
+            db = self._db
+            db.execute('BEGIN')
+            try:
+                db.executemany('INSERT INTO bss_sightings VALUES (?, ?, ?, ?, ?, ?, ?)', sightings)
+                db.executemany('INSERT INTO transitions VALUES (?, ?, ?, ?)', transitions)
+                for *attempt, phases in attempts:
+                    cursor = db.execute('INSERT INTO connect_attempts (ts, ssid, bssid, backend, success, '
+                                        'duration) VALUES (?, ?, ?, ?, ?, ?)', attempt)
+                    db.executemany('INSERT INTO connect_phases VALUES (?, ?, ?, ?)',
+                                   [(cursor.lastrowid,) + phase for phase in phases])
+                db.execute('COMMIT')
+            except sqlite3.Error:
+                db.execute('ROLLBACK')
+                raise
+        return len(pending)
+
+    def _used_bytes(self, db: sqlite3.Connection) -> int:
+        page_size = db.execute('PRAGMA page_size').fetchone()[0]
+        pages = db.execute('PRAGMA page_count').fetchone()[0]
+        free = db.execute('PRAGMA freelist_count').fetchone()[0]
+        return (pages - free) * page_size
+
+    def maintain(self, now: float = None) -> Dict:
+        """Agrega avistamentos antigos, aplica a retenção e o limite de tamanho"""
+        if self._db is None:
+            return {}
+        now = clocks.now() if now is None else now
+        raw_cutoff = now - self.raw_days * DAY
+        cutoff = now - self.retention_days * DAY
+        report = {}
+
+        with self._write_lock:
+            db = self._db
+            db.execute('BEGIN')
+            try:
+                report['downsampled'] = db.execute(_DOWNSAMPLE, (raw_cutoff,)).rowcount
+                db.execute('DELETE FROM bss_sightings WHERE ts < ?', (raw_cutoff,))
+                db.execute('DELETE FROM bss_hourly WHERE hour < ?', (cutoff,))
+                db.execute('DELETE FROM transitions WHERE ts < ?', (cutoff,))
+                db.execute('DELETE FROM connect_phases WHERE attempt_id IN '
+                           '(SELECT id FROM connect_attempts WHERE ts < ?)', (cutoff,))
+                report['expired_attempts'] = db.execute('DELETE FROM connect_attempts WHERE ts < ?',
+                                                        (cutoff,)).rowcount
+                db.execute('COMMIT')
+            except sqlite3.Error:
+                db.execute('ROLLBACK')
+                raise
+
+            # Acima do limite: descartar o quarto mais antigo dos avistamentos até caber
+            trimmed = 0
+            for table, column in (('bss_sightings', 'ts'), ('bss_hourly', 'hour')):
+                while self._used_bytes(db) > self.max_bytes:
+                    deleted = db.execute(
+                        f'DELETE FROM {table} WHERE {column} <= (SELECT {column} FROM {table} '
+                        f'ORDER BY {column} LIMIT 1 OFFSET (SELECT COUNT(*) / 4 FROM {table}))').rowcount
+                    if not deleted:
+                        break
+                    trimmed += deleted
+            report['trimmed'] = trimmed
+
+            db.execute('PRAGMA incremental_vacuum')
+            db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        # Esquecer BSS não vistos há muito (o filtro de avistamentos só precisa do recente)
+        horizon = now - self.SIGHTING_INTERVAL
+        with self._pending_lock:
+            self._last_sighting = {bssid: last for bssid, last in self._last_sighting.items()
+                                   if last[0] >= horizon}
+        if any(report.values()):
+            logger.info(f"Manutenção do histórico: {report}")
+        return report
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        if self._db is None:
+            return []
+        # Conexão própria por consulta: em WAL a leitura não espera a gravação
+        db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, timeout=5)
+        try:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+    def transitions(self, since: float, limit: int = 100) -> List[Dict]:
+        """Trocas de modo desde 'since', das mais recentes para as mais antigas"""
+        return self._query('SELECT ts, from_mode, to_mode, reason FROM transitions WHERE ts >= ? '
+                           'ORDER BY ts DESC LIMIT ?', (since, max(1, min(limit, self.MAX_ROWS))))
+
+    def failovers(self, since: float, bucket: int = DAY) -> List[Dict]:
+        """Ativações do hotspot por período ('bucket' em segundos)"""
+        return self._query('SELECT CAST(ts / ? AS INTEGER) * ? AS period, COUNT(*) AS failovers '
+                           'FROM transitions WHERE ts >= ? AND to_mode = ? GROUP BY period ORDER BY period',
+                           (bucket, bucket, since, 'hotspot'))
+
+    def connect_stats(self, since: float, ssid: str = None) -> List[Dict]:
+        """Tentativas, sucessos e tempo de conexão por BSS, do mais rápido ao mais lento"""
+        sql = ('SELECT bssid, MAX(ssid) AS ssid, COUNT(*) AS attempts, SUM(success) AS successes, '
+               'AVG(CASE WHEN success THEN duration END) AS avg_duration, '
+               'MIN(CASE WHEN success THEN duration END) AS min_duration '
+               'FROM connect_attempts WHERE ts >= ?')
+        params = [since]
+        if ssid:
+            sql += ' AND ssid = ?'
+            params.append(ssid)
+        sql += ' GROUP BY bssid ORDER BY avg_duration IS NULL, avg_duration LIMIT ?'
+        params.append(self.MAX_ROWS)
+        return self._query(sql, tuple(params))
+
+    def phase_stats(self, since: float, bssid: str = None) -> List[Dict]:
+        """Tempo médio por backend e fase das tentativas (opcionalmente de um BSS)"""
+        sql = ('SELECT p.backend, p.phase, COUNT(*) AS samples, AVG(p.seconds) AS avg_seconds, '
+               'MAX(p.seconds) AS max_seconds FROM connect_phases p '
+               'JOIN connect_attempts a ON a.id = p.attempt_id WHERE a.ts >= ?')
+        params = [since]
+        if bssid:
+            sql += ' AND a.bssid = ?'
+            params.append(bssid.lower())
+        sql += ' GROUP BY p.backend, p.phase ORDER BY p.backend, p.phase'
+        return self._query(sql, tuple(params))
+
+    def attempts(self, since: float, ssid: str = None, limit: int = 100) -> List[Dict]:
+        """Tentativas de conexão desde 'since', das mais recentes para as mais antigas"""
+        sql = ('SELECT ts, ssid, bssid, backend, success, duration FROM connect_attempts WHERE ts >= ?')
+        params = [since]
+        if ssid:
+            sql += ' AND ssid = ?'
+            params.append(ssid)
+        sql += ' ORDER BY ts DESC LIMIT ?'
+        params.append(max(1, min(limit, self.MAX_ROWS)))
+        return self._query(sql, tuple(params))
+
+    def sightings(self, since: float, bssid: str = None, ssid: str = None,
+                  limit: int = 500) -> List[Dict]:
+        """Avistamentos (brutos e agregados por hora) desde 'since', dos mais recentes aos mais antigos"""
+        filters, params = '', []
+        if bssid:
+            filters += ' AND bssid = ?'
+            params.append(bssid.lower())
+        if ssid:
+            filters += ' AND ssid = ?'
+            params.append(ssid)
+        sql = ('SELECT ts, bssid, ssid, frequency, channel, signal_dbm, signal_dbm AS signal_dbm_min, '
+               f'signal_dbm AS signal_dbm_max, 1 AS samples FROM bss_sightings WHERE ts >= ?{filters} '
+               'UNION ALL '
+               'SELECT hour, bssid, ssid, frequency, channel, signal_dbm_avg, signal_dbm_min, '
+               f'signal_dbm_max, samples FROM bss_hourly WHERE hour >= ?{filters} '
+               'ORDER BY ts DESC LIMIT ?')
+        return self._query(sql, tuple([since] + params + [since] + params + [max(1, min(limit, self.MAX_ROWS))]))
+
+    def get_stats(self) -> Dict:
+        """Linhas por tabela, tamanho em disco e registros pendentes"""
+        if self._db is None:
+            return {'available': False, 'path': self.path}
+        counts = self._query('SELECT '
+                             '(SELECT COUNT(*) FROM bss_sightings) AS bss_sightings, '
+                             '(SELECT COUNT(*) FROM bss_hourly) AS bss_hourly, '
+                             '(SELECT COUNT(*) FROM transitions) AS transitions, '
+                             '(SELECT COUNT(*) FROM connect_attempts) AS connect_attempts')[0]
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'available': True,
+            'path': self.path,
+            'rows': counts,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'pending': pending,
+            'dropped': self._dropped
+        }
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Módulo de telemetria contínua da qualidade do enlace Wi-Fi
+"""
+
+import math
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import clocks
+from command_runner import spawn
+from metrics import PROBE_RTT
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+
+class RingBuffer:
+    """Buffer circular de tamanho fixo com amostras (timestamp, valor) em arrays de double"""
+
+    __slots__ = ('capacity', '_timestamps', '_values', '_next', '_count')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float):
+        self._timestamps[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def window(self, since: float = None) -> List[Tuple[float, float]]:
+        """Amostras em ordem cronológica, opcionalmente a partir de 'since'
+
+        Os timestamps são crescentes: a primeira amostra da janela é achada
+        por busca binária, e só as amostras da janela são copiadas.
+        """
+        start = (self._next - self._count) % self.capacity
+        first = 0 if since is None else self._bisect(start, since)
+        samples = []
+        for i in range(first, self._count):
+            index = (start + i) % self.capacity
+            samples.append((self._timestamps[index], self._values[index]))
+        return samples
+
+    def _bisect(self, start: int, since: float) -> int:
+        """Posição lógica da primeira amostra com timestamp >= since"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamps[(start + middle) % self.capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        if self._count == 0:
+            return None
+        index = (self._next - 1) % self.capacity
+        return self._timestamps[index], self._values[index]
+
+    def nbytes(self) -> int:
+        return (self._timestamps.itemsize + self._values.itemsize) * self.capacity
+
+
+class _Bucket:
+    """Acumulador da média de um intervalo de downsampling"""
+
+    __slots__ = ('key', 'total', 'count')
+
+    def __init__(self):
+        self.key = None
+        self.total = 0.0
+        self.count = 0
+
+
+class MultiResolutionSeries:
+    """Série temporal em três resoluções: bruta (1 s), 1 min e 1 h"""
+
+    RESOLUTIONS = ('raw', 'minute', 'hour')
+
+    def __init__(self, raw_capacity: int = 3600, minute_capacity: int = 1440, hour_capacity: int = 720):
+        self.tiers = {
+            'raw': RingBuffer(raw_capacity),
+            'minute': RingBuffer(minute_capacity),
+            'hour': RingBuffer(hour_capacity)
+        }
+        self._minute = _Bucket()
+        self._hour = _Bucket()
+
+    def append(self, timestamp: float, value: float):
+        self.tiers['raw'].append(timestamp, value)
+        self._accumulate(self._minute, 60, 'minute', timestamp, value)
+
+    def _accumulate(self, bucket: _Bucket, period: int, tier: str, timestamp: float, value: float):
+        key = int(timestamp // period)
+        if bucket.key is not None and key != bucket.key:
+            mean = bucket.total / bucket.count if bucket.count else NAN
+            bucket_ts = bucket.key * period
+            self.tiers[tier].append(bucket_ts, mean)
+            if tier == 'minute':
+                self._accumulate(self._hour, 3600, 'hour', bucket_ts, mean)
+            bucket.total, bucket.count = 0.0, 0
+        bucket.key = key
+        if not math.isnan(value):
+            bucket.total += value
+            bucket.count += 1
+
+    def query(self, window: float, resolution: str = 'auto', now: float = None) -> List[Tuple[float, float]]:
+        now = clocks.now() if now is None else now
+        if resolution == 'auto':
+            # Amostras brutas de 1 s cobrem até a capacidade do buffer (menor no perfil 'low')
+            resolution = ('raw' if window <= self.tiers['raw'].capacity
+                          else 'minute' if window <= 86400 else 'hour')
+        return self.tiers[resolution].window(now - window)
+
+    def nbytes(self) -> int:
+        return sum(tier.nbytes() for tier in self.tiers.values())
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentil com interpolação linear (ignora NaN)"""
+    values = sorted(v for v in values if not math.isnan(v))
+    if not values:
+        return None
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class LinkTelemetry:
+    """Amostrador periódico de sinal, taxas, retransmissões, RTT e perda"""
+
+    METRICS = ('signal_dbm', 'tx_bitrate', 'rx_bitrate', 'tx_retries', 'tx_failed', 'rtt_ms', 'loss')
+
+    def __init__(self, wifi_monitor, interval: float = 1.0, raw_capacity: int = 3600,
+                 station_interval: float = 5.0):
+        self.wifi_monitor = wifi_monitor
+        self.interface = wifi_monitor.interface
+        self.interval = interval
+        # O station dump inicia um processo; entre leituras o sinal vem de link_signal()
+        self.station_interval = max(station_interval, interval)
+        self.series = {metric: MultiResolutionSeries(raw_capacity) for metric in self.METRICS}
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+        # Estado do processo de ping contínuo (uma única sonda de longa duração)
+        self._ping_process = None
+        self._ping_host = None
+        self._ping_rtts: List[float] = []
+        self._ping_lost = 0
+        # Contador -> (valor, instante monotônico da leitura)
+        self._previous_counters: Dict[str, Tuple[int, float]] = {}
+        self._station: Dict = {}
+        self._next_station = 0.0
+        self._listeners = []
+        # Amostras só em modo cliente: no hotspot o rádio não tem enlace com um AP
+        self._client_mode = True
+
+    def add_listener(self, callback):
+        """Registra função chamada após cada amostra (recebe o timestamp)"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Inicia a thread de amostragem"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='link-telemetry', daemon=True)
+        self._thread.start()
+        logger.info(f"Telemetria do enlace iniciada (intervalo {self.interval}s)")
+
+    def stop(self):
+        self._running = False
+        self._stop_ping()
+
+    def set_client_mode(self, enabled: bool):
+        """Liga/desliga a amostragem conforme o modo (cliente ou hotspot)"""
+        if enabled == self._client_mode:
+            return
+        self._client_mode = enabled
+        if not enabled:
+            self._stop_ping()
+            self._previous_counters.clear()
+            self._station = {}
+            self._next_station = 0.0
+        logger.debug(f"Telemetria do enlace {'retomada' if enabled else 'suspensa'} (modo cliente: {enabled})")
+
+    def _run(self):
+        next_sample = clocks.monotonic()
+        while self._running:
+            try:
+                if self._client_mode:
+                    self.sample()
+            except Exception as e:
+                logger.debug(f"Erro na amostragem de telemetria: {e}")
+            next_sample += self.interval
+            delay = next_sample - clocks.monotonic()
+            if delay > 0:
+                clocks.sleep(delay)
+            else:
+                next_sample = clocks.monotonic()
+
+    def sample(self, now: float = None):
+        """Coleta uma amostra de todas as métricas"""
+        now = clocks.now() if now is None else now
+        elapsed = clocks.monotonic()
+        if elapsed >= self._next_station:
+            station = self._read_station_info()
+            self._station = station
+            self._next_station = elapsed + self.station_interval
+            retries = self._delta('tx_retries', station, elapsed)
+            failed = self._delta('tx_failed', station, elapsed)
+        else:
+            station = self._read_link_signal()
+            retries = failed = NAN
+        rtt, loss = self._collect_probe(associated=bool(station))
+
+        values = {
+            'signal_dbm': station.get('signal_dbm', NAN),
+            'tx_bitrate': station.get('tx_bitrate', NAN),
+            'rx_bitrate': station.get('rx_bitrate', NAN),
+            'tx_retries': retries,
+            'tx_failed': failed,
+            'rtt_ms': rtt,
+            'loss': loss
+        }
+        with self._lock:
+            for metric, value in values.items():
+                self.series[metric].append(now, value)
+        for callback in self._listeners:
+            callback(now)
+
+    def _delta(self, counter: str, station: Dict, elapsed: float) -> float:
+        """Converte contador acumulado da estação em valor por intervalo de amostragem
+
+        Os contadores são lidos a cada station_interval: a diferença é
+        dividida pelo número de intervalos decorridos desde a leitura anterior.
+        """
+        if counter not in station:
+            self._previous_counters.pop(counter, None)
+            return NAN
+        previous = self._previous_counters.get(counter)
+        self._previous_counters[counter] = (station[counter], elapsed)
+        if previous is None or station[counter] < previous[0]:
+            return NAN
+        intervals = max((elapsed - previous[1]) / self.interval, 1.0)
+        return float(station[counter] - previous[0]) / intervals
+
+    def _read_station_info(self) -> Dict:
+        """Contadores da estação associada (AP) informados pelo backend de rádio"""
+        try:
+            return self.wifi_monitor.backend.station_stats()
+        except Exception as e:
+            logger.debug(f"Erro ao ler station dump: {e}")
+            return {}
+
+    def _read_link_signal(self) -> Dict:
+        """Sinal atual sem station dump; taxas repetidas da última leitura completa"""
+        try:
+            signal = self.wifi_monitor.backend.link_signal()
+        except Exception as e:
+            logger.debug(f"Erro ao ler o sinal do enlace: {e}")
+            signal = None
+        if signal is None:
+            return {}
+        station = {metric: self._station[metric] for metric in ('tx_bitrate', 'rx_bitrate')
+                   if metric in self._station}
+        station['signal_dbm'] = signal
+        return station
+
+    def _collect_probe(self, associated: bool) -> Tuple[float, float]:
+        """RTT médio e fração de perda do ping contínuo desde a última amostra"""
+        if not associated:
+            self._stop_ping()
+            return NAN, NAN
+
+        if self.wifi_monitor.backend.simulated:
+            # Rádio simulado: não há enlace real para o ping contínuo
+            rtt = self.wifi_monitor.backend.probe_rtt(count=1)
+            if rtt is not None:
+                PROBE_RTT.observe(rtt / 1000, source='telemetry')
+            return (NAN, 1.0) if rtt is None else (rtt, 0.0)
+
+        host = self.wifi_monitor.get_gateway() if self._ping_process is None else self._ping_host
+        if self._ping_process is None or self._ping_process.poll() is not None:
+            if host:
+                self._start_ping(host)
+            return NAN, NAN
+
+        with self._lock:
+            rtts, lost = self._ping_rtts, self._ping_lost
+            self._ping_rtts, self._ping_lost = [], 0
+
+        for value in rtts:
+            PROBE_RTT.observe(value / 1000, source='telemetry')
+        total = len(rtts) + lost
+        rtt = sum(rtts) / len(rtts) if rtts else NAN
+        loss = lost / total if total else NAN
+        return rtt, loss
+
+    def _start_ping(self, host: str):
+        self._stop_ping()
+        try:
+            # -O reporta pacotes sem resposta; -n evita resolução de nomes
+            self._ping_process = spawn(['ping', '-n', '-O', '-i', str(self.interval), '-W', '1', host],
+                                       output=True)
+            self._ping_host = host
+            threading.Thread(target=self._read_ping, args=(self._ping_process,),
+                             name='link-telemetry-ping', daemon=True).start()
+        except Exception as e:
+            logger.debug(f"Erro ao iniciar sonda de RTT: {e}")
+            self._ping_process = None
+
+    def _read_ping(self, process):
+        for line in iter(process.readline, ''):
+            if 'time=' in line:
+                try:
+                    rtt = float(line.split('time=')[1].split()[0])
+                except (IndexError, ValueError):
+                    continue
+                with self._lock:
+                    self._ping_rtts.append(rtt)
+            elif 'no answer yet' in line:
+                with self._lock:
+                    self._ping_lost += 1
+
+    def _stop_ping(self):
+        if self._ping_process is not None:
+            try:
+                self._ping_process.stop()
+            except Exception:
+                pass
+        self._ping_process = None
+        self._ping_host = None
+
+    def query(self, metric: str, window: float = 300, resolution: str = 'auto') -> List[Tuple[float, float]]:
+        """Amostras de uma métrica na janela (segundos)"""
+        with self._lock:
+            return self.series[metric].query(window, resolution)
+
+    def percentiles(self, metric: str, window: float = 300, pcts=(50, 90, 99),
+                    resolution: str = 'auto') -> Dict[str, Optional[float]]:
+        """Percentis de uma métrica na janela"""
+        values = [value for _, value in self.query(metric, window, resolution)]
+        return {f'p{pct}': percentile(values, pct) for pct in pcts}
+
+    def latest(self) -> Dict[str, Optional[float]]:
+        """Último valor de cada métrica"""
+        latest = {}
+        with self._lock:
+            for metric, series in self.series.items():
+                last = series.tiers['raw'].last()
+                latest[metric] = None if last is None or math.isnan(last[1]) else last[1]
+        return latest
+
+    def export(self, now: float = None) -> Dict:
+        """Médias por minuto (última hora) e por hora (último dia) de cada métrica"""
+        now = clocks.now() if now is None else now
+        with self._lock:
+            return {metric: {'minute': series.tiers['minute'].window(now - 3600),
+                             'hour': series.tiers['hour'].window(now - 86400)}
+                    for metric, series in self.series.items()}
+
+    def restore(self, data: Dict) -> int:
+        """Recarrega as séries exportadas (antes da primeira amostra); retorna quantas amostras"""
+        restored = 0
+        with self._lock:
+            for metric, tiers in data.items():
+                series = self.series.get(metric)
+                if series is None:
+                    continue
+                for tier in ('minute', 'hour'):
+                    for timestamp, value in tiers.get(tier, []):
+                        series.tiers[tier].append(timestamp, value)
+                        restored += 1
+        return restored
+
+    def memory_usage(self) -> int:
+        """Bytes reservados pelos buffers (limite fixo)"""
+        return sum(series.nbytes() for series in self.series.values())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Pipeline de logging assíncrono com rotação, compressão e colapso de repetições
+
+As threads que registram só enfileiram o registro (QueueHandler); uma
+thread de escrita aplica o colapso de mensagens repetidas, grava no arquivo
+(rotacionado por tamanho e por tempo, segmentos antigos em .gz), na saída
+padrão e em um buffer circular em memória, de onde a interface web lê os
+logs recentes sem tocar no cartão SD.
+
+Uma mensagem idêntica (mesmo logger, nível e texto) repetida dentro da
+janela é suprimida; ao fim da janela sai um resumo "(repetida N vezes em Ts)".
+"""
+
+import os
+import sys
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+import traceback
+import logging.handlers
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from log_reader import LOG_FILE, LogFilter, LogReader
+from metrics import LOG_RECORDS
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class RepeatCollapser:
+    """Suprime mensagens idênticas dentro da janela e gera o resumo das suprimidas"""
+
+    # Mensagens distintas acompanhadas (as mais antigas saem primeiro)
+    MAX_KEYS = 256
+
+    def __init__(self, window: float = 60):
+        self.window = window
+        # (logger, nível, texto) -> [início da janela, suprimidas, último registro suprimido]
+        self._seen: 'OrderedDict[Tuple, list]' = OrderedDict()
+
+    @staticmethod
+    def _summary(record: logging.LogRecord, count: int, elapsed: float) -> logging.LogRecord:
+        summary = logging.makeLogRecord(record.__dict__)
+        summary.msg = f"{record.getMessage()} (repetida {count} vezes em {elapsed:.0f}s)"
+        summary.args = None
+        summary.exc_info = summary.exc_text = None
+        return summary
+
+    def process(self, record: logging.LogRecord, now: float) -> List[logging.LogRecord]:
+        """Registros a gravar no lugar deste (vazio se suprimido)"""
+        if self.window <= 0:
+            return [record]
+        key = (record.name, record.levelno, record.getMessage())
+        state = self._seen.get(key)
+        if state is not None and now - state[0] < self.window:
+            state[1] += 1
+            state[2] = record
+            return []
+
+        emitted = []
+        if state is not None and state[1]:
+            emitted.append(self._summary(state[2], state[1], now - state[0]))
+        self._seen[key] = [now, 0, None]
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.MAX_KEYS:
+            _, (started, count, last) = self._seen.popitem(last=False)
+            if count:
+                emitted.append(self._summary(last, count, now - started))
+        emitted.append(record)
+        return emitted
+
+    def flush(self, now: float, force: bool = False) -> List[logging.LogRecord]:
+        """Resumos das janelas encerradas (todas, com force)
+
+        As chaves estão em ordem de início da janela: a varredura para na
+        primeira janela ainda aberta.
+        """
+        summaries = []
+        while self._seen:
+            key, (started, count, last) = next(iter(self._seen.items()))
+            if not force and now - started < self.window:
+                break
+            del self._seen[key]
+            if count:
+                summaries.append(self._summary(last, count, now - started))
+        return summaries
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotação por tamanho ou por tempo; os segmentos rotacionados são comprimidos em .gz"""
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval = interval
+        try:
+            started = os.stat(filename).st_mtime if os.path.getsize(filename) else time.time()
+        except OSError:
+            started = time.time()
+        self.rollover_at = started + interval
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb', compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record) -> int:
+        if self.interval and time.time() >= self.rollover_at:
+            if self.stream is not None and self.stream.tell() > 0:
+                return 1
+            self.rollover_at = time.time() + self.interval  # arquivo vazio: nada a rotacionar
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class LogRing:
+    """Últimos registros formatados em memória, numerados para leitura incremental
+
+    tail() e after() devolvem o mesmo formato do LogReader; o cursor é o
+    número de sequência do último registro entregue.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self._records = deque(maxlen=capacity)  # (sequência, nível, texto)
+        self._lock = threading.Lock()
+        self.sequence = 0
+
+    def append(self, levelno: int, text: str):
+        with self._lock:
+            self.sequence += 1
+            self._records.append((self.sequence, levelno, text))
+
+    def resize(self, capacity: int):
+        with self._lock:
+            if capacity != self._records.maxlen:
+                self._records = deque(self._records, maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def tail(self, limit: int = 100, level: str = None, contains: str = None) -> Dict:
+        limit = max(1, min(limit, LogReader.MAX_LINES))
+        log_filter = LogFilter(level, contains)
+        with self._lock:
+            records = list(self._records)
+            sequence = self.sequence
+        lines = []
+        for _, levelno, text in reversed(records):
+            if len(lines) >= limit:
+                break
+            if log_filter.matches(text, levelno):
+                lines.append(text)
+        return {'lines': lines[::-1], 'cursor': sequence, 'more': False}
+
+    def after(self, cursor: int, limit: int = 100, level: str = None, contains: str = None) -> Dict:
+        with self._lock:
+            records = list(self._records)
+            sequence = self.sequence
+        oldest = records[0][0] if records else sequence + 1
+        if cursor > sequence or cursor < oldest - 1:
+            # Processo reiniciado ou registros já descartados do buffer
+            result = self.tail(limit, level, contains)
+            result['reset'] = True
+            return result
+
+        limit = max(1, min(limit, LogReader.MAX_LINES))
+        log_filter = LogFilter(level, contains)
+        lines = []
+        position = cursor
+        for number, levelno, text in records[cursor - oldest + 1:]:
+            if len(lines) >= limit:
+                break
+            if log_filter.matches(text, levelno):
+                lines.append(text)
+            position = number
+        return {'lines': lines, 'cursor': position, 'more': position < sequence, 'reset': False}
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Nunca bloqueia quem registra: com a fila cheia o registro é descartado e contado"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS.inc(outcome='dropped')
+
+
+class LogPipeline:
+    """Fila, thread de escrita e destinos (arquivo, saída padrão, buffer em memória)"""
+
+    # Registros aguardando escrita; acima disso são descartados
+    MAX_QUEUE = 10000
+    # Intervalo em que a thread de escrita fecha as janelas de repetição sem novos registros
+    TICK = 1.0
+
+    def __init__(self):
+        self.ring = LogRing()
+        self.collapser = RepeatCollapser()
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self.handlers: List[logging.Handler] = []
+        self.file_handler: Optional[CompressingRotatingFileHandler] = None
+        self._queue: queue.Queue = queue.Queue(self.MAX_QUEUE)
+        self._queue_handler = None
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, path: str = LOG_FILE, level: int = logging.INFO, max_bytes: int = 5 * 1024 * 1024,
+              interval: float = 24 * 3600, backup_count: int = 5, repeat_window: float = 60,
+              stream=sys.stdout):
+        """Substitui os handlers da raiz pelo handler de fila e inicia a thread de escrita"""
+        if self.running:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file_handler = CompressingRotatingFileHandler(path, max_bytes, interval, backup_count)
+        self.handlers = [self.file_handler, logging.StreamHandler(stream)]
+        for handler in self.handlers:
+            handler.setFormatter(self.formatter)
+        self.collapser.window = repeat_window
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        self._queue_handler = _DroppingQueueHandler(self._queue)
+        root.addHandler(self._queue_handler)
+        root.setLevel(level)
+
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def configure(self, level: str = None, max_mb: float = None, rotate_hours: float = None,
+                  backups: int = None, repeat_window: float = None, ring_size: int = None):
+        """Aplica a configuração do sistema (lida depois que o logging já está ativo)"""
+        if not self.running:
+            return
+        if level:
+            logging.getLogger().setLevel(level.upper())
+        handler = self.file_handler
+        if handler is not None:
+            if max_mb is not None:
+                handler.maxBytes = int(max_mb * 1024 * 1024)
+            if rotate_hours is not None:
+                handler.interval = rotate_hours * 3600
+                handler.rollover_at = min(handler.rollover_at, time.time() + handler.interval)
+            if backups is not None:
+                handler.backupCount = backups
+        if repeat_window is not None:
+            self.collapser.window = repeat_window
+        if ring_size:
+            self.ring.resize(ring_size)
+
+    def _write(self, record: logging.LogRecord):
+        self.ring.append(record.levelno, self.formatter.format(record))
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        LOG_RECORDS.inc(outcome='written')
+
+    def _run(self):
+        next_flush = time.monotonic() + self.TICK
+        while True:
+            try:
+                record = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                record = False
+            now = time.monotonic()
+            try:
+                if record is None:
+                    break
+                if record is not False:
+                    emitted = self.collapser.process(record, now)
+                    if not emitted:
+                        LOG_RECORDS.inc(outcome='collapsed')
+                    for item in emitted:
+                        self._write(item)
+                if now >= next_flush:
+                    # Janelas encerradas só a cada TICK, não a cada registro
+                    next_flush = now + self.TICK
+                    for summary in self.collapser.flush(now):
+                        self._write(summary)
+            except Exception:
+                # Falha ao gravar não pode derrubar a thread (nem gerar log recursivo)
+                traceback.print_exc(file=sys.stderr)
+        for summary in self.collapser.flush(time.monotonic(), force=True):
+            self._write(summary)
+
+    def stop(self, timeout: float = 5.0):
+        """Grava o que está na fila, os resumos pendentes e fecha os arquivos
+
+        Com a fila cheia até o prazo, a thread de escrita não é aguardada:
+        os handlers são fechados e o que restou na fila é perdido.
+        """
+        if not self.running:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            sys.stderr.write("Fila de log cheia no encerramento; registros pendentes descartados\n")
+        else:
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        root = logging.getLogger()
+        if self._queue_handler is not None:
+            root.removeHandler(self._queue_handler)
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self) -> Dict:
+        return {
+            'running': self.running,
+            'queued': self._queue.qsize(),
+            'ring_records': len(self.ring),
+            'repeat_window': self.collapser.window
+        }
+
+
+PIPELINE = LogPipeline()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Leitura incremental do arquivo de log sem carregá-lo inteiro
+
+As últimas N linhas são lidas de trás para frente, em blocos a partir do
+fim do arquivo; leituras seguintes partem de um cursor (offset em bytes
+logo após a última linha entregue) e devolvem só as linhas novas. Os
+filtros de nível e de texto são aplicados durante a leitura, com um limite
+de bytes examinados por chamada.
+
+Linhas sem o formato do logging (tracebacks, saídas multilinha) herdam o
+nível do registro a que pertencem; o filtro de texto vale por linha.
+"""
+
+import os
+import logging
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = '/var/log/wifi-manager/wifi-manager.log'
+
+# Separador do formato configurado em log_pipeline.LOG_FORMAT
+FIELD_SEPARATOR = ' - '
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def line_level(line: str) -> Optional[int]:
+    """Nível numérico de uma linha 'data - logger - NÍVEL - mensagem' (None se não for registro)"""
+    parts = line.split(FIELD_SEPARATOR, 3)
+    if len(parts) == 4 and parts[2] in LEVELS:
+        return logging.getLevelName(parts[2])
+    return None
+
+
+class LogFilter:
+    """Nível mínimo e texto (sem diferenciar maiúsculas) exigidos de cada linha"""
+
+    def __init__(self, level: str = None, contains: str = None):
+        level = (level or '').upper()
+        if level and level not in LEVELS:
+            raise ValueError(f"Nível de log inválido: {level}")
+        self.min_level = logging.getLevelName(level) if level else None
+        self.contains = contains.lower() if contains else None
+
+    def matches(self, line: str, level: Optional[int]) -> bool:
+        """Linha (com o nível do registro a que pertence) passa no filtro"""
+        if self.min_level is not None and (level is None or level < self.min_level):
+            return False
+        return self.contains is None or self.contains in line.lower()
+
+
+class LogReader:
+    """Tail reverso e leitura a partir de cursor do arquivo de log"""
+
+    # Tamanho dos blocos lidos de trás para frente
+    BLOCK_SIZE = 16 * 1024
+    # Bytes examinados por chamada (evita varrer o arquivo inteiro atrás de um filtro raro)
+    MAX_SCAN_BYTES = 4 * 1024 * 1024
+    # Maior número de linhas devolvido por chamada
+    MAX_LINES = 1000
+
+    def __init__(self, path: str = LOG_FILE, max_scan_bytes: int = MAX_SCAN_BYTES):
+        self.path = path
+        self.max_scan_bytes = max_scan_bytes
+
+    @staticmethod
+    def _decode(raw: bytes) -> str:
+        return raw.decode('utf-8', errors='replace').rstrip('\r')
+
+    def _reverse_lines(self, f, end: int) -> Iterator[Tuple[int, bytes]]:
+        """Linhas terminadas em 'end' (logo após um '\\n'), da última para a primeira, com o offset de início"""
+        position = max(end - 1, 0)  # o '\\n' final não abre uma linha vazia
+        remainder = b''
+        scanned = 0
+        while position > 0 and scanned < self.max_scan_bytes:
+            size = min(self.BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size) + remainder
+            scanned += size
+            lines = block.split(b'\n')
+            # O primeiro pedaço pode ser o fim de uma linha que começa no bloco anterior
+            remainder = lines[0]
+            offset = position + len(remainder) + 1
+            starts = []
+            for line in lines[1:]:
+                starts.append((offset, line))
+                offset += len(line) + 1
+            for start, line in reversed(starts):
+                yield start, line
+        if position == 0 and remainder:
+            yield 0, remainder
+
+    def _complete_end(self, f, size: int) -> int:
+        """Offset logo após o último '\\n' (uma linha ainda sendo escrita fica para a próxima leitura)"""
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return size
+        position = size
+        while position > 0:
+            start = max(0, position - self.BLOCK_SIZE)
+            f.seek(start)
+            block = f.read(position - start)
+            index = block.rfind(b'\n')
+            if index >= 0:
+                return start + index + 1
+            position = start
+        return 0
+
+    def cursor(self) -> int:
+        """Cursor do fim atual do arquivo (para ler depois só o que for escrito a partir daqui)"""
+        try:
+            with open(self.path, 'rb') as f:
+                return self._complete_end(f, os.fstat(f.fileno()).st_size)
+        except FileNotFoundError:
+            return 0
+
+    def tail(self, limit: int = 100, level: str = None, contains: str = None) -> Dict:
+        """Últimas 'limit' linhas que passam no filtro, em ordem cronológica"""
+        limit = max(1, min(limit, self.MAX_LINES))
+        log_filter = LogFilter(level, contains)
+        try:
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                end = self._complete_end(f, size)
+                chunks: List[List[str]] = []
+                # Com filtro de nível, as continuações esperam a linha do registro (que vem depois)
+                continuation = deque(maxlen=self.MAX_LINES)
+                start = end
+                count = 0
+                scanned_all = True
+                for offset, raw in self._reverse_lines(f, end):
+                    line = self._decode(raw)
+                    level_number = line_level(line)
+                    if log_filter.min_level is None:
+                        record = [line]
+                    elif level_number is None and offset > 0:
+                        continuation.append(line)
+                        continue
+                    else:
+                        record = [line] + list(reversed(continuation))
+                        continuation.clear()
+                    start = offset
+                    matched = [line for line in record if log_filter.matches(line, level_number)]
+                    if matched:
+                        chunks.append(matched)
+                        count += len(matched)
+                        if count >= limit:
+                            break
+                else:
+                    scanned_all = start == 0
+        except FileNotFoundError:
+            return {'lines': [], 'cursor': 0, 'start': 0, 'more': False}
+
+        lines = [line for chunk in reversed(chunks) for line in chunk][-limit:]
+        return {
+            'lines': lines,
+            'cursor': end,
+            'start': start,
+            # Há linhas mais antigas não examinadas (limite atingido ou varredura interrompida)
+            'more': start > 0 and (count >= limit or not scanned_all)
+        }
+
+    def _level_before(self, f, cursor: int) -> Optional[int]:
+        """Nível do último registro iniciado antes do cursor (para continuações no início da leitura)"""
+        for _, raw in self._reverse_lines(f, cursor):
+            level = line_level(self._decode(raw))
+            if level is not None:
+                return level
+        return None
+
+    def after(self, cursor: int, limit: int = 100, level: str = None, contains: str = None) -> Dict:
+        """Linhas escritas depois do cursor; 'reset' se o arquivo foi truncado ou trocado"""
+        limit = max(1, min(limit, self.MAX_LINES))
+        log_filter = LogFilter(level, contains)
+        try:
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if cursor > size:
+                    # Arquivo menor que o cursor: rotacionado ou truncado
+                    result = self.tail(limit, level, contains)
+                    result['reset'] = True
+                    return result
+                f.seek(cursor)
+                data = f.read(min(size - cursor, self.max_scan_bytes))
+                complete = data.rfind(b'\n') + 1
+                raw_lines = data[:complete].split(b'\n')[:-1]
+                record_level = None
+                if raw_lines and log_filter.min_level is not None and line_level(self._decode(raw_lines[0])) is None:
+                    record_level = self._level_before(f, cursor)
+        except FileNotFoundError:
+            return {'lines': [], 'cursor': 0, 'more': False, 'reset': cursor > 0}
+
+        lines: List[str] = []
+        position = cursor
+        for raw in raw_lines:
+            line = self._decode(raw)
+            parsed = line_level(line)
+            if parsed is not None:
+                record_level = parsed
+            if len(lines) >= limit:
+                break  # o restante fica para a próxima chamada
+            if log_filter.matches(line, record_level):
+                lines.append(line)
+            position += len(raw) + 1
+        return {
+            'lines': lines,
+            'cursor': position,
+            # Parou no limite de linhas ou de bytes: há mais para ler imediatamente
+            'more': position < cursor + complete or cursor + len(data) < size,
+            'reset': False
+        }
@@ -7,34 +7,47 @@ Versão adaptada para testes sem hardware Wi-Fi real
 
 import os
 import time
-import json
-import subprocess
 import logging
 from flask import Flask, render_template, request, jsonify
 from threading import Thread
-import random
+
+from fake_radio import FakeBackend, FakeRadioEnvironment
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class WiFiManagerDemo:
-    """Gerenciador Wi-Fi simulado para demonstração"""
+    """Gerenciador Wi-Fi de demonstração sobre o backend de rádio simulado"""
+    
+    # Redes simuladas para demonstração
+    DEMO_NETWORKS = [
+        {'ssid': 'WiFi-Casa', 'signal_strength': 85, 'encrypted': True},
+        {'ssid': 'WiFi-Vizinho', 'signal_strength': 65, 'encrypted': True},
+        {'ssid': 'WiFi-Trabalho', 'signal_strength': 90, 'encrypted': True},
+        {'ssid': 'WiFi-Publico', 'signal_strength': 45, 'encrypted': False},
+        {'ssid': 'TUPANA-Setup', 'signal_strength': 100, 'encrypted': True}
+    ]
     
     def __init__(self):
         self.interface = os.getenv('WIFI_INTERFACE', 'wlan0')
-        self.current_network = None
-        self.hotspot_active = False
-        self.connected = False
         
-        # Redes simuladas para demonstração
-        self.demo_networks = [
-            {'ssid': 'WiFi-Casa', 'signal_strength': 85, 'encrypted': True},
-            {'ssid': 'WiFi-Vizinho', 'signal_strength': 65, 'encrypted': True},
-            {'ssid': 'WiFi-Trabalho', 'signal_strength': 90, 'encrypted': True},
-            {'ssid': 'WiFi-Publico', 'signal_strength': 45, 'encrypted': False},
-            {'ssid': 'TUPANA-Setup', 'signal_strength': 100, 'encrypted': True}
-        ]
+        # Ambiente: FAKE_RADIO_ENV, se definido; senão as redes de demonstração
+        # (scan ~1s, conexão ~2s, 10% de falhas e queda ocasional do enlace)
+        if os.getenv('FAKE_RADIO_ENV'):
+            environment = FakeRadioEnvironment.from_env()
+        else:
+            environment = FakeRadioEnvironment.from_scan(
+                self.DEMO_NETWORKS,
+                latencies={'association': 1.0, 'handshake': 0.5, 'dhcp': 0.4, 'connectivity': 0.1},
+                link_drop_rate=0.05 / 30)
+        self.backend = FakeBackend(environment, interface=self.interface)
+        self.hotspot_settings = {
+            'ssid': os.getenv('HOTSPOT_SSID', 'TUPANA-Setup'),
+            'password': os.getenv('HOTSPOT_PASSWORD', 'tupana123'),
+            'ip_range': '192.168.4.1/24',
+            'dhcp_range': '192.168.4.2,192.168.4.50,255.255.255.0,12h'
+        }
         
         # Redes salvas simuladas
         self.saved_networks = ['WiFi-Casa', 'WiFi-Trabalho']
@@ -43,43 +56,28 @@ class WiFiManagerDemo:
     
     def get_wifi_status(self):
         """Retorna status simulado do Wi-Fi"""
+        connected = self.backend.has_connectivity()
         return {
-            'connected': self.connected,
-            'network': self.current_network,
-            'hotspot_active': self.hotspot_active,
+            'connected': connected,
+            'network': self.backend.link_state().get('ssid') if connected else None,
+            'hotspot_active': self.backend.ap_running(),
             'interface': self.interface
         }
     
     def scan_networks(self):
-        """Simula scan de redes Wi-Fi"""
+        """Scan de redes no ambiente simulado"""
         logger.info("Simulando scan de redes Wi-Fi...")
-        time.sleep(1)  # Simula tempo de scan
-        
-        # Adiciona variação no sinal
-        networks = []
-        for net in self.demo_networks:
-            network = net.copy()
-            network['signal_strength'] = max(20, net['signal_strength'] + random.randint(-10, 10))
-            networks.append(network)
-        
-        return networks
+        return self.backend.scan()
     
     def connect_wifi(self, ssid, password):
-        """Simula conexão Wi-Fi"""
+        """Conexão Wi-Fi no ambiente simulado"""
         logger.info(f"Simulando conexão com {ssid}")
         
-        # Simula tempo de conexão
-        time.sleep(2)
-        
-        # Simula falha ocasional (10% de chance)
-        if random.random() < 0.1:
+        if not self.backend.connect(ssid, password):
             logger.error(f"Falha simulada na conexão com {ssid}")
             return False
         
-        # Simula conexão bem-sucedida
-        self.connected = True
-        self.current_network = ssid
-        self.hotspot_active = False
+        self.backend.stop_ap()
         
         # Adiciona à lista de redes salvas se não estiver
         if ssid not in self.saved_networks:
@@ -100,9 +98,8 @@ class WiFiManagerDemo:
                 logger.info(f"Rede {ssid} removida das redes salvas")
                 
                 # Se estava conectado nesta rede, desconecta
-                if self.current_network == ssid:
-                    self.connected = False
-                    self.current_network = None
+                if self.backend.link_state().get('ssid') == ssid:
+                    self.backend.disconnect()
                     self.start_hotspot()
                 
                 return True
@@ -114,33 +111,24 @@ class WiFiManagerDemo:
             return False
     
     def start_hotspot(self):
-        """Simula início do hotspot"""
+        """Início do hotspot no rádio simulado"""
         logger.info("Simulando início do hotspot TUPANA...")
-        self.hotspot_active = True
-        self.connected = False
-        self.current_network = None
-        logger.info("Hotspot TUPANA simulado ativo")
+        if self.backend.start_ap(self.hotspot_settings):
+            logger.info("Hotspot TUPANA simulado ativo")
     
     def stop_hotspot(self):
-        """Simula parada do hotspot"""
+        """Parada do hotspot no rádio simulado"""
         logger.info("Simulando parada do hotspot TUPANA...")
-        self.hotspot_active = False
+        self.backend.stop_ap()
         logger.info("Hotspot TUPANA simulado desativado")
     
     def monitor_connection(self):
-        """Simula monitoramento de conexão"""
+        """Monitoramento de conexão (quedas de enlace vêm do ambiente simulado)"""
         while True:
             try:
-                if self.connected and self.current_network:
-                    # Simula perda de conexão ocasional (5% de chance a cada 30s)
-                    if random.random() < 0.05:
-                        logger.warning(f"Simulando perda de conexão com {self.current_network}")
-                        self.connected = False
-                        self.current_network = None
-                        self.start_hotspot()
-                
-                elif not self.hotspot_active and not self.connected:
+                if not self.backend.has_connectivity() and not self.backend.ap_running():
                     # Se não está conectado e hotspot não está ativo, ativa hotspot
+                    logger.warning("Sem conexão Wi-Fi, ativando hotspot")
                     self.start_hotspot()
                 
                 time.sleep(30)  # Verifica a cada 30 segundos
@@ -7,11 +7,16 @@ Otimizado para menor consumo de recursos
 import os
 import time
 import logging
-import subprocess
 import re
 from threading import Thread
 from flask import Flask, render_template, request, jsonify
 
+from network_store import NetworkStore
+from dhcp_client import DhcpClient
+from command_runner import RUNNER, run as run_command
+from scan_parser import parse_iwlist
+from bss_table import BssTable
+
 # Configuração básica de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,51 +24,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reaproveitamento de leituras pelo executor de comandos (segundos)
+STATUS_CACHE_TTL = 2
+SCAN_CACHE_TTL = 5
+PROBE_CACHE_TTL = 5
+INTERNET_PROBE = ['ping', '-c', '1', '-W', '3', '8.8.8.8']
+
 class WiFiManagerLite:
     def __init__(self):
         self.interface = os.getenv('WIFI_INTERFACE', 'wlan0')
         self.hotspot_active = False
         self.connected_network = None
         self.excluded_networks = set()  # Redes que o usuário excluiu
+        self.network_store = NetworkStore(os.getenv('SAVED_NETWORKS_FILE', '/app/config/saved_networks.json'))
+        self.dhcp_client = DhcpClient(self.interface, os.getenv('DHCP_LEASE_DIR', '/app/config/dhcp'))
+        self.bss_table = BssTable()
+        if not os.path.exists(self.network_store.store_file):
+            self._import_wpa_supplicant_networks()
+        
+    def _import_wpa_supplicant_networks(self):
+        """Importa (uma única vez) redes de arquivos wpa_supplicant existentes"""
+        wpa_paths = [
+            '/etc/wpa_supplicant/wpa_supplicant.conf',
+            '/etc/wpa_supplicant.conf'
+        ]
+        block_pattern = re.compile(r'network=\{([^}]*)\}', re.DOTALL)
+        ssid_pattern = re.compile(r'\bssid="([^"]+)"')
+        psk_pattern = re.compile(r'\bpsk=("?)([^"\n]+)\1')
+        
+        for wpa_path in wpa_paths:
+            try:
+                if not os.path.exists(wpa_path):
+                    continue
+                with open(wpa_path, 'r') as f:
+                    content = f.read()
+                for block in block_pattern.findall(content):
+                    ssid_match = ssid_pattern.search(block)
+                    if not ssid_match or ssid_match.group(1) == 'TUPANA-WiFi-Config':
+                        continue
+                    psk_match = psk_pattern.search(block)
+                    self.network_store.add_network(ssid_match.group(1),
+                                                   psk_match.group(2) if psk_match else None)
+                logger.info(f"Redes importadas de {wpa_path}")
+            except Exception as e:
+                logger.debug(f"Erro ao importar {wpa_path}: {e}")
         
     def scan_networks(self):
         """Scan simples de redes Wi-Fi"""
         try:
-            result = subprocess.run(['iwlist', self.interface, 'scan'], 
-                                  capture_output=True, text=True, timeout=10)
+            result = run_command(['iwlist', self.interface, 'scan'], timeout=10, cache_ttl=SCAN_CACHE_TTL)
             
-            networks = []
-            if result.returncode == 0:
-                current = {}
-                for line in result.stdout.split('\n'):
-                    if 'Cell ' in line and 'Address:' in line:
-                        if current:
-                            networks.append(current)
-                        current = {}
-                    elif 'ESSID:' in line:
-                        essid = line.split('ESSID:')[1].strip().strip('"')
-                        if essid and essid != '<hidden>':
-                            current['ssid'] = essid
-                    elif 'Quality=' in line:
-                        try:
-                            quality = line.split('Quality=')[1].split()[0]
-                            current['quality'] = quality
-                        except:
-                            current['quality'] = 'N/A'
-                    elif 'Encryption key:' in line:
-                        if 'off' in line:
-                            current['encrypted'] = False
-                        else:
-                            current['encrypted'] = True
-                
-                if current:
-                    networks.append(current)
+            records = parse_iwlist(result.stdout) if result.returncode == 0 else []
             
-            # Filtrar redes válidas e limitar a 10
-            valid_networks = []
-            for network in networks:
-                if 'ssid' in network and len(valid_networks) < 10:
-                    valid_networks.append(network)
+            self.bss_table.update(record.to_dict() for record in records if record.ssid)
+            
+            # Uma entrada por SSID, as 10 de sinal mais forte
+            ranked, _ = self.bss_table.top(10)
+            valid_networks = [group.to_dict() for group in ranked]
             
             logger.info(f"Encontradas {len(valid_networks)} redes Wi-Fi")
             return valid_networks
@@ -75,8 +92,7 @@ class WiFiManagerLite:
     def get_current_network(self):
         """Verificar rede atual conectada"""
         try:
-            result = subprocess.run(['iwconfig', self.interface], 
-                                  capture_output=True, text=True, timeout=5)
+            result = run_command(['iwconfig', self.interface], cache_ttl=STATUS_CACHE_TTL)
             
             if result.returncode == 0:
                 for line in result.stdout.split('\n'):
@@ -93,8 +109,7 @@ class WiFiManagerLite:
     def check_internet(self):
         """Verificar conectividade com internet"""
         try:
-            result = subprocess.run(['ping', '-c', '1', '8.8.8.8'], 
-                                  capture_output=True, timeout=5)
+            result = run_command(INTERNET_PROBE, timeout=5, cache_ttl=PROBE_CACHE_TTL)
             return result.returncode == 0
         except:
             return False
@@ -107,8 +122,7 @@ class WiFiManagerLite:
             # Verificar se há IP na interface Wi-Fi
             has_ip = False
             try:
-                ip_result = subprocess.run(['ip', 'addr', 'show', self.interface], 
-                                         capture_output=True, text=True, timeout=5)
+                ip_result = run_command(['ip', 'addr', 'show', self.interface], cache_ttl=STATUS_CACHE_TTL)
                 has_ip = 'inet ' in ip_result.stdout and '127.0.0.1' not in ip_result.stdout
             except:
                 has_ip = False
@@ -142,20 +156,23 @@ class WiFiManagerLite:
         """Conectar a rede Wi-Fi usando wpa_supplicant"""
         try:
             logger.info(f"Tentando conectar a rede: {ssid}")
+            start_time = time.monotonic()
             
             # Parar hotspot se estiver ativo
             if self.hotspot_active:
                 self.stop_hotspot()
                 time.sleep(2)
             
-            # Configurar wpa_supplicant
+            # Configurar wpa_supplicant (PSK pré-computada evita PBKDF2 no supplicant)
+            psk = self.network_store.get_psk(ssid, password)
+            psk_line = f'psk={psk}' if psk else f'psk="{password}"'
             config_content = f'''ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev
 update_config=1
 country=BR
 
 network={{
     ssid="{ssid}"
-    psk="{password}"
+    {psk_line}
     key_mgmt=WPA-PSK
 }}
 '''
@@ -166,21 +183,21 @@ network={{
                 f.write(config_content)
             
             # Parar todos os processos relacionados
-            subprocess.run(['pkill', '-f', 'wpa_supplicant'], capture_output=True)
-            subprocess.run(['pkill', '-f', 'dhcpcd'], capture_output=True)
-            subprocess.run(['pkill', '-f', 'dhclient'], capture_output=True)
+            run_command(['pkill', '-f', 'wpa_supplicant'])
+            run_command(['pkill', '-f', 'dhcpcd'])
+            run_command(['pkill', '-f', 'dhclient'])
             time.sleep(2)
             
             # Limpar interface
-            subprocess.run(['ip', 'addr', 'flush', 'dev', self.interface], capture_output=True)
-            subprocess.run(['ip', 'link', 'set', self.interface, 'down'], capture_output=True)
+            run_command(['ip', 'addr', 'flush', 'dev', self.interface])
+            run_command(['ip', 'link', 'set', self.interface, 'down'])
             time.sleep(1)
-            subprocess.run(['ip', 'link', 'set', self.interface, 'up'], capture_output=True)
+            run_command(['ip', 'link', 'set', self.interface, 'up'])
             time.sleep(1)
             
             # Iniciar wpa_supplicant
             cmd = ['wpa_supplicant', '-B', '-i', self.interface, '-c', config_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            result = run_command(cmd, timeout=10)
             
             if result.returncode == 0:
                 logger.info(f"wpa_supplicant iniciado com sucesso para {ssid}")
@@ -189,46 +206,31 @@ network={{
                 time.sleep(3)
                 
                 # Verificar se wpa_supplicant conectou
-                status_check = subprocess.run(['wpa_cli', '-i', self.interface, 'status'], 
-                                            capture_output=True, text=True, timeout=5)
+                status_check = run_command(['wpa_cli', '-i', self.interface, 'status'], timeout=5)
                 
                 if 'wpa_state=COMPLETED' in status_check.stdout:
                     logger.info("Autenticação Wi-Fi bem-sucedida")
                 else:
                     logger.warning("Autenticação Wi-Fi pendente, continuando...")
                 
-                # Solicitar IP via DHCP (tentar diferentes comandos)
-                dhcp_commands = [
-                    ['dhcpcd', self.interface],
-                    ['dhclient', self.interface],
-                    ['udhcpc', '-i', self.interface]
-                ]
+                # Solicitar IP via DHCP (reaproveita o lease anterior da rede)
+                dhcp_result = self.dhcp_client.acquire(ssid)
+                if not dhcp_result['success']:
+                    logger.warning("DHCP não obteve endereço IP")
+                    time.sleep(5)  # Aguardar conexão
                 
-                dhcp_success = False
-                for dhcp_cmd in dhcp_commands:
-                    try:
-                        logger.info(f"Tentando DHCP com: {' '.join(dhcp_cmd)}")
-                        dhcp_result = subprocess.run(dhcp_cmd, capture_output=True, timeout=15)
-                        if dhcp_result.returncode == 0:
-                            dhcp_success = True
-                            logger.info(f"DHCP bem-sucedido com: {' '.join(dhcp_cmd)}")
-                            break
-                    except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-                        logger.warning(f"Falha DHCP com {' '.join(dhcp_cmd)}: {e}")
-                        continue
-                
-                if not dhcp_success:
-                    logger.warning("Nenhum cliente DHCP disponível, tentando configuração manual")
-                
-                time.sleep(5)  # Aguardar conexão
-                
-                # Verificar se conectou
+                # Verificar se conectou (descartando leituras de estado anteriores)
+                RUNNER.invalidate()
                 current = self.get_current_network()
                 if current == ssid:
                     logger.info(f"Conectado com sucesso a {ssid}")
+                    self.network_store.add_network(ssid, password)
+                    self.network_store.record_success(ssid, time.monotonic() - start_time)
+                    self.excluded_networks.discard(ssid)
                     return True
                 else:
                     logger.warning(f"Falha na conexão com {ssid}")
+                    self.network_store.record_failure(ssid)
                     return False
             else:
                 error_msg = result.stderr.strip() if result.stderr else "Erro desconhecido"
@@ -247,15 +249,15 @@ network={{
             logger.info("Iniciando hotspot TUPANA...")
             
             # Parar serviços existentes
-            subprocess.run(['pkill', 'hostapd'], capture_output=True)
-            subprocess.run(['pkill', 'dnsmasq'], capture_output=True)
-            subprocess.run(['pkill', 'wpa_supplicant'], capture_output=True)
+            run_command(['pkill', 'hostapd'])
+            run_command(['pkill', 'dnsmasq'])
+            run_command(['pkill', 'wpa_supplicant'])
             time.sleep(2)
             
             # Configurar interface
-            subprocess.run(['ip', 'addr', 'flush', 'dev', self.interface], capture_output=True)
-            subprocess.run(['ip', 'addr', 'add', '192.168.4.1/24', 'dev', self.interface], capture_output=True)
-            subprocess.run(['ip', 'link', 'set', 'dev', self.interface, 'up'], capture_output=True)
+            run_command(['ip', 'addr', 'flush', 'dev', self.interface])
+            run_command(['ip', 'addr', 'add', '192.168.4.1/24', 'dev', self.interface])
+            run_command(['ip', 'link', 'set', 'dev', self.interface, 'up'])
             
             # Configurar hostapd
             hostapd_conf = '''interface=wlan0
@@ -286,11 +288,12 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
                 f.write(dnsmasq_conf)
             
             # Iniciar serviços
-            subprocess.Popen(['hostapd', '/tmp/hostapd.conf'])
+            RUNNER.spawn(['hostapd', '/tmp/hostapd.conf'])
             time.sleep(2)
-            subprocess.Popen(['dnsmasq', '-C', '/tmp/dnsmasq.conf'])
+            RUNNER.spawn(['dnsmasq', '-C', '/tmp/dnsmasq.conf'])
             
             self.hotspot_active = True
+            RUNNER.invalidate()
             logger.info("Hotspot TUPANA ativo")
             return True
             
@@ -301,32 +304,8 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
     def get_saved_networks(self):
         """Listar apenas redes realmente salvas"""
         try:
-            saved_networks = []
-            
-            # Verificar configurações do wpa_supplicant (redes realmente salvas)
-            wpa_paths = [
-                '/etc/wpa_supplicant/wpa_supplicant.conf',
-                '/etc/wpa_supplicant.conf',
-                '/tmp/wpa_supplicant.conf'
-            ]
-            
-            for wpa_path in wpa_paths:
-                try:
-                    if os.path.exists(wpa_path):
-                        with open(wpa_path, 'r') as f:
-                            content = f.read()
-                            import re
-                            ssids = re.findall(r'ssid="([^"]+)"', content)
-                            for ssid in ssids:
-                                if (ssid not in saved_networks and 
-                                    ssid != 'TUPANA-WiFi-Config' and 
-                                    ssid not in self.excluded_networks):
-                                    saved_networks.append(ssid)
-                        logger.info(f"Encontradas {len(ssids)} redes salvas em {wpa_path}")
-                except Exception as e:
-                    logger.debug(f"Erro ao ler {wpa_path}: {e}")
-            
-            # Retornar apenas redes salvas (pode ser lista vazia)
+            saved_networks = [net.ssid for net in self.network_store.list_networks()
+                              if net.ssid not in self.excluded_networks]
             logger.info(f"Retornando {len(saved_networks)} redes salvas")
             return saved_networks
             
@@ -346,13 +325,13 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
             clean_ssid = ssid.replace(' (detectada)', '').replace(' (disponível)', '').strip()
             logger.info(f"Tentando excluir rede salva: '{clean_ssid}'")
             
+            removed_from_store = self.network_store.remove_network(clean_ssid)
             success = False
             
             # Método 1: Usar wpa_cli para remover rede (mais confiável)
             try:
                 # Listar redes configuradas no wpa_supplicant
-                list_result = subprocess.run(['wpa_cli', '-i', self.interface, 'list_networks'], 
-                                           capture_output=True, text=True, timeout=10)
+                list_result = run_command(['wpa_cli', '-i', self.interface, 'list_networks'], timeout=10)
                 
                 if list_result.returncode == 0:
                     lines = list_result.stdout.strip().split('\n')
@@ -360,12 +339,10 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
                         if clean_ssid in line:
                             network_id = line.split('\t')[0]
                             # Remover a rede
-                            remove_result = subprocess.run(['wpa_cli', '-i', self.interface, 'remove_network', network_id], 
-                                                         capture_output=True, text=True, timeout=10)
+                            remove_result = run_command(['wpa_cli', '-i', self.interface, 'remove_network', network_id], timeout=10)
                             if remove_result.returncode == 0:
                                 # Salvar configuração
-                                subprocess.run(['wpa_cli', '-i', self.interface, 'save_config'], 
-                                             capture_output=True, timeout=10)
+                                run_command(['wpa_cli', '-i', self.interface, 'save_config'], timeout=10)
                                 logger.info(f"Rede '{clean_ssid}' removida via wpa_cli (ID: {network_id})")
                                 success = True
                                 break
@@ -407,15 +384,17 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
                         logger.debug(f"Erro ao editar {config_file}: {e}")
             
             # Método 3: Adicionar à lista de exclusão (fallback)
-            if not success:
+            if not success and not removed_from_store:
                 self.excluded_networks.add(clean_ssid)
                 logger.info(f"Rede '{clean_ssid}' adicionada à lista de exclusão como fallback")
                 success = True
             
+            success = success or removed_from_store
+            
             if success:
                 # Reiniciar wpa_supplicant para aplicar mudanças
                 try:
-                    subprocess.run(['pkill', '-f', 'wpa_supplicant'], capture_output=True)
+                    run_command(['pkill', '-f', 'wpa_supplicant'])
                     time.sleep(1)
                     logger.info("wpa_supplicant reiniciado após exclusão")
                     
@@ -438,9 +417,10 @@ dhcp-range=192.168.4.10,192.168.4.50,255.255.255.0,24h
     def stop_hotspot(self):
         """Parar hotspot"""
         try:
-            subprocess.run(['pkill', 'hostapd'], capture_output=True)
-            subprocess.run(['pkill', 'dnsmasq'], capture_output=True)
+            run_command(['pkill', 'hostapd'])
+            run_command(['pkill', 'dnsmasq'])
             self.hotspot_active = False
+            RUNNER.invalidate()
             logger.info("Hotspot TUPANA parado")
         except Exception as e:
             logger.error(f"Erro ao parar hotspot: {e}")
@@ -496,6 +476,14 @@ def api_delete_network():
     success = wifi_manager.delete_saved_network(ssid)
     return jsonify({'success': success})
 
+@app.route('/api/commands')
+def api_commands():
+    """API: Orçamento de processos externos (ops/s e CPU-ms/s)"""
+    try:
+        return jsonify(RUNNER.budget_report(float(request.args.get('window', 60))))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 def monitor_connection():
     """Monitor de conexão Wi-Fi melhorado"""
     connection_failures = 0
@@ -512,8 +500,7 @@ def monitor_connection():
             connectivity_ok = False
             try:
                 # Tentar ping para gateway local
-                ping_result = subprocess.run(['ping', '-c', '1', '-W', '3', '8.8.8.8'], 
-                                           capture_output=True, timeout=5)
+                ping_result = run_command(INTERNET_PROBE, timeout=5, cache_ttl=PROBE_CACHE_TTL)
                 connectivity_ok = ping_result.returncode == 0
             except:
                 connectivity_ok = False
@@ -7,36 +7,65 @@ Monitora conexão Wi-Fi e ativa hotspot quando necessário
 import os
 import sys
 import time
+import signal
 import logging
 import threading
-from datetime import datetime
 
+import clocks
 from wifi_monitor import WiFiMonitor
 from hotspot_manager import HotspotManager
-from web_interface import WebInterface
 from config_manager import ConfigManager
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/var/log/wifi-manager/wifi-manager.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from failover_predictor import FailoverPredictor
+from state_snapshot import StateSnapshot
+from boot_milestones import BOOT
+from memory_profile import PROFILE
+from log_pipeline import PIPELINE
+from metrics import MODE, MODE_TRANSITIONS, STEADY_STATE, install_subprocess_counter, update_process_rss
 
 logger = logging.getLogger(__name__)
 
+def configure_logging():
+    """Configura o log assíncrono (arquivo rotacionado, saída padrão e buffer em memória)"""
+    PIPELINE.start()
+
 class WiFiManagerSystem:
+    # Intervalo de verificação enquanto o enlace está em colapso
+    COLLAPSE_CHECK_INTERVAL = 2
+    
     def __init__(self):
         self.config_manager = ConfigManager()
+        # O log já está ativo com os padrões (configure_logging); aplicar a configuração salva
+        PIPELINE.configure(
+            level=self.config_manager.get_config_value('log_level', 'INFO'),
+            max_mb=self.config_manager.get_config_value('log_max_mb', 5),
+            rotate_hours=self.config_manager.get_config_value('log_rotate_hours', 24),
+            backups=self.config_manager.get_config_value('log_backups', 5),
+            repeat_window=self.config_manager.get_config_value('log_repeat_window', 60),
+            ring_size=self.config_manager.get_config_value('log_buffer_size', 1000))
+        self.state_snapshot = StateSnapshot(
+            os.path.join(self.config_manager.config_dir, 'state.json'),
+            max_age=self.config_manager.get_config_value('state_snapshot_max_age', StateSnapshot.MAX_AGE))
+        self.snapshot_interval = self.config_manager.get_config_value('state_snapshot_interval', 30)
+        self.fast_path = self.config_manager.get_config_value('boot_fast_path', True)
+        # Perfil de memória antes dos componentes: define o tamanho dos buffers
+        PROFILE.configure(self.config_manager.get_config_value('memory_profile', 'default'))
         self.wifi_monitor = WiFiMonitor(self.config_manager)
-        self.hotspot_manager = HotspotManager(self.config_manager)
-        self.web_interface = WebInterface(self.config_manager, self.wifi_monitor, self.hotspot_manager)
+        self.hotspot_manager = HotspotManager(self.config_manager, self.wifi_monitor.backend)
+        self.failover_predictor = FailoverPredictor(self.wifi_monitor, self.hotspot_manager)
+        self.wifi_monitor.telemetry.add_listener(self.failover_predictor.on_sample)
+        # Interface web criada sob demanda: o Flask só é importado se for usado
+        self.web_enabled = self.config_manager.get_config_value('web_enabled', True)
+        self._web_interface = None
+        self._web_lock = threading.Lock()
         
         self.running = False
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+        # Sinal de encerramento recebido (o tratador só interrompe o loop principal)
+        self._signal = None
         self.mode = "wifi"  # "wifi" ou "hotspot"
+        self.consecutive_failures = 0
+        self.reconnect_candidate = None  # Melhor rede conhecida do último scan
         self.demo_mode = os.getenv('DEMO_MODE', 'false').lower() == 'true'
         
         # Configurar logging para modo demo
@@ -45,22 +74,86 @@ class WiFiManagerSystem:
             logger.info("Sistema funcionando em modo demonstração")
             logger.info("Para produção no Raspberry Pi, remover DEMO_MODE=true")
         
+    @property
+    def web_interface(self):
+        """Interface web (importa Flask e Jinja no primeiro acesso)"""
+        with self._web_lock:
+            if self._web_interface is None:
+                from web_interface import WebInterface
+                self._web_interface = WebInterface(self.config_manager, self.wifi_monitor,
+                                                   self.hotspot_manager, self.failover_predictor,
+                                                   self.state_snapshot)
+            return self._web_interface
+        
+    def _run_web(self):
+        """Thread da interface web: a importação do Flask corre em paralelo com o boot"""
+        self.web_interface.start()
+        
     def start(self):
         """Inicia o sistema de gerenciamento Wi-Fi"""
         logger.info("Iniciando sistema de gerenciamento Wi-Fi")
-        self.running = True
+        self.running = self._signal is None
+        install_subprocess_counter()
+        
+        # Iniciar interface web em thread separada (em paralelo com a conexão do boot)
+        if self.web_enabled:
+            web_thread = threading.Thread(target=self._run_web, name='web', daemon=True)
+            web_thread.start()
+        else:
+            logger.info("Interface web desativada (web_enabled = false)")
+        
+        self.resume_state()
+        self._set_mode(self.mode)
+        
+        # Telemetria contínua do enlace (sinal, taxas, RTT, perda)
+        self.wifi_monitor.telemetry.start()
+        self.wifi_monitor.history.start()
         
-        # Iniciar interface web em thread separada
-        web_thread = threading.Thread(target=self.web_interface.start, daemon=True)
-        web_thread.start()
+        if self.fast_path and self.mode == "wifi":
+            self.fast_start()
         
-        # Loop principal de monitoramento
+        # Loop principal de monitoramento (termina com stop(), chamado por sinal ou Ctrl+C)
         self.main_loop()
+        if self._signal is not None:
+            logger.info(f"Sinal {signal.Signals(self._signal).name} recebido, parando sistema")
+        self.stop()
         
+    def fast_start(self):
+        """Caminho rápido do boot: melhor rede conhecida com dicas em cache, ou portal imediato"""
+        monitor = self.wifi_monitor
+        if monitor.is_connected():
+            BOOT.mark_connected()
+            return
+            
+        candidate = monitor.cached_candidate()
+        if candidate is None and len(self.config_manager.network_store) == 0 \
+                and not self.config_manager.get_wifi_config():
+            logger.info("Nenhuma rede salva: abrindo o portal de configuração")
+            self.switch_to_hotspot('unconfigured')
+            return
+            
+        started = time.monotonic()
+        if candidate:
+            logger.info(f"Boot rápido: conectando a {candidate['ssid']} com dicas em cache")
+            hints = {'bssid': candidate.get('bssid'), 'frequency': candidate.get('frequency')}
+            success = monitor.connect(candidate['ssid'], candidate['password'],
+                                      check_available=False, hints=hints)
+        else:
+            success = monitor.connect()
+            
+        if success:
+            BOOT.mark_connected(monitor.connect_timings.recent[-1], started)
+        else:
+            # Falha definitiva da melhor rede conhecida: portal sem esperar os ciclos de falha
+            logger.info("Boot rápido sem conexão, ativando o hotspot")
+            self.switch_to_hotspot('boot')
+            
     def main_loop(self):
         """Loop principal do sistema"""
-        consecutive_failures = 0
         max_failures = 3
+        next_snapshot = clocks.monotonic() + self.snapshot_interval
+        trim_interval = PROFILE.get('trim_interval')
+        next_trim = clocks.monotonic() + trim_interval
         
         # Intervalo baseado no modo
         check_interval = 30 if self.demo_mode else 10  # Intervalo maior em demo
@@ -68,31 +161,57 @@ class WiFiManagerSystem:
         if self.demo_mode:
             logger.info(f"Ciclo de verificação: {check_interval}s (modo demo)")
         
+        predictor = self.failover_predictor
+        
         while self.running:
             try:
+                update_process_rss()
                 if self.mode == "wifi":
                     # Modo Wi-Fi: monitorar conexão
                     if self.wifi_monitor.is_connected():
-                        consecutive_failures = 0
-                        if self.demo_mode and consecutive_failures == 0:
-                            logger.debug("[DEMO] Simulando verificação Wi-Fi")
-                        else:
-                            logger.debug("Conexão Wi-Fi ativa")
+                        self.consecutive_failures = 0
+                        predictor.outage_ended('wifi')
+                        BOOT.mark_connected()
+                        self._steady()
+                        logger.debug("Conexão Wi-Fi ativa")
+                        # Amostragem de baixo custo para roaming a um AP mais forte
+                        self.wifi_monitor.roaming_engine.run_cycle()
                     else:
-                        consecutive_failures += 1
+                        # A queda começou na primeira amostra de telemetria que a mostrou,
+                        # não nesta verificação (até check_interval depois)
+                        predictor.outage_started(at=predictor.link_lost_at)
+                        self.consecutive_failures += 1
+                        # Colapso já previsto pelas tendências: não esperar os demais ciclos
+                        if predictor.collapsing:
+                            self.consecutive_failures = max_failures
                         if self.demo_mode:
-                            logger.info(f"[DEMO] Simulando falha Wi-Fi ({consecutive_failures}/{max_failures})")
+                            logger.info(f"[DEMO] Simulando falha Wi-Fi ({self.consecutive_failures}/{max_failures})")
                         else:
-                            logger.warning(f"Falha na conexão Wi-Fi ({consecutive_failures}/{max_failures})")
+                            logger.warning(f"Falha na conexão Wi-Fi ({self.consecutive_failures}/{max_failures})")
                         
-                        if consecutive_failures >= max_failures:
-                            if self.demo_mode:
-                                logger.info("[DEMO] Ativando modo hotspot (simulação)")
+                        if self.consecutive_failures >= max_failures:
+                            # Última tentativa: melhor rede conhecida disponível no scan
+                            # (candidato já aquecido pelo failover preditivo, se houver)
+                            self.reconnect_candidate = predictor.take_candidate()
+                            if ((self.reconnect_candidate or self.should_try_wifi_reconnect())
+                                    and self._connect_to_candidate()):
+                                logger.info("Reconectado a uma rede conhecida, mantendo modo Wi-Fi")
+                                self.consecutive_failures = 0
+                                predictor.outage_ended('wifi')
+                                predictor.cancel()
                             else:
-                                logger.info("Ativando modo hotspot devido a falhas consecutivas")
-                            self.switch_to_hotspot()
+                                if self.demo_mode:
+                                    logger.info("[DEMO] Ativando modo hotspot (simulação)")
+                                else:
+                                    logger.info("Ativando modo hotspot devido a falhas consecutivas")
+                                self.switch_to_hotspot('predicted' if predictor.collapsing else 'failures')
+                                predictor.outage_ended('portal')
+                                predictor.cancel()
                             
                 elif self.mode == "hotspot":
+                    if self.hotspot_manager.running:
+                        self._steady()
+                    self.hotspot_manager.get_connected_clients()
                     # Modo Hotspot: verificar se deve tentar reconectar
                     if self.should_try_wifi_reconnect():
                         if self.demo_mode:
@@ -101,7 +220,18 @@ class WiFiManagerSystem:
                             logger.info("Tentando reconectar ao Wi-Fi")
                         self.switch_to_wifi()
                         
-                time.sleep(check_interval)
+                if clocks.monotonic() >= next_snapshot:
+                    self.save_state()
+                    next_snapshot = clocks.monotonic() + self.snapshot_interval
+                if trim_interval and clocks.monotonic() >= next_trim:
+                    # Devolver ao sistema o heap liberado pelos scans e requisições
+                    PROFILE.trim()
+                    next_trim = clocks.monotonic() + trim_interval
+                    
+                # Acordar antes do intervalo se o preditor detectar colapso
+                interval = self.COLLAPSE_CHECK_INTERVAL if predictor.collapsing else check_interval
+                clocks.wait(predictor.wakeup, interval)
+                predictor.wakeup.clear()
                 
             except KeyboardInterrupt:
                 logger.info("Interrupção recebida, parando sistema")
@@ -109,10 +239,12 @@ class WiFiManagerSystem:
                 break
             except Exception as e:
                 logger.error(f"Erro no loop principal: {e}")
-                time.sleep(check_interval)
+                clocks.sleep(check_interval)
                 
-    def switch_to_hotspot(self):
+    def switch_to_hotspot(self, reason: str = None):
         """Muda para modo hotspot"""
+        if self._stopped or not self.running:
+            return  # encerramento durante o ciclo: não subir o AP de novo
         try:
             if self.demo_mode:
                 logger.info("[DEMO] Mudando para modo hotspot")
@@ -120,7 +252,7 @@ class WiFiManagerSystem:
                 logger.info("Mudando para modo hotspot")
             self.wifi_monitor.disconnect()
             self.hotspot_manager.start_hotspot()
-            self.mode = "hotspot"
+            self._set_mode("hotspot", reason)
             if self.demo_mode:
                 logger.info("[DEMO] Modo hotspot ativado (simulação completa)")
             else:
@@ -134,51 +266,144 @@ class WiFiManagerSystem:
             logger.info("Mudando para modo Wi-Fi")
             self.hotspot_manager.stop_hotspot()
             
-            if self.wifi_monitor.connect():
-                self.mode = "wifi"
+            if self._connect_to_candidate():
+                self._set_mode("wifi", "reconnect")
                 logger.info("Modo Wi-Fi ativado com sucesso")
-            else:
+            elif self.running and not self._stopped:
                 logger.warning("Falha ao conectar Wi-Fi, mantendo hotspot")
                 self.hotspot_manager.start_hotspot()
                 
         except Exception as e:
             logger.error(f"Erro ao ativar Wi-Fi: {e}")
             
+    def _set_mode(self, mode: str, reason: str = None):
+        """Troca o modo atual atualizando as métricas de transição e o histórico"""
+        if mode != self.mode:
+            MODE_TRANSITIONS.inc(from_mode=self.mode, to_mode=mode)
+            self.wifi_monitor.history.record_transition(self.mode, mode, reason)
+            self.mode = mode
+            self.save_state()
+        if mode == "hotspot" and self.hotspot_manager.running:
+            BOOT.mark('portal_up')
+        self.wifi_monitor.telemetry.set_client_mode(mode == "wifi")
+        for name in ("wifi", "hotspot"):
+            MODE.set(1 if name == mode else 0, mode=name)
+            
+    def _snapshot_state(self) -> dict:
+        """Estado retomável após reinício do processo"""
+        monitor = self.wifi_monitor
+        return {
+            'mode': self.mode,
+            'consecutive_failures': self.consecutive_failures,
+            'bss_table': monitor.bss_table.export(),
+            'connect': monitor.connect_timings.export(),
+            'link': monitor.telemetry.export(),
+            'pids': self.hotspot_manager.backend.supervised_pids()
+        }
+        
+    def save_state(self, final: bool = False):
+        """Grava o snapshot de estado (periódico, a cada troca de modo e no encerramento)"""
+        self.state_snapshot.save(self._snapshot_state(), final=final)
+        
+    def resume_state(self):
+        """Retoma modo, contadores e caches de um snapshot recente"""
+        state = self.state_snapshot.load()
+        if state is None:
+            return
+        monitor = self.wifi_monitor
+        restored = {
+            'bss': monitor.bss_table.restore(state.get('bss_table', [])),
+            'connect_attempts': monitor.connect_timings.restore(state.get('connect', {})),
+            'link_samples': monitor.telemetry.restore(state.get('link', {}))
+        }
+        self.consecutive_failures = state.get('consecutive_failures', 0)
+        
+        if state.get('mode') == 'hotspot':
+            # Retomar o hotspot sem esperar três ciclos de falha (reaproveitando os serviços vivos)
+            self.mode = 'hotspot'
+            restored['hotspot_adopted'] = self.hotspot_manager.adopt(state.get('pids') or {})
+            if not restored['hotspot_adopted']:
+                self.hotspot_manager.start_hotspot()
+        
+        self.state_snapshot.resumed(state, restored)
+        logger.info(f"Estado retomado de snapshot com {state['age']:.0f}s: modo {self.mode}, "
+                    f"{self.consecutive_failures} falhas, {restored}")
+        
+    def _steady(self):
+        """Primeiro ciclo com o modo confirmado: registra o tempo até o estado estável"""
+        elapsed = self.state_snapshot.steady(self.mode)
+        if elapsed is not None:
+            resumed = self.state_snapshot.report['resumed']
+            STEADY_STATE.set(elapsed, resumed=str(resumed).lower())
+            logger.info(f"Estado estável ({self.mode}) em {elapsed:.1f}s"
+                        f"{' (retomado de snapshot)' if resumed else ''}")
+            
+    def _connect_to_candidate(self) -> bool:
+        """Conecta à rede escolhida no último scan (ou à melhor rede salva)"""
+        candidate = self.reconnect_candidate
+        self.reconnect_candidate = None
+        if not candidate:
+            return self.wifi_monitor.connect()
+            
+        logger.info(f"Conectando à rede conhecida {candidate['ssid']}")
+        hints = {'bssid': candidate.get('bssid'), 'frequency': candidate.get('frequency')}
+        return self.wifi_monitor.connect(candidate['ssid'], candidate['password'],
+                                         check_available=False, hints=hints)
+            
     def should_try_wifi_reconnect(self):
         """Verifica se deve tentar reconectar ao Wi-Fi"""
-        # Verificar se há configuração Wi-Fi disponível
-        wifi_config = self.config_manager.get_wifi_config()
-        if not wifi_config or not wifi_config.get('ssid'):
-            return False
-            
-        # Verificar se a rede está disponível
-        return self.wifi_monitor.is_network_available(wifi_config['ssid'])
+        # Escolher a melhor rede salva presente em um único scan
+        self.reconnect_candidate = self.wifi_monitor.find_best_known_network()
+        return self.reconnect_candidate is not None
         
     def stop(self):
-        """Para o sistema"""
+        """Para o sistema (uma única vez: SIGTERM, Ctrl+C ou fim do loop)"""
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
         logger.info("Parando sistema de gerenciamento Wi-Fi")
         self.running = False
+        # Acordar o loop principal para que ele termine sem esperar o intervalo
+        self.failover_predictor.wakeup.set()
         
         try:
+            self.wifi_monitor.telemetry.stop()
+            self.wifi_monitor.history.stop()
+            # Hotspot parado antes do snapshot: os PIDs gravados não apontam para serviços
+            # já encerrados (o próximo boot retoma o modo hotspot iniciando-o de novo)
             self.hotspot_manager.stop_hotspot()
-            self.web_interface.stop()
+            self.save_state(final=True)
+            if self._web_interface is not None:
+                self._web_interface.stop()
         except Exception as e:
             logger.error(f"Erro ao parar sistema: {e}")
+            
+    def handle_signal(self, signum, frame):
+        """SIGTERM (docker stop, systemd): só encerra o loop principal
+
+        O tratador roda na thread principal no ponto em que ela foi
+        interrompida, possivelmente segurando locks que stop() e o snapshot
+        usam; stop() é chamado por start() quando main_loop retorna.
+        """
+        self._signal = signum
+        self.running = False
+        self.failover_predictor.wakeup.set()
 
 def main():
     """Função principal"""
-    logger.info("=== Iniciando WiFi Manager System ===")
-    
     # Verificar se está rodando como root
     if os.geteuid() != 0:
         logger.error("Este programa deve ser executado como root")
         sys.exit(1)
         
-    # Criar diretório de logs se não existir
-    os.makedirs('/var/log/wifi-manager', exist_ok=True)
+    configure_logging()
+    logger.info("=== Iniciando WiFi Manager System ===")
     
     try:
         system = WiFiManagerSystem()
+        # Como PID 1 no contêiner, sem tratador o SIGTERM mata o processo sem stop() nem atexit
+        signal.signal(signal.SIGTERM, system.handle_signal)
         system.start()
     except Exception as e:
         logger.error(f"Erro fatal: {e}")
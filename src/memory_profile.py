@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Perfis de memória e relatório de uso (RSS e snapshots do tracemalloc)
+
+O perfil 'low' é para placas de 512 MB que dividem a memória com outra
+carga: limita as threads do servidor web e os streams abertos, encolhe os
+buffers em memória (eventos de comandos, telemetria bruta, fila do
+histórico), restringe as arenas do malloc e devolve periodicamente ao
+sistema a memória liberada. O perfil vem de MEMORY_PROFILE ou da chave
+'memory_profile' da configuração.
+"""
+
+import os
+import gc
+import sys
+import logging
+import threading
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    'default': {
+        'web_threads': 32,              # requisições atendidas simultaneamente
+        'web_streams': 8,               # conexões /scan/stream abertas
+        'command_events': 4096,         # eventos no relatório de orçamento de comandos
+        'telemetry_raw_samples': 3600,  # amostras brutas mantidas por métrica
+        'history_max_pending': 5000,    # registros aguardando gravação no histórico
+        'malloc_arenas': 0,             # 0 = padrão do glibc (8 por núcleo)
+        'trim_interval': 0              # malloc_trim periódico (s); 0 = desligado
+    },
+    'low': {
+        'web_threads': 4,
+        'web_streams': 1,
+        'command_events': 512,
+        'telemetry_raw_samples': 900,
+        'history_max_pending': 1000,
+        'malloc_arenas': 2,
+        'trim_interval': 300
+    }
+}
+
+# mallopt(M_ARENA_MAX): cada thread que aloca pode ganhar uma arena própria no glibc
+M_ARENA_MAX = -8
+
+# Arquivos ignorados nos snapshots (o importador e frames sem origem)
+SNAPSHOT_EXCLUDE = ('<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+                    '<unknown>')
+
+_libc = None
+
+
+def _load_libc():
+    """libc com mallopt/malloc_trim (só glibc), ou None"""
+    global _libc
+    if _libc is None:
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+            _libc = libc if hasattr(libc, 'mallopt') and hasattr(libc, 'malloc_trim') else False
+        except OSError:
+            _libc = False
+    return _libc or None
+
+
+def process_memory() -> Dict[str, int]:
+    """RSS atual e pico (kB), de /proc/self/status"""
+    memory = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:', 'RssAnon:', 'VmData:')):
+                    key, value = line.split(':', 1)
+                    memory[key] = int(value.split()[0])
+    except (OSError, ValueError):
+        pass
+    return {
+        'rss_kb': memory.get('VmRSS'),
+        'peak_rss_kb': memory.get('VmHWM'),
+        'anon_kb': memory.get('RssAnon'),
+        'data_kb': memory.get('VmData')
+    }
+
+
+class MemoryProfile:
+    """Perfil ativo, limpeza periódica e relatório de heap"""
+
+    def __init__(self):
+        self.name = 'default'
+        self.settings = dict(PROFILES['default'])
+        self._lock = threading.Lock()
+        self._baseline = None  # snapshot do relatório anterior (tracemalloc.Snapshot)
+        self.trims = 0
+
+    def configure(self, name: str = None) -> Dict:
+        """Ativa o perfil (MEMORY_PROFILE tem precedência sobre o nome passado)"""
+        name = os.getenv('MEMORY_PROFILE') or name or 'default'
+        if name not in PROFILES:
+            logger.warning(f"Perfil de memória desconhecido: {name}; usando 'default'")
+            name = 'default'
+        self.name = name
+        self.settings = dict(PROFILES[name])
+
+        arenas = self.settings['malloc_arenas']
+        libc = _load_libc()
+        if arenas and libc is not None:
+            libc.mallopt(M_ARENA_MAX, arenas)
+
+        from command_runner import RUNNER
+        RUNNER.set_event_capacity(self.settings['command_events'])
+        logger.info(f"Perfil de memória: {name}")
+        return self.settings
+
+    def get(self, key: str):
+        return self.settings[key]
+
+    def trim(self) -> bool:
+        """Coleta o lixo e devolve ao sistema as páginas livres do heap (glibc)"""
+        gc.collect()
+        libc = _load_libc()
+        if libc is None:
+            return False
+        self.trims += 1
+        return bool(libc.malloc_trim(0))
+
+    # ------------------------------------------------------------------
+    # tracemalloc (importado só quando usado: carrega pickle e linecache)
+    # ------------------------------------------------------------------
+
+    def start_tracing(self, frames: int = 1):
+        """Liga o tracemalloc (custa memória e CPU; usar só durante a investigação)"""
+        import tracemalloc
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+                logger.info(f"tracemalloc ativado ({frames} quadro(s))")
+            self._baseline = None
+
+    def stop_tracing(self):
+        import tracemalloc
+        with self._lock:
+            self._baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc desativado")
+
+    @staticmethod
+    def _stats(stats: List, top: int) -> List[Dict]:
+        import tracemalloc
+        rows = []
+        for stat in stats[:top]:
+            row = {'location': str(stat.traceback[0]) if stat.traceback else None,
+                   'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+            if isinstance(stat, tracemalloc.StatisticDiff):
+                row['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+                row['count_diff'] = stat.count_diff
+            rows.append(row)
+        return rows
+
+    def heap_report(self, top: int = 20, group_by: str = 'lineno') -> Dict:
+        """Maiores alocações vivas e o crescimento desde o relatório anterior"""
+        if 'tracemalloc' not in sys.modules or not sys.modules['tracemalloc'].is_tracing():
+            return {'tracing': False}
+        import tracemalloc
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        filters += [tracemalloc.Filter(False, pattern) for pattern in SNAPSHOT_EXCLUDE]
+        with self._lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+            current, peak = tracemalloc.get_traced_memory()
+            report = {
+                'tracing': True,
+                'frames': tracemalloc.get_traceback_limit(),
+                'traced_kb': round(current / 1024, 1),
+                'traced_peak_kb': round(peak / 1024, 1),
+                'overhead_kb': round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+                'top': self._stats(snapshot.statistics(group_by), top)
+            }
+            if self._baseline is not None:
+                report['growth'] = self._stats(snapshot.compare_to(self._baseline, group_by), top)
+            self._baseline = snapshot
+        return report
+
+    def report(self, top: int = 20) -> Dict:
+        """RSS, coletor de lixo, threads e (se ativo) o snapshot do heap"""
+        return {
+            'profile': self.name,
+            'settings': self.settings,
+            'process': process_memory(),
+            'threads': threading.active_count(),
+            'gc': {'counts': gc.get_count(), 'tracked_objects': len(gc.get_objects())},
+            'trims': self.trims,
+            'heap': self.heap_report(top)
+        }
+
+
+PROFILE = MemoryProfile()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Módulo de métricas pré-agregadas no formato de exposição do Prometheus
+
+Os valores são atualizados no momento em que os eventos acontecem; a coleta
+(/metrics) apenas serializa o que já existe, sem executar comandos.
+"""
+
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from connect_timing import LatencyHistogram, LATENCY_BUCKETS
+
+RTT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+OUTAGE_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def histogram_lines(name: str, labels: Dict[str, str], histogram: LatencyHistogram) -> List[str]:
+    """Linhas _bucket/_sum/_count de um histograma"""
+    lines = []
+    for bound, count in histogram.cumulative():
+        bucket_labels = dict(labels, le=_format_value(bound))
+        lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+    return lines
+
+
+class _Metric:
+    """Base das métricas com rótulos (uma série por combinação de valores)"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        lines = self.header()
+        for key, value in series:
+            lines.append(f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = LatencyHistogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            for key, histogram in self._series.items():
+                lines.extend(histogram_lines(self.name, self._labels(key), histogram))
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas e coletores de estruturas já agregadas"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """Coletor que serializa histogramas mantidos por outro módulo"""
+        self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+MODE = REGISTRY.gauge('wifi_manager_mode', 'Modo atual (1 = ativo)', ('mode',))
+MODE_TRANSITIONS = REGISTRY.counter('wifi_manager_mode_transitions_total',
+                                    'Transições entre os modos wifi e hotspot', ('from_mode', 'to_mode'))
+FAILOVERS = REGISTRY.counter('wifi_manager_failovers_total',
+                             'Interrupções encerradas, por resolução (wifi ou portal)', ('resolution', 'predicted'))
+FAILOVER_DURATION = REGISTRY.histogram('wifi_manager_failover_duration_seconds',
+                                       'Duração da interrupção percebida pelo usuário', ('resolution',),
+                                       OUTAGE_BUCKETS)
+PROBE_RTT = REGISTRY.histogram('wifi_manager_probe_rtt_seconds', 'RTT das sondas de conectividade',
+                               ('source',), RTT_BUCKETS)
+SCAN_DURATION = REGISTRY.histogram('wifi_manager_scan_duration_seconds', 'Duração dos scans Wi-Fi',
+                                   ('source',))
+SUBPROCESS_SPAWNS = REGISTRY.counter('wifi_manager_subprocess_spawns_total',
+                                     'Processos externos criados, por comando', ('command',))
+SUBPROCESS_DURATION = REGISTRY.histogram('wifi_manager_subprocess_duration_seconds',
+                                         'Duração dos comandos do executor, por comando', ('command',))
+SUBPROCESS_TIMEOUTS = REGISTRY.counter('wifi_manager_subprocess_timeouts_total',
+                                       'Comandos encerrados por timeout (ou fila de concorrência)', ('command',))
+SUBPROCESS_CACHE_HITS = REGISTRY.counter('wifi_manager_subprocess_cache_hits_total',
+                                         'Leituras atendidas pelo cache do executor', ('command',))
+HTTP_REQUESTS = REGISTRY.counter('wifi_manager_http_requests_total', 'Requisições HTTP',
+                                 ('route', 'method', 'status'))
+HTTP_LATENCY = REGISTRY.histogram('wifi_manager_http_request_duration_seconds',
+                                  'Latência das requisições HTTP por rota', ('route', 'method'), HTTP_BUCKETS)
+HOTSPOT_CLIENTS = REGISTRY.gauge('wifi_manager_hotspot_clients', 'Clientes conectados ao hotspot')
+STEADY_STATE = REGISTRY.gauge('wifi_manager_time_to_steady_state_seconds',
+                              'Tempo do início do processo até o primeiro ciclo com o modo confirmado',
+                              ('resumed',))
+BOOT_MILESTONE = REGISTRY.gauge('wifi_manager_boot_milestone_seconds',
+                                'Segundos do início do processo até cada marco do boot', ('milestone',))
+PROCESS_RSS = REGISTRY.gauge('wifi_manager_process_resident_memory_bytes', 'Memória residente do processo')
+LOG_RECORDS = REGISTRY.counter('wifi_manager_log_records_total',
+                               'Registros de log gravados, colapsados como repetição ou descartados (fila cheia)',
+                               ('outcome',))
+
+
+def update_process_rss():
+    """Atualiza o gauge de RSS a partir de /proc/self/statm (chamado pelo loop principal)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        PROCESS_RSS.set(resident_pages * os.sysconf('SC_PAGE_SIZE'))
+    except (OSError, ValueError, IndexError):
+        pass
+
+
+def _audit_subprocess(event: str, args: tuple):
+    if event != 'subprocess.Popen':
+        return
+    executable, argv = args[0], args[1]
+    if isinstance(argv, (list, tuple)) and argv:
+        command = argv[0]
+    elif isinstance(argv, (str, bytes)) and argv:
+        command = argv.split()[0]
+    else:
+        command = executable
+    if isinstance(command, bytes):
+        command = command.decode(errors='replace')
+    SUBPROCESS_SPAWNS.inc(command=os.path.basename(str(command)))
+
+
+_audit_installed = False
+
+
+def install_subprocess_counter():
+    """Conta toda criação de processo (subprocess.run/Popen) via audit hook"""
+    global _audit_installed
+    if not _audit_installed:
+        sys.addaudithook(_audit_subprocess)
+        _audit_installed = True
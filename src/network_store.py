@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Módulo para armazenamento de múltiplas redes Wi-Fi salvas
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import clocks
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros WPA/WPA2-Personal (IEEE 802.11i): PBKDF2-HMAC-SHA1, 4096 iterações, 256 bits
+PSK_ITERATIONS = 4096
+PSK_LENGTH = 32
+
+
+def is_hex_psk(value: Optional[str]) -> bool:
+    """Verifica se o valor já é uma PSK hexadecimal de 64 dígitos"""
+    return bool(value) and len(value) == 64 and all(c in '0123456789abcdefABCDEF' for c in value)
+
+
+def derive_psk(ssid: str, passphrase: str) -> str:
+    """Deriva a PSK hexadecimal (igual ao wpa_passphrase) a partir da senha ASCII"""
+    return hashlib.pbkdf2_hmac('sha1', passphrase.encode('utf-8'), ssid.encode('utf-8'),
+                               PSK_ITERATIONS, PSK_LENGTH).hex()
+
+
+class SavedNetwork:
+    """Rede salva com prioridade e histórico de conexões"""
+
+    __slots__ = (
+        'ssid', 'password', 'psk', 'priority', 'saved_at',
+        'last_bssid', 'last_frequency', 'last_seen', 'seen_bssid', 'seen_frequency',
+        'last_success', 'success_count', 'failure_count',
+        'consecutive_failures', 'connect_times'
+    )
+
+    # Quantidade de tempos de conexão mantidos para cálculo da mediana
+    MAX_CONNECT_SAMPLES = 20
+
+    def __init__(self, ssid: str, password: str = None, priority: int = 0):
+        self.ssid = ssid
+        self.password = password
+        self.psk = None  # PSK hexadecimal derivada de (ssid, password)
+        self.priority = priority
+        self.saved_at = clocks.now()
+        # BSS da última conexão bem-sucedida (dicas da reconexão rápida)
+        self.last_bssid = None
+        self.last_frequency = None
+        self.last_seen = None
+        # BSS mais forte do último scan (somente em memória, não é gravado)
+        self.seen_bssid = None
+        self.seen_frequency = None
+        self.last_success = None
+        self.success_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+        self.connect_times: List[float] = []
+
+    @property
+    def median_connect_time(self) -> Optional[float]:
+        """Mediana dos tempos de conexão bem-sucedidos (segundos)"""
+        if not self.connect_times:
+            return None
+        # Mediana direta (o módulo statistics custa dezenas de ms para importar no Pi Zero)
+        times = sorted(self.connect_times)
+        middle = len(times) // 2
+        return times[middle] if len(times) % 2 else (times[middle - 1] + times[middle]) / 2
+
+    def to_dict(self, include_password: bool = True) -> Dict:
+        data = {
+            'ssid': self.ssid,
+            'priority': self.priority,
+            'saved_at': self.saved_at,
+            'last_bssid': self.last_bssid,
+            'last_frequency': self.last_frequency,
+            'last_seen': self.last_seen,
+            'last_success': self.last_success,
+            'success_count': self.success_count,
+            'failure_count': self.failure_count,
+            'consecutive_failures': self.consecutive_failures,
+            'connect_times': list(self.connect_times),
+            'median_connect_time': self.median_connect_time
+        }
+        if include_password:
+            data['password'] = self.password
+            data['psk'] = self.psk
+        else:
+            data['has_password'] = bool(self.password)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SavedNetwork':
+        network = cls(data['ssid'], data.get('password'), int(data.get('priority', 0)))
+        network.psk = data.get('psk')
+        network.saved_at = data.get('saved_at', network.saved_at)
+        network.last_bssid = data.get('last_bssid')
+        network.last_frequency = data.get('last_frequency')
+        network.last_seen = data.get('last_seen')
+        network.last_success = data.get('last_success')
+        network.success_count = int(data.get('success_count', 0))
+        network.failure_count = int(data.get('failure_count', 0))
+        network.consecutive_failures = int(data.get('consecutive_failures', 0))
+        network.connect_times = list(data.get('connect_times', []))[-cls.MAX_CONNECT_SAMPLES:]
+        return network
+
+
+class NetworkStore:
+    """Armazena redes salvas indexadas por SSID"""
+
+    # Penalidade de sinal (pontos percentuais) por falha consecutiva
+    FAILURE_PENALTY = 10
+    MAX_FAILURE_PENALTY = 50
+
+    # Máximo de PSKs mantidas para redes ainda não salvas
+    MAX_PENDING_PSKS = 8
+
+    def __init__(self, store_file: str):
+        self.store_file = store_file
+        self._networks: Dict[str, SavedNetwork] = {}
+        self._lock = threading.RLock()
+        # PSKs derivadas para redes ainda não salvas (ex.: primeira conexão)
+        self._pending_psks: Dict[Tuple[str, str], str] = {}
+        # Derivações em segundo plano: SSID -> evento sinalizado ao terminar, e as threads
+        self._deriving: Dict[str, threading.Event] = {}
+        self._derivation_threads: List[threading.Thread] = []
+
+        store_dir = os.path.dirname(store_file)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+        self._load()
+
+        # Derivar PSKs ausentes fora do caminho crítico de conexão
+        pending = [net.ssid for net in self._networks.values() if self._needs_psk(net)]
+        if pending:
+            self._derive_psk_async(pending)
+
+    def _load(self):
+        """Carrega redes salvas do disco"""
+        try:
+            if not os.path.exists(self.store_file):
+                return
+            with open(self.store_file, 'r') as f:
+                data = json.load(f)
+            for entry in data.get('networks', {}).values():
+                network = SavedNetwork.from_dict(entry)
+                self._networks[network.ssid] = network
+            logger.debug(f"{len(self._networks)} redes salvas carregadas")
+        except Exception as e:
+            logger.error(f"Erro ao carregar redes salvas: {e}")
+
+    def save(self) -> bool:
+        """Grava redes salvas no disco (escrita atômica)"""
+        try:
+            with self._lock:
+                data = {
+                    'version': 1,
+                    'networks': {ssid: net.to_dict() for ssid, net in self._networks.items()}
+                }
+                # Temporário exclusivo: outro processo (ou instância) pode gravar o mesmo arquivo
+                fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(self.store_file) + '.',
+                                                suffix='.tmp', dir=os.path.dirname(self.store_file) or '.')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(data, f, indent=2)
+                    os.replace(tmp_file, self.store_file)
+                except BaseException:
+                    os.remove(tmp_file)
+                    raise
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar redes: {e}")
+            return False
+
+    def __contains__(self, ssid: str) -> bool:
+        return ssid in self._networks
+
+    def __len__(self) -> int:
+        return len(self._networks)
+
+    def get(self, ssid: str) -> Optional[SavedNetwork]:
+        """Retorna rede salva pelo SSID"""
+        return self._networks.get(ssid)
+
+    def list_networks(self) -> List[SavedNetwork]:
+        """Retorna redes salvas ordenadas por prioridade"""
+        with self._lock:
+            return sorted(self._networks.values(),
+                          key=lambda net: (net.priority, net.last_success or 0),
+                          reverse=True)
+
+    def add_network(self, ssid: str, password: str = None, priority: int = None) -> SavedNetwork:
+        """Adiciona ou atualiza rede salva"""
+        with self._lock:
+            network = self._networks.get(ssid)
+            if network is None:
+                network = SavedNetwork(ssid, password, priority or 0)
+                network.psk = self._pending_psks.pop((ssid, password), None)
+                self._networks[ssid] = network
+                logger.info(f"Rede adicionada às redes salvas: {ssid}")
+            else:
+                if network.password != password:
+                    network.password = password
+                    network.psk = None
+                    network.consecutive_failures = 0
+                if priority is not None:
+                    network.priority = priority
+            self.save()
+
+        if self._needs_psk(network):
+            self._derive_psk_async([ssid])
+        return network
+
+    @staticmethod
+    def _is_passphrase(password: Optional[str]) -> bool:
+        # Senhas WPA ASCII têm entre 8 e 63 caracteres
+        return bool(password) and 8 <= len(password) <= 63
+
+    def _needs_psk(self, network: SavedNetwork) -> bool:
+        return self._is_passphrase(network.password) and network.psk is None
+
+    def _derive_psk_async(self, ssids: List[str]):
+        """Deriva PSKs em thread separada, de baixa prioridade"""
+        with self._lock:
+            # SSIDs já em derivação não entram de novo
+            ssids = [ssid for ssid in ssids if ssid not in self._deriving]
+            if not ssids:
+                return
+            for ssid in ssids:
+                self._deriving[ssid] = threading.Event()
+            thread = threading.Thread(target=self._derive_pending_psks, args=(ssids,),
+                                      name='psk-derivation', daemon=True)
+            self._derivation_threads = [t for t in self._derivation_threads if t.is_alive()]
+            self._derivation_threads.append(thread)
+        thread.start()
+
+    def _derive_pending_psks(self, ssids: List[str]):
+        try:
+            # No Linux a prioridade vale por thread: não competir com o loop principal
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+        stored = 0
+        try:
+            for ssid in ssids:
+                try:
+                    network = self._networks.get(ssid)
+                    if network is None or not self._needs_psk(network):
+                        continue
+                    password = network.password
+                    psk = derive_psk(ssid, password)
+                    with self._lock:
+                        # Senha pode ter mudado durante a derivação
+                        if network.password == password and network.psk is None:
+                            network.psk = psk
+                            stored += 1
+                    logger.debug(f"PSK pré-computada para {ssid}")
+                finally:
+                    with self._lock:
+                        event = self._deriving.pop(ssid, None)
+                    if event is not None:
+                        event.set()
+        finally:
+            # SSIDs não alcançados (erro no meio da lista) não ficam esperando para sempre
+            with self._lock:
+                for ssid in ssids:
+                    event = self._deriving.pop(ssid, None)
+                    if event is not None:
+                        event.set()
+        if stored:
+            self.save()
+
+    def wait_pending(self, timeout: float = None) -> bool:
+        """Aguarda as derivações em segundo plano (e a gravação que as segue); True se terminaram"""
+        with self._lock:
+            threads = list(self._derivation_threads)
+        deadline = None if timeout is None else clocks.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - clocks.monotonic()))
+        return not any(thread.is_alive() for thread in threads)
+
+    def get_psk(self, ssid: str, password: str = None) -> Optional[str]:
+        """Retorna a PSK hexadecimal de (ssid, password), usando o cache quando possível"""
+        if is_hex_psk(password):
+            return password.lower()
+        if not self._is_passphrase(password):
+            return None
+
+        network = self._networks.get(ssid)
+        if network is not None and network.password == password:
+            # Derivação em segundo plano da mesma rede: esperar por ela em vez de repetir o PBKDF2
+            event = self._deriving.get(ssid)
+            if event is not None:
+                event.wait()
+            if network.psk and network.password == password:
+                return network.psk
+
+        # Cache ausente (rede nova ou senha trocada durante a derivação): calcular agora
+        pending = self._pending_psks.get((ssid, password))
+        if pending:
+            return pending
+        psk = derive_psk(ssid, password)
+        with self._lock:
+            if network is not None and network.password == password:
+                network.psk = psk
+                self.save()
+            else:
+                if len(self._pending_psks) >= self.MAX_PENDING_PSKS:
+                    self._pending_psks.clear()
+                self._pending_psks[(ssid, password)] = psk
+        return psk
+
+    def remove_network(self, ssid: str) -> bool:
+        """Remove rede salva"""
+        with self._lock:
+            if self._networks.pop(ssid, None) is None:
+                return False
+            self.save()
+        logger.info(f"Rede removida das redes salvas: {ssid}")
+        return True
+
+    def record_success(self, ssid: str, connect_time: float = None,
+                       bssid: str = None, frequency: int = None):
+        """Registra conexão bem-sucedida"""
+        with self._lock:
+            network = self._networks.get(ssid)
+            if network is None:
+                return
+            network.success_count += 1
+            network.consecutive_failures = 0
+            network.last_success = clocks.now()
+            network.last_seen = network.last_success
+            if bssid:
+                network.last_bssid = bssid
+            if frequency:
+                network.last_frequency = frequency
+            if connect_time is not None:
+                network.connect_times.append(round(connect_time, 3))
+                del network.connect_times[:-SavedNetwork.MAX_CONNECT_SAMPLES]
+            self.save()
+
+    def record_failure(self, ssid: str):
+        """Registra falha de conexão"""
+        with self._lock:
+            network = self._networks.get(ssid)
+            if network is None:
+                return
+            network.failure_count += 1
+            network.consecutive_failures += 1
+            self.save()
+
+    def update_sightings(self, networks: List[Dict]):
+        """Atualiza BSSID/frequência vistos no último scan (seen_*, não gravados)
+
+        O último BSS bom (last_bssid/last_frequency) só muda em record_success:
+        um AP apenas visto no scan não serve de dica para a reconexão rápida.
+        """
+        now = clocks.now()
+        best_signal: Dict[str, int] = {}
+        with self._lock:
+            for net in networks:
+                saved = self._networks.get(net.get('ssid'))
+                if saved is None:
+                    continue
+                # Com vários APs da mesma rede, guardar o de sinal mais forte
+                signal = net.get('signal_strength', 0)
+                if signal < best_signal.get(saved.ssid, -1):
+                    continue
+                best_signal[saved.ssid] = signal
+                saved.last_seen = now
+                saved.seen_bssid = net.get('bssid') or saved.seen_bssid
+                saved.seen_frequency = net.get('frequency') or saved.seen_frequency
+
+    def _score(self, saved: SavedNetwork, scanned: Dict) -> Tuple:
+        penalty = min(saved.consecutive_failures * self.FAILURE_PENALTY, self.MAX_FAILURE_PENALTY)
+        return (saved.priority, scanned.get('signal_strength', 0) - penalty)
+
+    def select_best(self, networks: List[Dict]) -> Optional[Tuple[SavedNetwork, Dict]]:
+        """Escolhe a melhor rede conhecida presente em um scan"""
+        best = None
+        best_score = None
+        with self._lock:
+            for net in networks:
+                saved = self._networks.get(net.get('ssid'))
+                if saved is None:
+                    continue
+                score = self._score(saved, net)
+                if best_score is None or score > best_score:
+                    best, best_score = (saved, net), score
+        return best
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Interface dos backends de rádio (modo estação e ponto de acesso)
+
+Os backends concentram tudo o que toca o hardware: scan, conexão,
+desconexão, estado do enlace, início/parada do AP e lista de estações.
+WiFiMonitor e HotspotManager contêm apenas a lógica de decisão.
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Backends aceitos em RADIO_BACKEND ('auto' = nmcli com fallback para wpa_supplicant;
+# 'replay' = backends do sistema servidos pelo trace de COMMAND_TRACE_REPLAY)
+BACKEND_KINDS = ('auto', 'nmcli', 'wpa_supplicant', 'fake', 'replay')
+
+
+class Station:
+    """Cliente do AP (registro compacto: a lista é relida a cada ciclo do hotspot)"""
+
+    __slots__ = ('ip', 'mac', 'hostname')
+
+    def __init__(self, ip: str, mac: str, hostname: str = 'Unknown'):
+        self.ip = ip
+        self.mac = mac
+        self.hostname = hostname
+
+    def to_dict(self) -> Dict:
+        return {'ip': self.ip, 'mac': self.mac, 'hostname': self.hostname}
+
+
+class RadioBackend:
+    """Operações de rádio usadas pelo gerenciador"""
+
+    name = 'base'
+    # Backends simulados não dependem de processos externos (ping, iw...)
+    simulated = False
+
+    def scan(self) -> List[Dict]:
+        """Redes visíveis: ssid, bssid, signal_strength (%), frequency (MHz), encrypted"""
+        raise NotImplementedError
+
+    def bss_scan(self, active: bool = True) -> List[Dict]:
+        """BSS vistos (bssid, ssid, frequency, signal_dbm); passivo = cache do driver"""
+        raise NotImplementedError
+
+    def connect(self, ssid: str, password: str = None, hints: Dict = None,
+                timeout: float = None) -> bool:
+        """Associa, autentica e obtém IP; hints = {'bssid', 'frequency'}"""
+        raise NotImplementedError
+
+    def disconnect(self):
+        raise NotImplementedError
+
+    def roam(self, ssid: str, bssid: str, timeout: float) -> bool:
+        """Reassociação direcionada a outro BSS da mesma rede"""
+        raise NotImplementedError
+
+    def interface_state(self) -> Dict:
+        """Estado da interface: exists, up, has_ip"""
+        raise NotImplementedError
+
+    def link_state(self) -> Dict:
+        """Enlace atual: bssid, ssid, frequency, signal_dbm, tx_bitrate"""
+        raise NotImplementedError
+
+    def station_stats(self) -> Dict:
+        """Contadores da estação associada: signal_dbm, tx/rx_bitrate, tx_retries, tx_failed"""
+        raise NotImplementedError
+
+    def link_signal(self) -> Optional[float]:
+        """Sinal (dBm) do enlace atual, leitura barata para amostragem frequente (None se desassociado)"""
+        return self.station_stats().get('signal_dbm')
+
+    def has_connectivity(self) -> bool:
+        """Teste de conectividade com a internet"""
+        raise NotImplementedError
+
+    def wait_connectivity(self, timeout: float) -> bool:
+        """Aguarda IP e conectividade até o prazo"""
+        raise NotImplementedError
+
+    def gateway(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def probe_rtt(self, host: str = None, count: int = 3) -> Optional[float]:
+        """RTT médio (ms) até o host (padrão: gateway)"""
+        raise NotImplementedError
+
+    def prepare_ap(self, settings: Dict):
+        """Prepara antecipadamente a configuração do AP (opcional)"""
+
+    def discard_prepared_ap(self):
+        """Descarta a configuração preparada (opcional)"""
+
+    def start_ap(self, settings: Dict) -> bool:
+        """Inicia o ponto de acesso; settings = ssid, password, ip_range, dhcp_range"""
+        raise NotImplementedError
+
+    def stop_ap(self):
+        raise NotImplementedError
+
+    def ap_running(self) -> bool:
+        raise NotImplementedError
+
+    def list_stations(self) -> List[Station]:
+        """Clientes do AP"""
+        raise NotImplementedError
+
+    def supervised_pids(self) -> Dict[str, int]:
+        """PIDs dos serviços iniciados pelo backend (nome -> pid), para o snapshot de estado"""
+        return {}
+
+    def adopt_ap(self, pids: Dict[str, int]) -> bool:
+        """Assume um AP deixado por um processo anterior se os serviços seguem vivos (opcional)"""
+        return False
+
+
+def backend_kind() -> str:
+    """Backend configurado (RADIO_BACKEND; DEMO_MODE usa o simulado)"""
+    kind = os.getenv('RADIO_BACKEND')
+    if not kind:
+        kind = 'fake' if os.getenv('DEMO_MODE', 'false').lower() == 'true' else 'auto'
+    if kind not in BACKEND_KINDS:
+        logger.warning(f"RADIO_BACKEND inválido: {kind}, usando 'auto'")
+        kind = 'auto'
+    return kind
+
+
+def create_backends(interface: str, network_store=None, timings=None, dhcp_client=None,
+                    kind: str = None) -> List[RadioBackend]:
+    """Backends em ordem de tentativa de conexão; o primeiro também atende scan, enlace e AP"""
+    kind = kind or backend_kind()
+    if kind == 'fake':
+        from fake_radio import FakeBackend, FakeRadioEnvironment
+        environment = FakeRadioEnvironment.from_env()
+        return [FakeBackend(environment, interface=interface, timings=timings)]
+
+    from system_radio import NmcliBackend, WpaSupplicantBackend
+    if kind == 'replay':
+        from command_runner import RUNNER
+        if not RUNNER.replaying:
+            RUNNER.configure_trace(replay=os.getenv('COMMAND_TRACE_REPLAY'))
+    backends = []
+    if kind in ('auto', 'nmcli', 'replay'):
+        backends.append(NmcliBackend(interface, network_store, timings))
+    if kind in ('auto', 'wpa_supplicant', 'replay'):
+        backends.append(WpaSupplicantBackend(interface, network_store, timings, dhcp_client))
+    if kind == 'replay':
+        for backend in backends:
+            # Sem processos reais: a telemetria usa sondas pontuais (ping do trace)
+            backend.simulated = True
+    return backends
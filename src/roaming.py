@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Módulo de roaming oportunista entre pontos de acesso
+"""
+
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+import clocks
+from metrics import SCAN_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class BssSample:
+    """Média móvel exponencial (EWMA) do sinal de um BSS"""
+
+    __slots__ = ('bssid', 'ssid', 'frequency', 'ewma_rssi', 'samples', 'last_seen')
+
+    def __init__(self, bssid: str, ssid: str, frequency: int, rssi: float, now: float):
+        self.bssid = bssid
+        self.ssid = ssid
+        self.frequency = frequency
+        self.ewma_rssi = rssi
+        self.samples = 1
+        self.last_seen = now
+
+    def update(self, rssi: float, alpha: float, now: float):
+        self.ewma_rssi = alpha * rssi + (1 - alpha) * self.ewma_rssi
+        self.samples += 1
+        self.last_seen = now
+
+
+class RoamingEngine:
+    """Amostra APs com baixo custo enquanto conectado e troca para um BSS melhor"""
+
+    # Bônus (dB) para BSS em 5 GHz, que costuma oferecer taxas maiores
+    BAND_5GHZ_BONUS = 5
+    # A cada N amostras faz um scan ativo; nas demais lê o cache do kernel (sem tempo de rádio)
+    ACTIVE_SCAN_EVERY = 5
+    # Amostras mínimas de um candidato antes de considerar o roaming
+    MIN_CANDIDATE_SAMPLES = 2
+    # BSS não visto por esse tempo é descartado da tabela
+    STALE_AFTER = 600
+    # Tempo máximo aguardando a reassociação
+    ROAM_TIMEOUT = 5
+
+    def __init__(self, wifi_monitor, config_manager):
+        self.wifi_monitor = wifi_monitor
+        self.config_manager = config_manager
+        self.interface = wifi_monitor.interface
+
+        self.enabled = config_manager.get_config_value('roaming_enabled', True)
+        self.scan_interval = config_manager.get_config_value('roaming_scan_interval', 60)
+        self.hysteresis = config_manager.get_config_value('roaming_hysteresis_db', 8)
+        self.min_dwell = config_manager.get_config_value('roaming_min_dwell', 300)
+        self.min_rssi = config_manager.get_config_value('roaming_min_rssi', -70)
+        self.alpha = config_manager.get_config_value('roaming_ewma_alpha', 0.3)
+
+        self.bss_table: Dict[str, BssSample] = {}
+        self.sample_count = 0
+        self.last_sample = 0.0
+        self.last_roam = -float(self.min_dwell)
+
+        self.started_at = clocks.monotonic()
+        self.roam_count = 0
+        self.failed_roams = 0
+        self.rollbacks = 0
+        self.failed_rollbacks = 0
+        self.history = deque(maxlen=20)
+
+    def run_cycle(self, now: float = None):
+        """Executa uma amostragem, se estiver no momento, e avalia roaming"""
+        if not self.enabled:
+            return
+        now = clocks.monotonic() if now is None else now
+        if now - self.last_sample < self.scan_interval:
+            return
+        self.last_sample = now
+
+        link = self.wifi_monitor.get_link_info()
+        current_bssid = link.get('bssid')
+        if not current_bssid:
+            return
+
+        active = self.sample_count % self.ACTIVE_SCAN_EVERY == 0
+        self.sample_count += 1
+        for bss in self._scan(active):
+            self._update(bss['bssid'], bss['ssid'], bss.get('frequency'), bss['signal_dbm'], now)
+
+        # O sinal da estação associada é mais preciso que o do scan
+        if link.get('signal_dbm') is not None:
+            self._update(current_bssid, link.get('ssid'), link.get('frequency'),
+                         link['signal_dbm'], now)
+        self._expire(now)
+
+        if now - self.last_roam < self.min_dwell:
+            return
+
+        candidate = self._pick_candidate(current_bssid, link.get('ssid'))
+        if candidate:
+            self._roam(candidate, link, now)
+
+    def _scan(self, active: bool) -> List[Dict]:
+        """Scan ativo ocasional ou leitura do cache de BSS do kernel"""
+        try:
+            scan_start = clocks.monotonic()
+            networks = self.wifi_monitor.backend.bss_scan(active)
+            SCAN_DURATION.observe(clocks.monotonic() - scan_start,
+                                  source='roaming_active' if active else 'roaming_dump')
+            return networks
+        except Exception as e:
+            logger.debug(f"Erro na amostragem de roaming: {e}")
+            return []
+
+    def _update(self, bssid: str, ssid: str, frequency: int, rssi: float, now: float):
+        sample = self.bss_table.get(bssid)
+        if sample is None:
+            self.bss_table[bssid] = BssSample(bssid, ssid, frequency, rssi, now)
+        else:
+            sample.update(rssi, self.alpha, now)
+            if frequency:
+                sample.frequency = frequency
+
+    def _expire(self, now: float):
+        for bssid in [b for b, s in self.bss_table.items() if now - s.last_seen > self.STALE_AFTER]:
+            del self.bss_table[bssid]
+
+    def _score(self, sample: BssSample) -> float:
+        bonus = self.BAND_5GHZ_BONUS if (sample.frequency or 0) >= 5000 else 0
+        return sample.ewma_rssi + bonus
+
+    def _pick_candidate(self, current_bssid: str, current_ssid: str) -> Optional[BssSample]:
+        """Escolhe BSS melhor que o atual além da histerese (ou rede salva de maior prioridade)"""
+        current = self.bss_table.get(current_bssid)
+        if current is None:
+            return None
+
+        store = self.config_manager.network_store
+        current_saved = store.get(current_ssid) if current_ssid else None
+        current_priority = current_saved.priority if current_saved else 0
+        current_score = self._score(current)
+
+        best, best_key = None, None
+        for sample in self.bss_table.values():
+            if sample.bssid == current_bssid or sample.samples < self.MIN_CANDIDATE_SAMPLES:
+                continue
+            if sample.ewma_rssi < self.min_rssi:
+                continue
+
+            if sample.ssid == current_ssid:
+                if self._score(sample) - current_score < self.hysteresis:
+                    continue
+                priority = current_priority
+            else:
+                saved = store.get(sample.ssid)
+                if saved is None or saved.priority <= current_priority:
+                    continue
+                priority = saved.priority
+
+            key = (priority, self._score(sample))
+            if best_key is None or key > best_key:
+                best, best_key = sample, key
+        return best
+
+    def _roam(self, target: BssSample, link: Dict, now: float):
+        """Reassocia ao BSS alvo e mede o ganho de RTT/taxa"""
+        logger.info(f"Roaming: {link.get('bssid')} ({self.bss_table[link['bssid']].ewma_rssi:.0f} dBm) -> "
+                    f"{target.bssid} {target.ssid} ({target.ewma_rssi:.0f} dBm)")
+        self.last_roam = now
+        rtt_before = self.wifi_monitor.probe_rtt()
+
+        if target.ssid == link.get('ssid'):
+            success = self._reassociate(target)
+        else:
+            saved = self.config_manager.network_store.get(target.ssid)
+            success = self.wifi_monitor.connect(
+                target.ssid, saved.password if saved else None, check_available=False,
+                hints={'bssid': target.bssid, 'frequency': target.frequency})
+
+        rolled_back = None
+        if not success and (target.ssid != link.get('ssid') or not self.wifi_monitor.is_connected()):
+            # O roaming derrubou o enlace: voltar à rede anterior em vez de esperar o hotspot
+            rolled_back = self._rollback(link)
+
+        after = self.wifi_monitor.get_link_info() if success else {}
+        rtt_after = self.wifi_monitor.probe_rtt() if success else None
+
+        entry = {
+            'timestamp': clocks.now(),
+            'from_bssid': link.get('bssid'),
+            'to_bssid': target.bssid,
+            'ssid': target.ssid,
+            'success': success,
+            'rolled_back': rolled_back,
+            'rtt_before_ms': rtt_before,
+            'rtt_after_ms': rtt_after,
+            'bitrate_before': link.get('tx_bitrate'),
+            'bitrate_after': after.get('tx_bitrate')
+        }
+        self.history.append(entry)
+
+        if success:
+            self.roam_count += 1
+            logger.info(f"Roaming concluído: RTT {rtt_before} -> {rtt_after} ms, "
+                        f"taxa {entry['bitrate_before']} -> {entry['bitrate_after']} Mbit/s")
+        else:
+            self.failed_roams += 1
+            logger.warning(f"Roaming para {target.bssid} falhou")
+
+    def _rollback(self, link: Dict) -> bool:
+        """Reconecta ao BSS anterior ao roaming (dicas de reconexão rápida)"""
+        ssid = link.get('ssid')
+        if not ssid:
+            return False
+        saved = self.config_manager.network_store.get(ssid)
+        logger.warning(f"Roaming falhou: voltando para {ssid} via {link.get('bssid')}")
+        success = self.wifi_monitor.connect(
+            ssid, saved.password if saved else None, check_available=False,
+            hints={'bssid': link.get('bssid'), 'frequency': link.get('frequency')})
+        if success:
+            self.rollbacks += 1
+            logger.info(f"Enlace restaurado em {ssid} após roaming malsucedido")
+        else:
+            self.failed_rollbacks += 1
+            logger.error(f"Não foi possível voltar para {ssid} após roaming malsucedido")
+        return success
+
+    def _reassociate(self, target: BssSample) -> bool:
+        """Reassociação direcionada ao BSS alvo pelo backend de rádio"""
+        try:
+            return self.wifi_monitor.backend.roam(target.ssid, target.bssid, self.ROAM_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Erro na reassociação: {e}")
+            return False
+
+    @staticmethod
+    def _mean_gain(entries: List[Dict], before: str, after: str) -> Optional[float]:
+        gains = [e[after] - e[before] for e in entries
+                 if e[before] is not None and e[after] is not None]
+        return round(sum(gains) / len(gains), 2) if gains else None
+
+    def get_stats(self) -> Dict:
+        """Estatísticas de roaming (frequência e ganho médio)"""
+        successful = [e for e in self.history if e['success']]
+        hours = max((clocks.monotonic() - self.started_at) / 3600, 1 / 60)
+        return {
+            'enabled': self.enabled,
+            'roams': self.roam_count,
+            'roams_per_hour': round(self.roam_count / hours, 3),
+            'failed_roams': self.failed_roams,
+            'rollbacks': self.rollbacks,
+            'failed_rollbacks': self.failed_rollbacks,
+            'tracked_bss': len(self.bss_table),
+            # RTT: valor negativo significa melhora
+            'mean_rtt_change_ms': self._mean_gain(successful, 'rtt_before_ms', 'rtt_after_ms'),
+            'mean_bitrate_gain': self._mean_gain(successful, 'bitrate_before', 'bitrate_after'),
+            'history': list(self.history)
+        }
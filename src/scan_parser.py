@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Parser de saídas de scan Wi-Fi (iwlist, iw, nmcli)
+
+Uma única passada pelas linhas, com um padrão pré-compilado por formato:
+cada linha é testada uma vez e as linhas irrelevantes (dumps de IEs, taxas,
+TSF) são descartadas pelo próprio padrão. O resultado são ScanRecords
+compactos (__slots__), convertidos em dicionário só na borda da API.
+Aceita a saída completa (str) ou qualquer iterável de linhas, como o
+stdout de um processo em andamento.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+# Bits de segurança acumulados durante o parse de um BSS
+_PRIVACY = 1
+_WPA = 2
+_RSN = 4
+_PSK = 8
+_SAE = 16
+
+Lines = Union[str, Iterable[str]]
+
+
+def dbm_to_percent(dbm: float) -> int:
+    """Converte RSSI (dBm) para porcentagem (-100 dBm = 0%, -50 dBm = 100%)"""
+    return int(max(0, min(100, (dbm + 100) * 2)))
+
+
+def percent_to_dbm(percent: float) -> float:
+    return percent / 2 - 100
+
+
+def frequency_to_channel(frequency: int) -> Optional[int]:
+    if not frequency:
+        return None
+    if frequency == 2484:
+        return 14
+    if 2412 <= frequency < 2484:
+        return (frequency - 2407) // 5
+    if 5955 <= frequency <= 7115:
+        return (frequency - 5950) // 5
+    if 5000 <= frequency < 5955:
+        return (frequency - 5000) // 5
+    return None
+
+
+def channel_to_frequency(channel: int) -> Optional[int]:
+    if not channel:
+        return None
+    if channel == 14:
+        return 2484
+    if channel < 14:
+        return 2407 + channel * 5
+    return 5000 + channel * 5
+
+
+def _security(flags: int) -> str:
+    """Rótulo da suíte de segurança: open, WEP, WPA, WPA2, WPA3 ou combinações (WPA/WPA2)"""
+    if not flags:
+        return 'open'
+    labels = []
+    if flags & _WPA:
+        labels.append('WPA')
+    if flags & _RSN:
+        # RSN só com SAE é WPA3 puro; PSK + SAE é o modo de transição WPA2/WPA3
+        if not flags & _SAE or flags & _PSK:
+            labels.append('WPA2')
+        if flags & _SAE:
+            labels.append('WPA3')
+    return '/'.join(labels) if labels else 'WEP'
+
+
+def _akm_flags(suites: str) -> int:
+    flags = 0
+    if 'PSK' in suites:
+        flags |= _PSK
+    if 'SAE' in suites:
+        flags |= _SAE
+    return flags
+
+
+class ScanRecord:
+    """Um BSS visto no scan"""
+
+    __slots__ = ('bssid', 'ssid', 'channel', 'frequency', 'signal_dbm', 'signal_strength',
+                 'security', 'last_seen_ms')
+
+    def __init__(self, bssid: str = None):
+        self.bssid = bssid
+        self.ssid = None
+        self.channel = None
+        self.frequency = None
+        self.signal_dbm = None
+        self.signal_strength = None  # porcentagem
+        self.security = 'open'
+        self.last_seen_ms = None
+
+    @property
+    def encrypted(self) -> bool:
+        return self.security != 'open'
+
+    def _finish(self, flags: int = None):
+        """Completa os campos derivados ao fim do bloco do BSS"""
+        if flags is not None:
+            self.security = _security(flags)
+        if self.frequency is None:
+            self.frequency = channel_to_frequency(self.channel)
+        elif self.channel is None:
+            self.channel = frequency_to_channel(self.frequency)
+        if self.signal_strength is None and self.signal_dbm is not None:
+            self.signal_strength = dbm_to_percent(self.signal_dbm)
+        elif self.signal_dbm is None and self.signal_strength is not None:
+            self.signal_dbm = percent_to_dbm(self.signal_strength)
+
+    def to_dict(self) -> Dict:
+        return {
+            'ssid': self.ssid,
+            'bssid': self.bssid,
+            'signal_strength': self.signal_strength,
+            'signal_dbm': self.signal_dbm,
+            'frequency': self.frequency,
+            'channel': self.channel,
+            'encrypted': self.encrypted,
+            'security': self.security,
+            'last_seen_ms': self.last_seen_ms
+        }
+
+    def __repr__(self):
+        return (f"ScanRecord({self.bssid}, {self.ssid!r}, ch {self.channel}, "
+                f"{self.signal_dbm} dBm, {self.security})")
+
+
+def _lines(output: Lines) -> Iterable[str]:
+    return output.splitlines() if isinstance(output, str) else output
+
+
+def _text(output: Lines) -> str:
+    """Texto iniciado por quebra de linha (os padrões ancoram em '\\n' + palavra-chave)"""
+    if not isinstance(output, str):
+        output = ''.join(line if line.endswith('\n') else line + '\n' for line in output)
+    return output if output.startswith('\n') else '\n' + output
+
+
+def _visible_ssid(essid: str) -> Optional[str]:
+    # Redes ocultas aparecem vazias, como <hidden> ou como bytes nulos escapados
+    if not essid or essid == '<hidden>' or essid.startswith('\\x00'):
+        return None
+    return essid
+
+
+# ----------------------------------------------------------------------
+# iwlist <if> scan
+# ----------------------------------------------------------------------
+
+# Cada linha de interesse começa com uma palavra-chave após a indentação; as
+# demais (taxas, TSF, IEs em hexadecimal) são puladas pelo motor de regex sem
+# passar pelo interpretador. A indentação é consumida de forma atômica
+# ((?=(...))\1; o quantificador possessivo *+ só existe a partir do Python
+# 3.11) para não haver retrocesso espaço a espaço em cada linha descartada.
+_IWLIST_LINE = re.compile(r"""\n(?=([ \t]*))\1(?:
+     Cell\ \d+\ -\ Address:\ (?P<cell>[0-9A-Fa-f:]{17})
+    |ESSID:"(?P<essid>.*)"
+    |Channel:(?P<channel>\d+)
+    |Frequency:(?P<frequency>[\d.]+)\ GHz
+    |Quality[=:](?P<quality>\d+)/(?P<quality_max>\d+)(?:\s+Signal\ level[=:](?P<level>-?\d+)\ dBm)?
+    |Signal\ level[=:](?P<signal_only>-?\d+)\ dBm
+    |Encryption\ key:(?P<key>on|off)
+    |IE:\ (?P<ie>IEEE\ 802\.11i/WPA2|WPA)\ Version
+    |Authentication\ Suites\ \(\d+\)\ :\ (?P<akm>.*)
+    |Extra:\ ?Last\ beacon:\ ?(?P<beacon>\d+)ms
+)""", re.VERBOSE)
+
+
+def iter_iwlist(output: Lines) -> Iterator[ScanRecord]:
+    """Registros de 'iwlist <if> scan', emitidos à medida que cada célula termina"""
+    current = None
+    flags = 0
+    for m in _IWLIST_LINE.finditer(_text(output)):
+        group = m.lastgroup
+        if group == 'cell':
+            if current is not None:
+                current._finish(flags)
+                yield current
+            current = ScanRecord(m.group('cell').lower())
+            flags = 0
+        elif current is None:
+            continue
+        elif group == 'essid':
+            current.ssid = _visible_ssid(m.group('essid'))
+        elif group == 'quality_max' or group == 'level':
+            maximum = int(m.group('quality_max'))
+            if maximum:
+                current.signal_strength = int(int(m.group('quality')) / maximum * 100)
+            if group == 'level':
+                current.signal_dbm = int(m.group('level'))
+        elif group == 'signal_only':
+            current.signal_dbm = int(m.group('signal_only'))
+        elif group == 'frequency':
+            current.frequency = int(float(m.group('frequency')) * 1000)
+        elif group == 'channel':
+            current.channel = int(m.group('channel'))
+        elif group == 'key':
+            if m.group('key') == 'on':
+                flags |= _PRIVACY
+        elif group == 'ie':
+            flags |= _WPA if m.group('ie') == 'WPA' else _RSN
+        elif group == 'akm':
+            flags |= _akm_flags(m.group('akm'))
+        elif group == 'beacon':
+            current.last_seen_ms = int(m.group('beacon'))
+
+    if current is not None:
+        current._finish(flags)
+        yield current
+
+
+def parse_iwlist(output: Lines) -> List[ScanRecord]:
+    """Parse de 'iwlist <if> scan' (inclui BSS ocultos, com ssid None)"""
+    return list(iter_iwlist(output))
+
+
+# ----------------------------------------------------------------------
+# iw dev <if> scan [dump]
+# ----------------------------------------------------------------------
+
+_IW_LINE = re.compile(r"""\n(?:
+     BSS\ (?P<bss>[0-9a-fA-F:]{17})
+    |(?=([ \t]+))\2(?:
+         freq:\ (?P<freq>[\d.]+)
+        |signal:\ (?P<signal>-?[\d.]+)\ dBm
+        |SSID:\ ?(?P<ssid>.*)
+        |last\ seen:\ (?P<seen>\d+)\ ms\ ago
+        |DS\ Parameter\ set:\ channel\ (?P<ds_channel>\d+)
+        |\*\ primary\ channel:\ (?P<primary_channel>\d+)
+        |\*\ Authentication\ suites:\ (?P<akm>.*)
+        |capability:[^\n]*?(?P<privacy>Privacy)
+        |(?P<ie>RSN|WPA):
+    )
+)""", re.VERBOSE)
+
+
+def iter_iw(output: Lines) -> Iterator[ScanRecord]:
+    """Registros de 'iw dev <if> scan [dump]', emitidos à medida que cada BSS termina"""
+    current = None
+    flags = 0
+    for m in _IW_LINE.finditer(_text(output)):
+        group = m.lastgroup
+        if group == 'bss':
+            if current is not None:
+                current._finish(flags)
+                yield current
+            current = ScanRecord(m.group('bss').lower())
+            flags = 0
+        elif current is None:
+            continue
+        elif group == 'freq':
+            current.frequency = int(float(m.group('freq')))
+        elif group == 'signal':
+            current.signal_dbm = float(m.group('signal'))
+        elif group == 'ssid':
+            current.ssid = _visible_ssid(m.group('ssid').strip())
+        elif group == 'seen':
+            current.last_seen_ms = int(m.group('seen'))
+        elif group == 'ds_channel' or group == 'primary_channel':
+            current.channel = int(m.group(group))
+        elif group == 'akm':
+            flags |= _akm_flags(m.group('akm'))
+        elif group == 'privacy':
+            flags |= _PRIVACY
+        elif group == 'ie':
+            flags |= _RSN if m.group('ie') == 'RSN' else _WPA
+
+    if current is not None:
+        current._finish(flags)
+        yield current
+
+
+def parse_iw(output: Lines) -> List[ScanRecord]:
+    """Parse de 'iw dev <if> scan [dump]'"""
+    return list(iter_iw(output))
+
+
+# ----------------------------------------------------------------------
+# nmcli -t -f <campos> dev wifi
+# ----------------------------------------------------------------------
+
+NMCLI_FIELDS = ('SSID', 'SIGNAL', 'SECURITY')
+
+# No modo -t o nmcli escapa ':' e '\' dentro dos valores com '\'
+_NMCLI_SPLIT = re.compile(r'(?<!\\):')
+_NMCLI_UNESCAPE = re.compile(r'\\(.)')
+
+
+@lru_cache(maxsize=64)
+def _nmcli_security(value: str) -> str:
+    if not value or value == '--':
+        return 'open'
+    labels = [label.replace('WPA1', 'WPA') for label in value.split()
+              if label.startswith(('WPA', 'WEP'))]
+    return '/'.join(labels) if labels else 'WEP'
+
+
+def _int(value: str) -> Optional[int]:
+    value = value.split(' ', 1)[0]  # FREQ vem como '2437 MHz'
+    return int(value) if value.isdigit() else None
+
+
+def iter_nmcli(output: Lines, fields: Sequence[str] = NMCLI_FIELDS) -> Iterator[ScanRecord]:
+    """Registros do modo tabular (-t) do nmcli, nos campos pedidos em 'fields'"""
+    position = {field: index for index, field in enumerate(fields)}
+    count = len(fields)
+    ssid_at = position.get('SSID')
+    bssid_at = position.get('BSSID')
+    signal_at = position.get('SIGNAL')
+    security_at = position.get('SECURITY')
+    channel_at = position.get('CHAN')
+    frequency_at = position.get('FREQ')
+
+    for line in _lines(output):
+        if not line:
+            continue
+        if '\\' in line:
+            values = [_NMCLI_UNESCAPE.sub(r'\1', v) for v in _NMCLI_SPLIT.split(line)]
+        else:
+            values = line.split(':')
+        if len(values) < count:
+            continue
+        record = ScanRecord()
+        if ssid_at is not None:
+            ssid = values[ssid_at].strip()
+            record.ssid = _visible_ssid(ssid) if ssid != '--' else None
+        if bssid_at is not None:
+            record.bssid = values[bssid_at].strip().lower() or None
+        if signal_at is not None:
+            record.signal_strength = _int(values[signal_at].strip()) or 0
+        if security_at is not None:
+            record.security = _nmcli_security(values[security_at].strip())
+        if channel_at is not None:
+            record.channel = _int(values[channel_at].strip())
+        if frequency_at is not None:
+            record.frequency = _int(values[frequency_at].strip())
+        record._finish()
+        yield record
+
+
+def parse_nmcli(output: Lines, fields: Sequence[str] = NMCLI_FIELDS) -> List[ScanRecord]:
+    """Parse de 'nmcli -t -f <campos> dev wifi'"""
+    return list(iter_nmcli(output, fields))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Snapshot do estado do gerenciador para retomada rápida após reinício
+
+O loop principal grava periodicamente (e no encerramento limpo) o modo,
+contadores de falha, tabela de BSS, resultados recentes de conexão, o
+histórico agregado do enlace e os PIDs dos serviços supervisionados. Na
+inicialização, um snapshot recente é aplicado antes do primeiro ciclo, de
+modo que o processo não precisa redescobrir, ciclo a ciclo, que estava em
+modo hotspot.
+"""
+
+import os
+import json
+import logging
+import tempfile
+from typing import Dict, Optional
+
+import clocks
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def boot_id() -> Optional[str]:
+    """Identificador do boot atual (PIDs de outro boot não significam nada)"""
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def pid_alive(pid: int, name: str) -> bool:
+    """Processo vivo e com o nome esperado (evita adotar PID reutilizado)"""
+    try:
+        os.kill(pid, 0)
+        with open(f'/proc/{pid}/comm') as f:
+            return f.read().strip() == name[:15]
+    except (OSError, ValueError, TypeError):
+        return False
+
+
+class StateSnapshot:
+    """Arquivo JSON com o último estado do gerenciador e o relatório da retomada"""
+
+    # Snapshot mais velho que isso é ignorado (o mundo lá fora já mudou)
+    MAX_AGE = 300
+
+    def __init__(self, path: str, max_age: float = MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.started_at = clocks.monotonic()
+        self.closed = False  # snapshot final do encerramento gravado: nada mais sobrescreve
+        self.report: Dict = {'resumed': False}
+
+    def save(self, state: Dict, final: bool = False) -> bool:
+        """Grava o estado (escrita atômica); final = snapshot do encerramento
+
+        O encerramento pode ocorrer no tratador de SIGTERM, no meio de uma
+        gravação periódica: cada gravação usa seu próprio arquivo temporário
+        e a interrompida não substitui o snapshot final.
+        """
+        if self.closed:
+            return False
+        tmp_file = None
+        try:
+            data = dict(state, version=SNAPSHOT_VERSION, saved_at=clocks.now(), boot_id=boot_id())
+            fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                            suffix='.tmp', dir=os.path.dirname(self.path) or '.')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            if self.closed:
+                return False
+            os.replace(tmp_file, self.path)
+            tmp_file = None
+            self.closed = final
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar snapshot de estado: {e}")
+            return False
+        finally:
+            if tmp_file is not None:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+
+    def load(self) -> Optional[Dict]:
+        """Estado gravado, ou None se ausente, inválido ou velho demais"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Snapshot de estado ilegível, ignorando: {e}")
+            return None
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            logger.info("Snapshot de estado de outra versão, ignorando")
+            return None
+        age = clocks.now() - data.get('saved_at', 0)
+        if not 0 <= age <= self.max_age:
+            logger.info(f"Snapshot de estado com {age:.0f}s, acima do limite de {self.max_age}s")
+            return None
+        data['age'] = age
+        if data.get('boot_id') != boot_id():
+            # Reinício da máquina: serviços supervisionados não sobreviveram
+            data.pop('pids', None)
+        return data
+
+    def resumed(self, state: Dict, restored: Dict):
+        """Registra no relatório o que foi retomado do snapshot"""
+        self.report = {
+            'resumed': True,
+            'snapshot_age': round(state['age'], 1),
+            'mode': state.get('mode'),
+            'restored': restored
+        }
+
+    def steady(self, mode: str) -> Optional[float]:
+        """Marca o primeiro ciclo com o modo confirmado; retorna o tempo desde o início"""
+        if 'steady_state_seconds' in self.report:
+            return None
+        elapsed = clocks.monotonic() - self.started_at
+        self.report['steady_state_seconds'] = round(elapsed, 3)
+        self.report['steady_mode'] = mode
+        return elapsed
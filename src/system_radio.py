@@ -0,0 +1,996 @@
+#!/usr/bin/env python3
+"""
+Backends de rádio do sistema (NetworkManager, wpa_supplicant/nl80211, hostapd/dnsmasq)
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import subprocess
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from radio_backend import RadioBackend, Station
+from command_runner import RUNNER, run as run_command
+from connect_errors import SUPPLICANT_LOG, TAIL_SCAN_BYTES, match_reason, nmcli_reason, scan_lines
+from log_reader import LogReader
+from scan_parser import ScanRecord, iter_iw, parse_iwlist, parse_nmcli
+from state_snapshot import pid_alive
+
+logger = logging.getLogger(__name__)
+
+
+class SystemBackend(RadioBackend):
+    """Operações comuns via ip/iw/ping e AP via hostapd + dnsmasq"""
+
+    name = 'system'
+    # Intervalo de verificação durante associação/conectividade (segundos)
+    POLL_INTERVAL = 0.25
+    # Reaproveitamento de leituras de estado e de scans pelo executor de comandos
+    STATUS_CACHE_TTL = 2
+    SCAN_CACHE_TTL = 5
+    NMCLI_SCAN_FIELDS = ('SSID', 'BSSID', 'SIGNAL', 'SECURITY', 'FREQ', 'CHAN')
+    LEASE_FILE = '/var/lib/dhcp/dnsmasq.leases'
+
+    def __init__(self, interface: str, network_store=None, timings=None):
+        self.interface = interface
+        self.network_store = network_store
+        self.timings = timings
+        self.prepared_configs = None  # (hostapd, dnsmasq) gerados antecipadamente
+        self.ap_active = False
+        self.ap_pids: Dict[str, int] = {}  # serviços do AP iniciados por este processo
+
+    def _phase(self, phase: str):
+        """Cronometra uma fase da tentativa de conexão em andamento"""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.phase(self.name, phase)
+
+    def _fail(self, reason: str, detail: str = None) -> bool:
+        """Registra o motivo da falha na tentativa em andamento"""
+        if self.timings is not None:
+            self.timings.set_failure(self.name, reason, detail)
+        return False
+
+    def _psk(self, ssid: str, password: str) -> Optional[str]:
+        """PSK hexadecimal pré-computada (cache de redes salvas)"""
+        if self.network_store is None:
+            return None
+        return self.network_store.get_psk(ssid, password)
+
+    # ------------------------------------------------------------------
+    # Scan
+    # ------------------------------------------------------------------
+
+    def scan(self) -> List[Dict]:
+        """Tenta fazer scan real das redes Wi-Fi"""
+        try:
+            # Método 1: Tentar ler arquivo compartilhado com redes reais (para macOS)
+            real_networks = self._try_shared_wifi_file()
+            if real_networks:
+                return real_networks
+
+            # Método 2: Verificar se temos acesso a interfaces Wi-Fi do host
+            for interface in ['wlan0', 'wlp2s0', 'wlp3s0', 'en0', 'en1']:
+                try:
+                    result = run_command(['iwlist', interface, 'scan'], cache_ttl=self.SCAN_CACHE_TTL)
+
+                    if result.returncode == 0 and result.stdout:
+                        networks = self._networks(parse_iwlist(result.stdout))
+                        if networks:
+                            logger.info(f"Scan real bem-sucedido via interface {interface}")
+                            return networks
+                except:
+                    continue
+
+            # Método 3: Tentar com nmcli (NetworkManager)
+            try:
+                result = run_command(['nmcli', '-t', '-f', ','.join(self.NMCLI_SCAN_FIELDS), 'dev', 'wifi'],
+                                     timeout=10, cache_ttl=self.SCAN_CACHE_TTL)
+
+                if result.returncode == 0 and result.stdout:
+                    networks = self._parse_nmcli_results(result.stdout)
+                    if networks:
+                        logger.info("Scan real bem-sucedido via nmcli")
+                        return networks
+            except:
+                pass
+
+            # Método 4: Tentar comando específico do macOS (via volume mount)
+            try:
+                result = run_command(['/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport', '-s'],
+                                     timeout=10, cache_ttl=self.SCAN_CACHE_TTL)
+
+                if result.returncode == 0 and result.stdout:
+                    networks = self._parse_macos_airport_results(result.stdout)
+                    if networks:
+                        logger.info("Scan real bem-sucedido via airport (macOS)")
+                        return networks
+            except:
+                pass
+
+            return []
+
+        except Exception as e:
+            logger.debug(f"Falha no scan real: {e}")
+            return []
+
+    def _try_shared_wifi_file(self) -> List[Dict]:
+        """Tenta ler arquivo compartilhado com redes Wi-Fi reais"""
+        try:
+            wifi_file_paths = [
+                '/tmp/wifi_scan.json',
+                '/shared/wifi_scan.json',
+                '/app/shared/wifi_scan.json',
+                '/var/tmp/wifi_scan.json'
+            ]
+
+            for file_path in wifi_file_paths:
+                try:
+                    if os.path.exists(file_path):
+                        with open(file_path, 'r') as f:
+                            data = json.load(f)
+                            if data and isinstance(data, list):
+                                logger.info(f"Redes Wi-Fi reais carregadas de {file_path}")
+                                return data
+                except:
+                    continue
+
+            return []
+        except Exception as e:
+            logger.debug(f"Erro ao ler arquivo de Wi-Fi compartilhado: {e}")
+            return []
+
+    def _parse_macos_airport_results(self, airport_output: str) -> List[Dict]:
+        """Parse dos resultados do comando airport do macOS"""
+        networks = []
+
+        lines = airport_output.strip().split('\n')
+        if len(lines) < 2:  # Primeira linha é cabeçalho
+            return []
+
+        for line in lines[1:]:  # Pular cabeçalho
+            if not line.strip():
+                continue
+
+            # Formato típico do airport:
+            # SSID BSSID             Channel  CC  RSSI  Flags
+            parts = line.split()
+            if len(parts) >= 6:
+                ssid = parts[0]
+                bssid = parts[1] if len(parts) > 1 else "unknown"
+                try:
+                    rssi = int(parts[4]) if len(parts) > 4 else -50
+                    # Converter RSSI para porcentagem (RSSI vai de -100 a -20 tipicamente)
+                    signal_strength = max(0, min(100, (rssi + 100) * 2))
+                except:
+                    signal_strength = 50
+
+                flags = ' '.join(parts[5:]) if len(parts) > 5 else ""
+                encrypted = 'WPA' in flags or 'WEP' in flags or 'NONE' not in flags
+
+                if ssid and ssid != '--':
+                    networks.append({
+                        'ssid': ssid,
+                        'bssid': bssid,
+                        'signal_strength': signal_strength,
+                        'encrypted': encrypted
+                    })
+
+        return networks
+
+    @staticmethod
+    def _networks(records: List[ScanRecord]) -> List[Dict]:
+        """Redes visíveis (BSS com SSID) no formato da API"""
+        return [record.to_dict() for record in records if record.ssid]
+
+    def _parse_nmcli_results(self, nmcli_output: str) -> List[Dict]:
+        """Parse dos resultados do nmcli (BSSID real, um registro por AP)"""
+        return self._networks(parse_nmcli(nmcli_output, self.NMCLI_SCAN_FIELDS))
+
+    def bss_scan(self, active: bool = True) -> List[Dict]:
+        """Scan ativo ou leitura do cache de BSS do kernel ('iw dev <if> scan [dump]')"""
+        cmd = ['iw', 'dev', self.interface, 'scan']
+        if not active:
+            cmd.append('dump')
+        result = run_command(cmd, timeout=15)
+        if result.returncode != 0:
+            return []
+        return [record.to_dict() for record in iter_iw(result.stdout)
+                if record.ssid and record.signal_dbm is not None]
+
+    def roam(self, ssid: str, bssid: str, timeout: float) -> bool:
+        """Reassociação direcionada ao BSS (wpa_cli roam, com fallback para nmcli)"""
+        result = run_command(['wpa_cli', '-i', self.interface, 'roam', bssid], timeout=10)
+        if result.returncode != 0 or 'OK' not in result.stdout:
+            result = run_command(['nmcli', 'dev', 'wifi', 'connect', ssid,
+                                  'bssid', bssid, 'ifname', self.interface], timeout=30)
+            if result.returncode != 0:
+                return False
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.link_state().get('bssid') == bssid:
+                return True
+            time.sleep(self.POLL_INTERVAL)
+        return False
+
+    # ------------------------------------------------------------------
+    # Estado do enlace
+    # ------------------------------------------------------------------
+
+    def interface_state(self) -> Dict:
+        """Interface presente, ativa e com IP (ip link/addr show)"""
+        state = {'exists': False, 'up': False, 'has_ip': False}
+        result = run_command(['ip', 'link', 'show', self.interface], cache_ttl=self.STATUS_CACHE_TTL)
+        if result.returncode != 0:
+            return state
+        state['exists'] = True
+        state['up'] = 'state UP' in result.stdout
+        if state['up']:
+            result = run_command(['ip', 'addr', 'show', self.interface], cache_ttl=self.STATUS_CACHE_TTL)
+            state['has_ip'] = 'inet ' in result.stdout
+        return state
+
+    def link_state(self) -> Dict:
+        """BSSID, SSID, frequência, sinal e taxa do enlace atual (iw dev <if> link)"""
+        info = {}
+        try:
+            result = run_command(['iw', 'dev', self.interface, 'link'], cache_ttl=1)
+            bssid_match = re.search(r'Connected to ([0-9a-fA-F:]{17})', result.stdout)
+            if bssid_match:
+                info['bssid'] = bssid_match.group(1).lower()
+            ssid_match = re.search(r'SSID: (.+)', result.stdout)
+            if ssid_match:
+                info['ssid'] = ssid_match.group(1).strip()
+            freq_match = re.search(r'freq:\s*(\d+)', result.stdout)
+            if freq_match:
+                info['frequency'] = int(freq_match.group(1))
+            signal_match = re.search(r'signal:\s*(-?\d+)', result.stdout)
+            if signal_match:
+                info['signal_dbm'] = int(signal_match.group(1))
+            bitrate_match = re.search(r'tx bitrate:\s*([\d.]+)', result.stdout)
+            if bitrate_match:
+                info['tx_bitrate'] = float(bitrate_match.group(1))
+        except Exception as e:
+            logger.debug(f"Erro ao obter informações do enlace: {e}")
+        return info
+
+    def link_signal(self) -> Optional[float]:
+        """Nível de sinal de /proc/net/wireless, sem iniciar processos (nível 0 = desassociado)
+
+        Sem a interface no arquivo (ou reproduzindo um trace), usa o station dump.
+        """
+        if RUNNER.replaying:
+            return super().link_signal()
+        try:
+            with open('/proc/net/wireless') as f:
+                for line in f:
+                    name, _, fields = line.partition(':')
+                    if name.strip() == self.interface:
+                        level = float(fields.split()[2].rstrip('.'))
+                        return level if level < 0 else None
+        except (OSError, IndexError, ValueError) as e:
+            logger.debug(f"Erro ao ler /proc/net/wireless: {e}")
+        return super().link_signal()
+
+    def station_stats(self) -> Dict:
+        """Lê 'iw dev <if> station dump' (estação = AP associado)"""
+        info = {}
+        try:
+            result = run_command(['iw', 'dev', self.interface, 'station', 'dump'], timeout=2)
+            for line in result.stdout.split('\n'):
+                key, _, value = line.strip().partition(':')
+                value = value.strip()
+                if not value:
+                    continue
+                if key == 'signal':
+                    info['signal_dbm'] = float(value.split()[0])
+                elif key == 'tx bitrate':
+                    info['tx_bitrate'] = float(value.split()[0])
+                elif key == 'rx bitrate':
+                    info['rx_bitrate'] = float(value.split()[0])
+                elif key == 'tx retries':
+                    info['tx_retries'] = int(value)
+                elif key == 'tx failed':
+                    info['tx_failed'] = int(value)
+        except Exception as e:
+            logger.debug(f"Erro ao ler station dump: {e}")
+        return info
+
+    def has_connectivity(self) -> bool:
+        """Testa conectividade com a internet"""
+        test_hosts = ['8.8.8.8', '1.1.1.1', 'google.com']
+
+        for host in test_hosts:
+            try:
+                result = run_command(['ping', '-c', '1', '-W', '3', host], timeout=5)
+                if result.returncode == 0:
+                    return True
+            except (subprocess.TimeoutExpired, Exception):
+                continue
+
+        logger.warning("Falha nos testes de conectividade")
+        return False
+
+    def wait_connectivity(self, timeout: float) -> bool:
+        """Aguarda IP e conectividade até o prazo"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._check_network_connection():
+                return True
+            time.sleep(self.POLL_INTERVAL)
+        return False
+
+    def _check_network_connection(self) -> bool:
+        """Verifica se a conexão de rede está funcionando"""
+        try:
+            # Verificar se tem IP
+            result = run_command(['ip', 'addr', 'show', self.interface], timeout=5)
+
+            if 'inet ' not in result.stdout:
+                return False
+
+            # Teste rápido de conectividade
+            result = run_command(['ping', '-c', '1', '-W', '2', '8.8.8.8'], timeout=5)
+
+            return result.returncode == 0
+
+        except:
+            return False
+
+    def gateway(self) -> Optional[str]:
+        """Gateway padrão da interface Wi-Fi"""
+        try:
+            result = run_command(['ip', 'route', 'show', 'default', 'dev', self.interface],
+                                 cache_ttl=self.STATUS_CACHE_TTL)
+            match = re.search(r'default via (\S+)', result.stdout)
+            return match.group(1) if match else None
+        except Exception:
+            return None
+
+    def probe_rtt(self, host: str = None, count: int = 3) -> Optional[float]:
+        """RTT médio (ms) até o gateway (ou host informado)"""
+        host = host or self.gateway() or '8.8.8.8'
+        try:
+            result = run_command(['ping', '-c', str(count), '-i', '0.2', '-W', '1', host], timeout=count + 5)
+            match = re.search(r'= [\d.]+/([\d.]+)/', result.stdout)
+            return float(match.group(1)) if match else None
+        except Exception:
+            return None
+
+    def disconnect(self):
+        run_command(['pkill', 'wpa_supplicant'])
+        run_command(['pkill', 'dhclient'])
+        run_command(['ip', 'addr', 'flush', 'dev', self.interface])
+        run_command(['ip', 'link', 'set', self.interface, 'down'])
+        RUNNER.invalidate()
+
+    # ------------------------------------------------------------------
+    # Ponto de acesso (hostapd + dnsmasq)
+    # ------------------------------------------------------------------
+
+    def prepare_ap(self, settings: Dict):
+        """Gera as configurações do hotspot antecipadamente (failover preditivo)"""
+        if self.ap_active or self.prepared_configs:
+            return
+        self.prepared_configs = (self._create_hostapd_config(settings), self._create_dnsmasq_config(settings))
+
+    def discard_prepared_ap(self):
+        """Descarta configurações preparadas que não foram usadas"""
+        self.prepared_configs = None
+
+    def start_ap(self, settings: Dict) -> bool:
+        # Parar serviços que podem interferir
+        self._stop_conflicting_services()
+
+        # Configurar interface
+        self._configure_interface(settings['ip_range'])
+
+        # Configurar hostapd e dnsmasq (reaproveitando configurações preparadas)
+        if self.prepared_configs:
+            hostapd_config, dnsmasq_config = self.prepared_configs
+            self.prepared_configs = None
+        else:
+            hostapd_config = self._create_hostapd_config(settings)
+            dnsmasq_config = self._create_dnsmasq_config(settings)
+
+        # Configurar iptables
+        self._configure_iptables()
+
+        # Iniciar dnsmasq
+        if not self._start_dnsmasq(dnsmasq_config):
+            raise Exception("Falha ao iniciar dnsmasq")
+
+        # Iniciar hostapd
+        if not self._start_hostapd(hostapd_config):
+            raise Exception("Falha ao iniciar hostapd")
+
+        self.ap_active = True
+        RUNNER.invalidate()
+        return True
+
+    def stop_ap(self):
+        # Parar serviços
+        run_command(['pkill', 'hostapd'])
+        run_command(['pkill', 'dnsmasq'])
+
+        # Limpar iptables
+        self._clear_iptables()
+        self.ap_pids = {}
+
+        # Resetar interface
+        run_command(['ip', 'addr', 'flush', 'dev', self.interface])
+        run_command(['ip', 'link', 'set', self.interface, 'down'])
+
+        self.ap_active = False
+        RUNNER.invalidate()
+
+    def ap_running(self) -> bool:
+        """hostapd e dnsmasq ativos e interface com o IP do hotspot"""
+        hostapd_running = run_command(['pgrep', 'hostapd'], cache_ttl=2).returncode == 0
+        dnsmasq_running = run_command(['pgrep', 'dnsmasq'], cache_ttl=2).returncode == 0
+
+        result = run_command(['ip', 'addr', 'show', self.interface], cache_ttl=2)
+        interface_configured = '192.168.4.1' in result.stdout
+
+        self.ap_active = hostapd_running and dnsmasq_running and interface_configured
+        return self.ap_active
+
+    def supervised_pids(self) -> Dict[str, int]:
+        return dict(self.ap_pids)
+
+    def adopt_ap(self, pids: Dict[str, int]) -> bool:
+        """Retoma o AP se hostapd e dnsmasq do processo anterior seguem vivos"""
+        if set(pids) != {'hostapd', 'dnsmasq'} or not all(pid_alive(pid, name) for name, pid in pids.items()):
+            return False
+        self.ap_pids = dict(pids)
+        self.ap_active = True
+        return True
+
+    def list_stations(self) -> List[Station]:
+        """Clientes a partir do arquivo de leases do dnsmasq"""
+        clients = []
+        if os.path.exists(self.LEASE_FILE):
+            with open(self.LEASE_FILE, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 4:
+                        clients.append(Station(parts[2], parts[1], parts[3]))
+        return clients
+
+    def _stop_conflicting_services(self):
+        """Para serviços que podem interferir"""
+        services = ['wpa_supplicant', 'dhclient', 'NetworkManager']
+
+        for service in services:
+            try:
+                run_command(['pkill', service])
+            except:
+                pass
+
+        # Aguardar processos terminarem
+        time.sleep(2)
+
+    def _configure_interface(self, ip_range: str):
+        """Configura a interface de rede"""
+        try:
+            # Ativar interface
+            run_command(['ip', 'link', 'set', self.interface, 'up'], timeout=5)
+
+            # Configurar IP
+            run_command(['ip', 'addr', 'add', ip_range, 'dev', self.interface], timeout=5)
+
+            logger.info(f"Interface {self.interface} configurada com IP {ip_range}")
+
+        except subprocess.TimeoutExpired:
+            raise Exception("Timeout ao configurar interface")
+        except Exception as e:
+            raise Exception(f"Erro ao configurar interface: {e}")
+
+    def _create_hostapd_config(self, settings: Dict) -> str:
+        """Cria configuração do hostapd"""
+        config_content = f"""
+interface={self.interface}
+driver=nl80211
+ssid={settings['ssid']}
+hw_mode=g
+channel=7
+wmm_enabled=0
+macaddr_acl=0
+auth_algs=1
+ignore_broadcast_ssid=0
+wpa=2
+wpa_passphrase={settings['password']}
+wpa_key_mgmt=WPA-PSK
+wpa_pairwise=TKIP
+rsn_pairwise=CCMP
+"""
+
+        # Salvar em arquivo temporário
+        config_file = '/tmp/hostapd.conf'
+        with open(config_file, 'w') as f:
+            f.write(config_content)
+
+        logger.info(f"Configuração hostapd criada: {config_file}")
+        return config_file
+
+    def _create_dnsmasq_config(self, settings: Dict) -> str:
+        """Cria configuração do dnsmasq"""
+        config_content = f"""
+interface={self.interface}
+dhcp-range={settings['dhcp_range']}
+domain=local
+address=/captive.portal/192.168.4.1
+address=/wifi.config/192.168.4.1
+server=8.8.8.8
+server=8.8.4.4
+log-queries
+log-dhcp
+"""
+
+        # Salvar em arquivo temporário
+        config_file = '/tmp/dnsmasq.conf'
+        with open(config_file, 'w') as f:
+            f.write(config_content)
+
+        logger.info(f"Configuração dnsmasq criada: {config_file}")
+        return config_file
+
+    def _configure_iptables(self):
+        """Configura regras iptables para NAT"""
+        try:
+            # Limpar regras existentes
+            run_command(['iptables', '-F'])
+            run_command(['iptables', '-t', 'nat', '-F'])
+
+            # Configurar NAT (se tiver conexão ethernet)
+            run_command([
+                'iptables', '-t', 'nat', '-A', 'POSTROUTING',
+                '-o', 'eth0', '-j', 'MASQUERADE'
+            ])
+
+            # Permitir forwarding
+            run_command([
+                'iptables', '-A', 'FORWARD', '-i', 'eth0',
+                '-o', self.interface, '-m', 'state',
+                '--state', 'RELATED,ESTABLISHED', '-j', 'ACCEPT'
+            ])
+
+            run_command([
+                'iptables', '-A', 'FORWARD', '-i', self.interface,
+                '-o', 'eth0', '-j', 'ACCEPT'
+            ])
+
+            # Redirecionar HTTP para interface web
+            run_command([
+                'iptables', '-t', 'nat', '-A', 'PREROUTING',
+                '-i', self.interface, '-p', 'tcp', '--dport', '80',
+                '-j', 'DNAT', '--to-destination', '192.168.4.1:8080'
+            ])
+
+            # Habilitar IP forwarding
+            with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
+                f.write('1')
+
+            logger.info("Regras iptables configuradas")
+
+        except Exception as e:
+            logger.warning(f"Erro ao configurar iptables: {e}")
+
+    def _clear_iptables(self):
+        """Limpa regras iptables"""
+        try:
+            run_command(['iptables', '-F'])
+            run_command(['iptables', '-t', 'nat', '-F'])
+
+            # Desabilitar IP forwarding
+            with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
+                f.write('0')
+
+        except Exception as e:
+            logger.warning(f"Erro ao limpar iptables: {e}")
+
+    def _spawn(self, cmd: List[str]):
+        """Inicia um serviço de longa duração pelo executor (não executado ao reproduzir um trace)"""
+        process = RUNNER.spawn(cmd)
+        if process.pid is None:
+            logger.info(f"Reprodução de trace: {cmd[0]} não iniciado")
+            return
+        self.ap_pids[os.path.basename(cmd[0])] = process.pid
+
+    def _start_dnsmasq(self, config_file: str) -> bool:
+        """Inicia o dnsmasq"""
+        try:
+            cmd = ['dnsmasq', '--conf-file=' + config_file, '--no-daemon']
+
+            # Iniciar em background
+            self._spawn(cmd)
+
+            # Aguardar serviço iniciar
+            time.sleep(2)
+
+            # Verificar se está rodando
+            result = run_command(['pgrep', 'dnsmasq'])
+
+            if result.returncode == 0:
+                logger.info("dnsmasq iniciado com sucesso")
+                return True
+            else:
+                logger.error("dnsmasq falhou ao iniciar")
+                return False
+
+        except Exception as e:
+            logger.error(f"Erro ao iniciar dnsmasq: {e}")
+            return False
+
+    def _start_hostapd(self, config_file: str) -> bool:
+        """Inicia o hostapd"""
+        try:
+            cmd = ['hostapd', config_file]
+
+            # Iniciar em background
+            self._spawn(cmd)
+
+            # Aguardar serviço iniciar
+            time.sleep(3)
+
+            # Verificar se está rodando
+            result = run_command(['pgrep', 'hostapd'])
+
+            if result.returncode == 0:
+                logger.info("hostapd iniciado com sucesso")
+                return True
+            else:
+                logger.error("hostapd falhou ao iniciar")
+                return False
+
+        except Exception as e:
+            logger.error(f"Erro ao iniciar hostapd: {e}")
+            return False
+
+
+class NmcliBackend(SystemBackend):
+    """Conexão via NetworkManager (nmcli)"""
+
+    name = 'nmcli'
+
+    def connect(self, ssid: str, password: str = None, hints: Dict = None,
+                timeout: float = None) -> bool:
+        """Conecta usando NetworkManager"""
+        timeout = timeout or 30
+        bssid = hints.get('bssid') if hints else None
+        try:
+            logger.info(f"Tentando conexão via NetworkManager para {ssid}")
+
+            # Verificar se NetworkManager está disponível
+            if not RUNNER.available('nmcli'):
+                logger.warning("NetworkManager (nmcli) não encontrado")
+                return self._fail('backend_error', 'nmcli não encontrado')
+
+            # Comando de conexão (sempre com a senha: o NetworkManager usa SAE
+            # em redes WPA3 e de transição WPA2/WPA3, que não aceitam a PSK hexadecimal)
+            if password:
+                cmd = ['nmcli', 'dev', 'wifi', 'connect', ssid, 'password', password, 'ifname', self.interface]
+                log_cmd = ['nmcli', 'dev', 'wifi', 'connect', ssid, 'password', '***', 'ifname', self.interface]
+            else:
+                cmd = ['nmcli', 'dev', 'wifi', 'connect', ssid, 'ifname', self.interface]
+                log_cmd = list(cmd)
+
+            # Dica de BSSID: o NetworkManager associa direto ao AP conhecido
+            if bssid:
+                cmd += ['bssid', bssid]
+                log_cmd += ['bssid', bssid]
+
+            # nmcli bloqueia até a ativação (associação, handshake e DHCP do NetworkManager)
+            with self._phase('nmcli'):
+                # Desconectar conexões existentes primeiro
+                try:
+                    run_command(['nmcli', 'connection', 'down', 'id', ssid], timeout=10)
+                except:
+                    pass  # Ignorar erro se conexão não existir
+
+                logger.info(f"Executando: {' '.join(log_cmd)}")
+                result = run_command(cmd, timeout=timeout + 15)
+
+            if result.returncode == 0:
+                logger.info(f"NetworkManager: conexão iniciada para {ssid}")
+
+                # Aguardar e verificar conexão estabelecida
+                start_time = time.monotonic()
+                with self._phase('connectivity'):
+                    connected = self.wait_connectivity(timeout)
+                if connected:
+                    logger.info(f"Conexão estabelecida após {time.monotonic() - start_time:.1f} segundos")
+                    return True
+
+                logger.error("NetworkManager conectou mas sem conectividade verificada")
+                return self._fail('no_connectivity')
+            else:
+                error_msg = result.stderr.strip()
+                # Motivo pela mensagem do NetworkManager ou, sem assinatura conhecida, pelo código de saída
+                reason = nmcli_reason(result.returncode, error_msg)
+                logger.error(f"Erro NetworkManager (código {result.returncode}, motivo {reason}): {error_msg}")
+                return self._fail(reason, error_msg)
+
+        except subprocess.TimeoutExpired:
+            logger.error("Timeout na conexão via NetworkManager")
+            return self._fail('timeout')
+        except Exception as e:
+            logger.error(f"Erro no método NetworkManager: {e}")
+            return self._fail('backend_error', str(e))
+
+
+class WpaSupplicantBackend(SystemBackend):
+    """Conexão via wpa_supplicant (driver nl80211) e cliente DHCP próprio"""
+
+    name = 'wpa_supplicant'
+    CONFIG_FILE = '/tmp/wpa_supplicant.conf'
+    LOG_FILE = SUPPLICANT_LOG
+    # Intervalo de leitura dos eventos novos no log durante a associação (segundos)
+    EVENT_CHECK_INTERVAL = 1.0
+    # Eventos que encerram a tentativa antes do prazo (a senha não vai passar a funcionar)
+    FATAL_REASONS = ('wrong_key', 'auth_rejected')
+
+    def __init__(self, interface: str, network_store=None, timings=None, dhcp_client=None):
+        super().__init__(interface, network_store, timings)
+        self.dhcp_client = dhcp_client
+        self.last_dhcp_result = None
+
+    def connect(self, ssid: str, password: str = None, hints: Dict = None,
+                timeout: float = None) -> bool:
+        """Método alternativo usando wpa_supplicant diretamente"""
+        association_timeout = timeout or 45
+        try:
+            logger.info(f"Tentando conexão via wpa_supplicant para {ssid}")
+
+            # Verificar se wpa_supplicant está disponível
+            if not RUNNER.available('wpa_supplicant'):
+                logger.warning("wpa_supplicant não encontrado")
+                return self._fail('backend_error', 'wpa_supplicant não encontrado')
+
+            # Eventos do wpa_supplicant: só as linhas escritas a partir desta tentativa
+            events = LogReader(self.LOG_FILE, TAIL_SCAN_BYTES)
+            event_cursor = events.cursor()
+            event_reason = None
+
+            with self._phase('supplicant_restart'):
+                # Parar processos wpa_supplicant existentes
+                self._stop_wpa_supplicant()
+
+                # Preparar interface
+                try:
+                    run_command(['ip', 'link', 'set', self.interface, 'up'], timeout=5)
+                except Exception as e:
+                    logger.error(f"Erro ao ativar interface {self.interface}: {e}")
+                    return self._fail('backend_error', str(e))
+
+                # Gerar e validar configuração wpa_supplicant
+                wpa_config = self._generate_wpa_config(ssid, password, hints)
+
+                try:
+                    with open(self.CONFIG_FILE, 'w') as f:
+                        f.write(wpa_config)
+                    logger.debug(f"Configuração wpa_supplicant salva em {self.CONFIG_FILE}")
+                except Exception as e:
+                    logger.error(f"Erro ao salvar configuração wpa_supplicant: {e}")
+                    return self._fail('backend_error', str(e))
+
+                # Iniciar wpa_supplicant em background
+                cmd = [
+                    'wpa_supplicant', '-B', '-i', self.interface,
+                    '-c', self.CONFIG_FILE, '-D', 'nl80211', '-f', self.LOG_FILE
+                ]
+
+                logger.info(f"Iniciando wpa_supplicant: {' '.join(cmd)}")
+                result = run_command(cmd, timeout=15)
+
+            if result.returncode != 0:
+                error_msg = result.stderr.strip()
+                logger.error(f"Erro ao iniciar wpa_supplicant: {error_msg}")
+                if "Failed to initialize driver" in error_msg:
+                    logger.error("Driver Wi-Fi não suportado ou interface inválida")
+
+                # Eventos gravados pelo wpa_supplicant antes de sair (leitura limitada)
+                reason = match_reason(error_msg) or self._read_events(events, event_cursor)[1]
+                return self._fail(reason or 'backend_error', error_msg)
+
+            logger.info("wpa_supplicant iniciado, aguardando associação...")
+
+            # Aguardar associação com timeout e verificação detalhada
+            association_success = False
+            start_time = time.monotonic()
+            last_log_check = start_time
+            with self._phase('association'):
+                while time.monotonic() - start_time < association_timeout:
+                    time.sleep(self.POLL_INTERVAL)
+
+                    # Verificar status da associação
+                    if self._is_associated():
+                        logger.info(f"Associação Wi-Fi estabelecida após {time.monotonic() - start_time:.1f} segundos")
+                        association_success = True
+                        break
+
+                    # Eventos novos do wpa_supplicant (só o que foi escrito desde a última leitura)
+                    if time.monotonic() - last_log_check >= self.EVENT_CHECK_INTERVAL:
+                        last_log_check = time.monotonic()
+                        event_cursor, reason = self._read_events(events, event_cursor)
+                        event_reason = reason or event_reason
+                        if event_reason in self.FATAL_REASONS:
+                            logger.error(f"Falha de autenticação durante associação ({event_reason}) - verifique a senha")
+                            return self._fail(event_reason)
+
+            if not association_success:
+                logger.error("Timeout na associação Wi-Fi")
+                # Um evento visto no caminho (rede ausente, associação rejeitada) explica o timeout
+                return self._fail(event_reason or 'assoc_timeout')
+
+            # Aguardar o 4-way handshake (wpa_state=COMPLETED) no tempo restante
+            with self._phase('handshake'):
+                handshake_success = self._wait_handshake(start_time + association_timeout)
+            if not handshake_success:
+                logger.error("Timeout no handshake WPA - verifique a senha")
+                _, reason = self._read_events(events, event_cursor)
+                return self._fail(reason or event_reason or 'handshake_timeout')
+
+            # Obter IP via DHCP (reaproveita o lease anterior da rede)
+            logger.info("Solicitando endereço IP via DHCP...")
+            with self._phase('dhcp'):
+                self.last_dhcp_result = self.dhcp_client.acquire(ssid)
+            timings = self.last_dhcp_result['timings']
+            logger.info("Tempos DHCP: " + ', '.join(f"{phase}={value:.2f}s" for phase, value in timings.items()))
+
+            if not self.last_dhcp_result['success']:
+                logger.error("Falha ao obter endereço IP via DHCP")
+                return self._fail('dhcp_failed')
+
+            # Verificar conectividade final com timeout (20 segundos)
+            logger.info("Verificando conectividade...")
+            start_time = time.monotonic()
+            with self._phase('connectivity'):
+                connected = self.wait_connectivity(20)
+            if connected:
+                logger.info(f"Conexão wpa_supplicant estabelecida com sucesso após "
+                            f"{time.monotonic() - start_time:.1f} segundos")
+                return True
+
+            logger.error("wpa_supplicant associou mas sem conectividade com a internet")
+            return self._fail('no_connectivity')
+
+        except subprocess.TimeoutExpired:
+            logger.error("Timeout geral no método wpa_supplicant")
+            return self._fail('timeout')
+        except Exception as e:
+            logger.error(f"Erro no método wpa_supplicant: {e}")
+            return self._fail('backend_error', str(e))
+        finally:
+            # Limpar arquivo de configuração temporário
+            try:
+                if os.path.exists(self.CONFIG_FILE):
+                    os.remove(self.CONFIG_FILE)
+            except:
+                pass
+
+    @staticmethod
+    def _read_events(events: LogReader, cursor: int):
+        """Lê os eventos escritos após o cursor; retorna (novo cursor, motivo mais específico)"""
+        try:
+            # Limitada pelos bytes examinados do leitor; o restante fica para a próxima leitura
+            result = events.after(cursor, LogReader.MAX_LINES)
+        except OSError:
+            return cursor, None
+        return result['cursor'], scan_lines(result['lines'])
+
+    def _stop_wpa_supplicant(self, timeout: float = 2.0):
+        """Para o wpa_supplicant da interface e aguarda o processo terminar"""
+        try:
+            pattern = f'wpa_supplicant.*{self.interface}'
+            run_command(['pkill', '-f', pattern], timeout=5)
+            start_time = time.monotonic()
+            while time.monotonic() - start_time < timeout:
+                if run_command(['pgrep', '-f', pattern]).returncode != 0:
+                    return
+                time.sleep(0.1)
+        except Exception:
+            pass
+
+    def _generate_wpa_config(self, ssid: str, password: str = None, hints: Dict = None) -> str:
+        """Gera configuração do wpa_supplicant com suporte a diferentes tipos de segurança"""
+
+        # Escapar caracteres especiais no SSID
+        ssid_escaped = ssid.replace('"', '\\"').replace('\\', '\\\\')
+
+        config = f"""# Configuração wpa_supplicant gerada automaticamente
+country=BR
+ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev
+update_config=1
+ap_scan=1
+
+network={{
+    ssid="{ssid_escaped}"
+"""
+
+        if password:
+            # Escapar caracteres especiais na senha
+            password_escaped = password.replace('"', '\\"').replace('\\', '\\\\')
+
+            # PSK hexadecimal (informada ou derivada do cache de redes salvas):
+            # evita que o wpa_supplicant rode PBKDF2 a cada inicialização
+            psk = self._psk(ssid, password)
+            if psk:
+                config += f'    psk={psk}\n'
+                logger.debug("Usando PSK hexadecimal pré-computada")
+            else:
+                # Senha em formato ASCII (será convertida para PSK)
+                config += f'    psk="{password_escaped}"\n'
+                logger.debug("Usando senha ASCII (será convertida para PSK)")
+
+            # Configurações de segurança robustas
+            config += """    key_mgmt=WPA-PSK WPA-EAP
+    pairwise=CCMP TKIP
+    group=CCMP TKIP
+    proto=RSN WPA
+    scan_ssid=1
+    priority=5
+"""
+        else:
+            # Rede aberta
+            config += """    key_mgmt=NONE
+    priority=1
+    scan_ssid=1
+"""
+            logger.debug("Configurando para rede aberta")
+
+        # Dicas de reconexão rápida: preferir o AP conhecido e escanear só o seu canal
+        if hints:
+            if hints.get('bssid'):
+                config += f"    bssid_hint={hints['bssid']}\n"
+            if hints.get('frequency'):
+                config += f"    scan_freq={hints['frequency']}\n"
+
+        config += "}\n"
+
+        # Adicionar configuração de fallback para redes conhecidas
+        config += """
+# Configuração de fallback para redes Enterprise (opcional)
+network={
+    ssid="*"
+    key_mgmt=WPA-EAP
+    eap=PEAP TTLS
+    priority=1
+    disabled=1
+}
+"""
+
+        logger.debug(f"Configuração wpa_supplicant gerada para SSID: {ssid}")
+        return config
+
+    def _wait_handshake(self, deadline: float) -> bool:
+        """Aguarda o wpa_supplicant concluir o 4-way handshake (wpa_state=COMPLETED)"""
+        while True:
+            state = self._wpa_state()
+            if state is None or state == 'COMPLETED':
+                # Sem wpa_cli não há como observar o handshake; a fase fica vazia
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.POLL_INTERVAL)
+
+    def _wpa_state(self) -> Optional[str]:
+        """Estado do wpa_supplicant (wpa_cli status)"""
+        try:
+            result = run_command(['wpa_cli', '-i', self.interface, 'status'], timeout=5)
+            match = re.search(r'^wpa_state=(\S+)', result.stdout, re.MULTILINE)
+            return match.group(1) if match else None
+        except Exception:
+            return None
+
+    def _is_associated(self) -> bool:
+        """Verifica se está associado a uma rede"""
+        try:
+            result = run_command(['iwconfig', self.interface], timeout=5)
+            return 'Not-Associated' not in result.stdout
+        except:
+            return False
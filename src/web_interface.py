@@ -4,28 +4,122 @@ Interface web para configuração do Wi-Fi
 """
 
 import os
+import time
 import logging
 import json
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import threading
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for
+from werkzeug.serving import BaseWSGIServer
 from datetime import datetime
 
+from link_telemetry import MultiResolutionSeries
+from metrics import REGISTRY, HTTP_LATENCY, HTTP_REQUESTS, histogram_lines
+import clocks
+from boot_milestones import BOOT
+from command_runner import RUNNER
+from memory_profile import PROFILE
+from log_reader import LOG_FILE, LogReader
+from connect_errors import classify as classify_failure
+from log_pipeline import PIPELINE
+
 logger = logging.getLogger(__name__)
 
+
+class BoundedWSGIServer(BaseWSGIServer):
+    """Servidor WSGI com no máximo max_threads requisições em paralelo
+
+    O ThreadedWSGIServer do werkzeug cria uma thread por requisição sem
+    limite; aqui o excedente espera no backlog do socket.
+    """
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, max_threads: int):
+        super().__init__(host, port, app)
+        self._slots = threading.BoundedSemaphore(max_threads)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            threading.Thread(target=self._process_request_thread, args=(request, client_address),
+                             daemon=True).start()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
 class WebInterface:
-    def __init__(self, config_manager, wifi_monitor, hotspot_manager):
+    # Maior página de /scan aceita (ambientes muito densos)
+    MAX_SCAN_PAGE = 200
+    # Duração de cada conexão de /scan/stream (o navegador reconecta com Last-Event-ID)
+    SCAN_STREAM_DURATION = 300
+    
+    def __init__(self, config_manager, wifi_monitor, hotspot_manager, failover_predictor=None,
+                 state_snapshot=None):
         self.config_manager = config_manager
         self.wifi_monitor = wifi_monitor
         self.hotspot_manager = hotspot_manager
+        self.failover_predictor = failover_predictor
+        self.state_snapshot = state_snapshot
+        self._cpu_times = (0, 0)  # (ocioso, total) da última leitura de /proc/stat
+        self.scan_page_size = config_manager.get_config_value('scan_page_size', 30)
+        self.scan_refresh_interval = config_manager.get_config_value('scan_refresh_interval', 10)
+        # Cada /scan/stream ocupa uma thread do servidor enquanto estiver aberto
+        self._stream_slots = threading.BoundedSemaphore(PROFILE.get('web_streams'))
+        # Logs recentes do buffer em memória; sem o pipeline (ex.: testes), do arquivo
+        self.log_reader = PIPELINE.ring if PIPELINE.running else LogReader(LOG_FILE)
         
         self.app = Flask(__name__, 
                         template_folder='../templates',
                         static_folder='../static')
         
         self._setup_routes()
+        self._setup_request_metrics()
+        REGISTRY.register_collector(self._collect_connect_phases)
+        
+    def _setup_request_metrics(self):
+        """Mede a latência de cada requisição por rota"""
+        
+        @self.app.before_request
+        def start_timer():
+            g.request_start = time.monotonic()
+        
+        @self.app.after_request
+        def record_latency(response):
+            start = g.pop('request_start', None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                HTTP_LATENCY.observe(time.monotonic() - start, route=route, method=request.method)
+                HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+                if response.status_code == 200:
+                    BOOT.mark('first_http_200')
+            return response
+        
+    def _collect_connect_phases(self):
+        """Serializa os histogramas de fases de conexão já agregados"""
+        name = 'wifi_manager_connect_phase_seconds'
+        lines = [f'# HELP {name} Duração das fases das tentativas de conexão',
+                 f'# TYPE {name} histogram']
+        for (backend, phase), histogram in self.wifi_monitor.connect_timings.items():
+            lines.extend(histogram_lines(name, {'backend': backend, 'phase': phase}, histogram))
+        return lines
         
     def _setup_routes(self):
         """Configura rotas da aplicação web"""
         
+        @self.app.route('/metrics')
+        def metrics():
+            """Métricas no formato de exposição do Prometheus (sem sondagem na coleta)"""
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+        
         @self.app.route('/')
         def index():
             """Página principal"""
@@ -34,13 +128,22 @@ class WebInterface:
         
         @self.app.route('/scan')
         def scan_networks():
-            """Escaneia redes Wi-Fi disponíveis"""
+            """Escaneia redes Wi-Fi disponíveis (uma entrada por SSID, paginada por sinal)
+            
+            Com ?since=<cursor> devolve só as redes adicionadas, alteradas e
+            removidas desde o cursor de uma resposta anterior.
+            """
             try:
-                networks = self.wifi_monitor.scan_networks()
-                return jsonify({
-                    'success': True,
-                    'networks': networks
-                })
+                since = request.args.get('since')
+                if since is not None:
+                    self.wifi_monitor.refresh_scan(self.scan_refresh_interval)
+                    return jsonify(dict(self.wifi_monitor.bss_table.delta(since), success=True))
+                
+                limit = request.args.get('limit', self.scan_page_size, type=int)
+                offset = request.args.get('offset', 0, type=int)
+                page = self.wifi_monitor.ranked_networks(max(1, min(limit, self.MAX_SCAN_PAGE)),
+                                                         max(0, offset))
+                return jsonify(dict(page, success=True))
             except Exception as e:
                 logger.error(f"Erro ao escanear redes: {e}")
                 return jsonify({
@@ -48,6 +151,18 @@ class WebInterface:
                     'error': str(e)
                 })
         
+        @self.app.route('/scan/stream')
+        def scan_stream():
+            """Deltas da tabela de BSS como Server-Sent Events"""
+            if not self._stream_slots.acquire(blocking=False):
+                # Sem vaga: o cliente volta ao polling de /scan?since=
+                return jsonify({'success': False, 'error': 'Limite de streams atingido'}), 503
+            cursor = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+            response = Response(self._scan_events(cursor), mimetype='text/event-stream',
+                                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+            response.call_on_close(self._stream_slots.release)
+            return response
+        
         @self.app.route('/connect', methods=['POST'])
         def connect_wifi():
             """Conecta a uma rede Wi-Fi"""
@@ -95,8 +210,8 @@ class WebInterface:
                         'ssid': ssid
                     })
                 else:
-                    # Analisar logs recentes para identificar tipo de erro
-                    error_details = self._analyze_connection_error()
+                    # Motivo estruturado da tentativa (logs recentes só se inconclusivo)
+                    error_details = self._analyze_connection_error(ssid)
                     
                     logger.error(f"Falha na conexão Wi-Fi: {ssid} - {error_details['error']}")
                     
@@ -104,6 +219,7 @@ class WebInterface:
                         'success': False,
                         'error': error_details['error'],
                         'error_type': error_details['type'],
+                        'error_reason': error_details.get('reason'),
                         'suggestions': error_details['suggestions']
                     })
                     
@@ -131,6 +247,35 @@ class WebInterface:
                     'error': str(e)
                 })
         
+        @self.app.route('/saved-networks')
+        def saved_networks():
+            """Lista redes salvas com histórico de conexão"""
+            return jsonify({
+                'success': True,
+                'saved_networks': self.config_manager.get_saved_networks()
+            })
+
+        @self.app.route('/delete-network', methods=['POST'])
+        def delete_network():
+            """Remove uma rede salva"""
+            try:
+                data = request.get_json()
+                ssid = data.get('ssid') if data else None
+                if not ssid:
+                    return jsonify({
+                        'success': False,
+                        'error': 'SSID não fornecido'
+                    })
+                return jsonify({
+                    'success': self.config_manager.delete_saved_network(ssid)
+                })
+            except Exception as e:
+                logger.error(f"Erro ao remover rede salva: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                })
+
         @self.app.route('/status')
         def get_status():
             """Retorna status do sistema"""
@@ -186,37 +331,42 @@ class WebInterface:
         def view_logs():
             """Visualiza logs do sistema"""
             try:
-                log_file = '/var/log/wifi-manager/wifi-manager.log'
-                logs = []
-                
-                if os.path.exists(log_file):
-                    with open(log_file, 'r') as f:
-                        lines = f.readlines()[-100:]  # Últimas 100 linhas
-                        logs = [line.strip() for line in lines]
-                
-                return render_template('logs.html', logs=logs)
+                tail = self.log_reader.tail(100)
+                return render_template('logs.html', logs=tail['lines'], cursor=tail['cursor'])
                 
             except Exception as e:
                 logger.error(f"Erro ao carregar logs: {e}")
-                return render_template('logs.html', logs=[f"Erro ao carregar logs: {e}"])
+                return render_template('logs.html', logs=[f"Erro ao carregar logs: {e}"], cursor=0)
         
         @self.app.route('/api/logs')
         def api_logs():
-            """API para obter logs"""
+            """Últimas linhas do log ou, com ?after=<cursor>, só as escritas desde então
+            
+            Filtros: level (nível mínimo) e q (texto); limit até LogReader.MAX_LINES.
+            """
             try:
-                log_file = '/var/log/wifi-manager/wifi-manager.log'
-                logs = []
-                
-                if os.path.exists(log_file):
-                    with open(log_file, 'r') as f:
-                        lines = f.readlines()[-50:]  # Últimas 50 linhas
-                        logs = [line.strip() for line in lines]
+                limit = request.args.get('limit', 50, type=int)
+                level = request.args.get('level')
+                contains = request.args.get('q')
+                after = request.args.get('after', type=int)
+                if after is None:
+                    result = self.log_reader.tail(limit, level, contains)
+                else:
+                    result = self.log_reader.after(max(after, 0), limit, level, contains)
                 
                 return jsonify({
                     'success': True,
-                    'logs': logs
+                    'logs': result['lines'],
+                    'cursor': result['cursor'],
+                    'more': result['more'],
+                    'reset': result.get('reset', False)
                 })
                 
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
             except Exception as e:
                 logger.error(f"Erro ao obter logs: {e}")
                 return jsonify({
@@ -224,6 +374,179 @@ class WebInterface:
                     'error': str(e)
                 })
         
+        @self.app.route('/api/link')
+        def api_link():
+            """Últimos valores da telemetria do enlace"""
+            telemetry = self.wifi_monitor.telemetry
+            return jsonify({
+                'success': True,
+                'latest': telemetry.latest(),
+                'metrics': list(telemetry.METRICS),
+                'memory_bytes': telemetry.memory_usage()
+            })
+        
+        @self.app.route('/api/link/<metric>')
+        def api_link_metric(metric):
+            """Janela de amostras e percentis de uma métrica do enlace"""
+            telemetry = self.wifi_monitor.telemetry
+            if metric not in telemetry.METRICS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Métrica desconhecida: {metric}'
+                }), 404
+            try:
+                window = float(request.args.get('window', 300))
+                resolution = request.args.get('resolution', 'auto')
+                if resolution not in ('auto',) + MultiResolutionSeries.RESOLUTIONS:
+                    raise ValueError(f'resolução inválida: {resolution}')
+                samples = telemetry.query(metric, window, resolution)
+                return jsonify({
+                    'success': True,
+                    'metric': metric,
+                    'window': window,
+                    'samples': [[ts, None if value != value else value] for ts, value in samples],
+                    'percentiles': telemetry.percentiles(metric, window, resolution=resolution)
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        @self.app.route('/api/roaming')
+        def api_roaming():
+            """Estatísticas de roaming entre pontos de acesso"""
+            return jsonify({
+                'success': True,
+                'roaming': self.wifi_monitor.roaming_engine.get_stats()
+            })
+        
+        @self.app.route('/api/connect-timings')
+        def api_connect_timings():
+            """Histogramas de latência por fase, backend e rede das conexões"""
+            return jsonify({
+                'success': True,
+                'timings': self.wifi_monitor.connect_timings.get_stats(
+                    ssid=request.args.get('ssid'), backend=request.args.get('backend'))
+            })
+        
+        @self.app.route('/api/commands')
+        def api_commands():
+            """Contagem, tempo e orçamento (ops/s, CPU-ms/s) dos comandos externos"""
+            try:
+                window = float(request.args.get('window', 60))
+                return jsonify({
+                    'success': True,
+                    'commands': RUNNER.budget_report(
+                        window,
+                        ops_budget=self.config_manager.get_config_value('command_ops_budget'),
+                        cpu_budget_ms=self.config_manager.get_config_value('command_cpu_budget_ms'))
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        @self.app.route('/api/failover')
+        def api_failover():
+            """Estado do failover preditivo e duração das interrupções"""
+            if self.failover_predictor is None:
+                return jsonify({'success': False, 'error': 'Failover preditivo indisponível'}), 404
+            return jsonify({
+                'success': True,
+                'failover': self.failover_predictor.get_stats()
+            })
+        
+        @self.app.route('/api/boot')
+        def api_boot():
+            """Marcos do boot: primeira resposta HTTP, associação, IP, online ou portal"""
+            return jsonify({
+                'success': True,
+                'boot': BOOT.to_dict()
+            })
+        
+        @self.app.route('/api/state')
+        def api_state():
+            """Retomada do snapshot de estado e tempo até o estado estável"""
+            if self.state_snapshot is None:
+                return jsonify({'success': False, 'error': 'Snapshot de estado indisponível'}), 404
+            return jsonify({
+                'success': True,
+                'state': self.state_snapshot.report
+            })
+        
+        @self.app.route('/api/memory')
+        def api_memory():
+            """RSS, perfil de memória, buffers principais e (com tracemalloc) o heap"""
+            top = request.args.get('top', 20, type=int)
+            report = PROFILE.report(max(1, min(top, 100)))
+            report['buffers'] = {
+                'bss_entries': len(self.wifi_monitor.bss_table),
+                'telemetry_kb': round(self.wifi_monitor.telemetry.memory_usage() / 1024, 1)
+            }
+            return jsonify({
+                'success': True,
+                'memory': report
+            })
+        
+        @self.app.route('/api/memory/trace', methods=['POST'])
+        def api_memory_trace():
+            """Liga ou desliga o tracemalloc: {"enabled": true, "frames": 1}"""
+            data = request.get_json(silent=True) or {}
+            if data.get('enabled', True):
+                PROFILE.start_tracing(max(1, min(int(data.get('frames', 1)), 25)))
+            else:
+                PROFILE.stop_tracing()
+            return jsonify({
+                'success': True,
+                'heap': PROFILE.heap_report(0)
+            })
+        
+        @self.app.route('/api/history')
+        def api_history_stats():
+            """Tamanho e contagem de linhas do histórico persistente"""
+            return jsonify({
+                'success': True,
+                'history': self.wifi_monitor.history.get_stats()
+            })
+        
+        @self.app.route('/api/history/<view>')
+        def api_history(view):
+            """Consultas ao histórico: transições, failovers, conexões, fases e avistamentos"""
+            history = self.wifi_monitor.history
+            if not history.available:
+                return jsonify({'success': False, 'error': 'Histórico indisponível'}), 503
+            try:
+                window = float(request.args.get('window', 7 * 86400))
+                limit = int(request.args.get('limit', 100))
+                since = clocks.now() - window
+                args = request.args
+                queries = {
+                    'transitions': lambda: history.transitions(since, limit),
+                    'failovers': lambda: history.failovers(since, int(args.get('bucket', 86400))),
+                    'connects': lambda: history.connect_stats(since, args.get('ssid')),
+                    'attempts': lambda: history.attempts(since, args.get('ssid'), limit),
+                    'phases': lambda: history.phase_stats(since, args.get('bssid')),
+                    'sightings': lambda: history.sightings(since, args.get('bssid'), args.get('ssid'), limit)
+                }
+                if view not in queries:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Consulta desconhecida: {view}'
+                    }), 404
+                return jsonify({
+                    'success': True,
+                    'view': view,
+                    'window': window,
+                    'rows': queries[view]()
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
         @self.app.route('/hotspot/clients')
         def hotspot_clients():
             """Lista clientes conectados ao hotspot"""
@@ -231,7 +554,7 @@ class WebInterface:
                 clients = self.hotspot_manager.get_connected_clients()
                 return jsonify({
                     'success': True,
-                    'clients': clients
+                    'clients': [client.to_dict() for client in clients]
                 })
             except Exception as e:
                 logger.error(f"Erro ao obter clientes do hotspot: {e}")
@@ -248,97 +571,14 @@ class WebInterface:
             """Captive portal redirection"""
             return redirect(url_for('index'))
     
-    def _analyze_connection_error(self):
-        """Analisa logs recentes para identificar tipo específico de erro"""
+    def _analyze_connection_error(self, ssid: str = None):
+        """Classifica a falha pelo motivo registrado na tentativa (logs do sistema só como recurso)"""
         try:
-            error_patterns = {
-                'authentication': {
-                    'patterns': [
-                        'authentication failed', 'senha incorreta', 'password', 'auth',
-                        '4-way handshake failed', 'Secrets were required'
-                    ],
-                    'error': 'Falha na autenticação - senha incorreta ou método de segurança incompatível',
-                    'suggestions': [
-                        'Verifique se a senha está correta',
-                        'Certifique-se de que a rede usa WPA/WPA2',
-                        'Tente novamente em alguns minutos'
-                    ]
-                },
-                'network_not_found': {
-                    'patterns': [
-                        'network not found', 'No network with SSID', 'rede não encontrada'
-                    ],
-                    'error': 'Rede não encontrada',
-                    'suggestions': [
-                        'Execute um novo scan de redes',
-                        'Verifique se está dentro do alcance da rede',
-                        'Confirme se o nome da rede está correto'
-                    ]
-                },
-                'connection_failed': {
-                    'patterns': [
-                        'Connection activation failed', 'association rejected', 'timeout'
-                    ],
-                    'error': 'Falha na conexão - ponto de acesso rejeitou a conexão',
-                    'suggestions': [
-                        'A rede pode estar sobrecarregada',
-                        'Tente novamente em alguns momentos',
-                        'Verifique se a rede permite novos dispositivos'
-                    ]
-                },
-                'dhcp_failed': {
-                    'patterns': [
-                        'dhcp', 'no IP', 'timeout.*dhcp', 'failed to get IP'
-                    ],
-                    'error': 'Falha ao obter endereço IP',
-                    'suggestions': [
-                        'A rede pode estar com problemas de DHCP',
-                        'Tente desconectar e conectar novamente',
-                        'Verifique se a rede não exige configuração manual'
-                    ]
-                }
-            }
-            
-            # Tentar ler logs recentes (últimas 50 linhas)
-            log_content = ""
-            possible_log_files = [
-                '/var/log/wifi-manager/wifi-manager.log',
-                '/tmp/wpa_supplicant.log',
-                '/var/log/syslog'
-            ]
-            
-            for log_file in possible_log_files:
-                try:
-                    if os.path.exists(log_file):
-                        with open(log_file, 'r') as f:
-                            lines = f.readlines()
-                            # Pegar últimas 20 linhas de cada arquivo
-                            recent_lines = lines[-20:] if len(lines) > 20 else lines
-                            log_content += ' '.join(recent_lines).lower()
-                except:
-                    continue
-            
-            # Analisar padrões de erro
-            for error_type, error_info in error_patterns.items():
-                for pattern in error_info['patterns']:
-                    if pattern.lower() in log_content:
-                        return {
-                            'type': error_type,
-                            'error': error_info['error'],
-                            'suggestions': error_info['suggestions']
-                        }
-            
-            # Erro genérico se nenhum padrão específico for encontrado
-            return {
-                'type': 'generic',
-                'error': 'Falha na conexão Wi-Fi - erro não especificado',
-                'suggestions': [
-                    'Verifique se a senha está correta',
-                    'Confirme se está dentro do alcance da rede',
-                    'Tente executar um novo scan de redes',
-                    'Verifique se a rede aceita novos dispositivos'
-                ]
-            }
+            attempt = self.wifi_monitor.last_attempt
+            if attempt is None or attempt.ssid not in (ssid, None):
+                return classify_failure()
+            # Só as linhas escritas desde o início da tentativa, com leituras limitadas
+            return classify_failure(attempt.failures, attempt.log_cursors, self.wifi_monitor.interface)
             
         except Exception as e:
             logger.error(f"Erro ao analisar logs de conexão: {e}")
@@ -348,6 +588,20 @@ class WebInterface:
                 'suggestions': ['Tente novamente ou verifique os logs do sistema']
             }
     
+    def _scan_events(self, cursor: str):
+        """Gera um evento 'delta' a cada mudança da tabela de BSS (com scans periódicos)"""
+        table = self.wifi_monitor.bss_table
+        deadline = time.monotonic() + self.SCAN_STREAM_DURATION
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            self.wifi_monitor.refresh_scan(self.scan_refresh_interval)
+            if table.wait_for_change(cursor, self.scan_refresh_interval):
+                delta = table.delta(cursor)
+                cursor = delta['cursor']
+                yield f"id: {cursor}\nevent: delta\ndata: {json.dumps(delta)}\n\n"
+            else:
+                yield ': keepalive\n\n'
+    
     def _get_system_status(self):
         """Retorna status completo do sistema"""
         try:
@@ -360,7 +614,8 @@ class WebInterface:
                 'wifi': {
                     'connected': wifi_connected,
                     'current_network': current_network,
-                    'interface': self.wifi_monitor.interface
+                    'interface': self.wifi_monitor.interface,
+                    'link': self.wifi_monitor.telemetry.latest()
                 },
                 'hotspot': {
                     'running': hotspot_running,
@@ -394,23 +649,34 @@ class WebInterface:
             return 0
     
     def _get_memory_usage(self):
-        """Retorna uso de memória"""
+        """Retorna uso de memória (de /proc/meminfo)"""
         try:
-            import psutil
-            memory = psutil.virtual_memory()
+            meminfo = {}
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    meminfo[key] = int(value.split()[0]) * 1024
+            total = meminfo['MemTotal']
+            used = total - meminfo.get('MemAvailable', meminfo.get('MemFree', 0))
             return {
-                'total': memory.total,
-                'used': memory.used,
-                'percent': memory.percent
+                'total': total,
+                'used': used,
+                'percent': round(100.0 * used / total, 1) if total else 0
             }
         except:
             return {'percent': 0}
     
     def _get_cpu_usage(self):
-        """Retorna uso de CPU"""
+        """Retorna uso de CPU desde a consulta anterior (de /proc/stat, sem bloquear)"""
         try:
-            import psutil
-            return psutil.cpu_percent(interval=1)
+            with open('/proc/stat', 'r') as f:
+                fields = [int(value) for value in f.readline().split()[1:]]
+            idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+            total = sum(fields)
+            previous_idle, previous_total = self._cpu_times
+            self._cpu_times = (idle, total)
+            elapsed = total - previous_total
+            return round(100.0 * (1 - (idle - previous_idle) / elapsed), 1) if elapsed > 0 else 0
         except:
             return 0
     
@@ -422,13 +688,8 @@ class WebInterface:
         logger.info(f"Iniciando interface web em http://{host}:{port}")
         
         try:
-            self.app.run(
-                host=host,
-                port=port,
-                debug=False,
-                threaded=True,
-                use_reloader=False
-            )
+            server = BoundedWSGIServer(host, port, self.app, PROFILE.get('web_threads'))
+            server.serve_forever()
         except Exception as e:
             logger.error(f"Erro ao iniciar interface web: {e}")
     